@@ -0,0 +1,384 @@
+"""
+Read-through cache with versioned keys.
+
+Entries live under a *scope* (one receipt, or one user's listing). Each scope
+has a version token, and entry keys embed it: `receipt:7@<token>:row`.
+Invalidating a scope replaces its token after the writing transaction has
+committed, so every later read misses. A reader that loaded pre-write data
+can only store it under the old token, where nobody looks any more. Stale
+entries therefore never outlive a write, as long as writers and readers share
+the backend: redis once a worker runs, since the memory backend is private to
+its process. Tokens are random, so a token evicted under memory pressure is
+never reused either.
+
+Tokens also carry the time of the invalidation that minted them. A miss within
+`primary_window` seconds of it refills through the caller's `load_primary`, so
+a read replica still behind the write cannot cache the old row under the new
+token.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple, TypeVar
+from urllib.parse import unquote, urlparse
+
+from app.config import settings
+from app.metrics import counter
+
+T = TypeVar("T")
+
+log = logging.getLogger("app.cache")
+
+CACHE_REQUESTS = counter("cache_requests_total", "Cache lookups by result", ("cache", "result"))
+
+
+class CacheError(Exception):
+    """Raised when a cache backend cannot complete a command"""
+
+
+class CacheBackend(ABC):
+    """Byte-valued key/value store with per-key TTLs"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        pass
+
+    @abstractmethod
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        """Set `key` only if it does not exist; return True if it was set"""
+        pass
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Release connections or memory held by the backend"""
+        pass
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """
+    Per-process LRU with TTL expiry.
+
+    Invalidations from other processes (the worker, other API replicas) never
+    reach it, so use it only where one process does every write.
+    """
+
+    def __init__(self, max_entries: int = settings.receipt_cache_size) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Tuple[bytes, float]] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        if await self.get(key) is not None:
+            return False
+
+        await self.set(key, value, ttl)
+        return True
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def close(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Minimal RESP client for Redis and protocol-compatible servers (Valkey, KeyDB,
+    Dragonfly). Only GET, SET, DEL and the connection handshake are used.
+    """
+
+    def __init__(
+        self, url: str = settings.redis_url, pool_size: int = settings.redis_pool_size
+    ) -> None:
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.database = int(parsed.path.lstrip("/") or 0)
+        self.timeout = settings.redis_timeout
+
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._limiter = asyncio.Semaphore(pool_size)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.execute("GET", key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.execute("SET", key, value, "PX", max(int(ttl * 1000), 1))
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        return await self.execute("SET", key, value, "NX", "PX", max(int(ttl * 1000), 1)) == "OK"
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.execute("DEL", *keys)
+
+    async def close(self) -> None:
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+    async def execute(self, *args: Any) -> Any:
+        async with self._limiter:
+            connection = self._idle.pop() if self._idle else await self._connect()
+            try:
+                reply = await asyncio.wait_for(self._roundtrip(connection, args), self.timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                connection[1].close()
+                raise CacheError(f"Redis command {args[0]} failed: {e}") from e
+
+            self._idle.append(connection)
+
+        if isinstance(reply, CacheError):
+            raise reply
+        return reply
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        try:
+            connection = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise CacheError(f"Cannot connect to Redis at {self.host}:{self.port}: {e}") from e
+
+        handshake = []
+        if self.password:
+            auth = (
+                ("AUTH", self.username, self.password) if self.username else ("AUTH", self.password)
+            )
+            handshake.append(auth)
+        if self.database:
+            handshake.append(("SELECT", self.database))
+
+        for command in handshake:
+            reply = await self._roundtrip(connection, command)
+            if isinstance(reply, CacheError):
+                connection[1].close()
+                raise reply
+
+        return connection
+
+    async def _roundtrip(self, connection, args) -> Any:
+        reader, writer = connection
+        writer.write(encode_command(*args))
+        await writer.drain()
+        return await read_reply(reader)
+
+
+def encode_command(*args: Any) -> bytes:
+    """Encode a command as a RESP array of bulk strings"""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """Read one RESP2 reply; server errors are returned as CacheError instances"""
+    line = (await reader.readuntil(b"\r\n"))[:-2]
+    kind, body = line[:1], line[1:]
+
+    if kind == b"+":
+        return body.decode()
+    if kind == b"-":
+        return CacheError(body.decode())
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if kind == b"*":
+        length = int(body)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+
+    raise CacheError(f"Unexpected RESP reply: {line!r}")
+
+
+class Cache:
+    """
+    Read-through cache over a backend, with scope invalidation and hit/miss counts.
+
+    Backend failures never fail a read: the value is loaded from the source and
+    not stored.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[CacheBackend],
+        name: str,
+        ttl: float = settings.receipt_cache_ttl,
+        primary_window: float = settings.receipt_cache_primary_window,
+    ) -> None:
+        self.backend = backend
+        self.name = name
+        self.ttl = ttl
+        self.primary_window = primary_window
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    async def get_or_load(
+        self,
+        scope: str,
+        key: str,
+        load: Callable[[], Awaitable[T]],
+        encode: Callable[[T], bytes],
+        decode: Callable[[bytes], T],
+        load_primary: Optional[Callable[[], Awaitable[T]]] = None,
+    ) -> T:
+        """
+        Return the cached value for `key` in `scope`, loading and storing it on a miss.
+
+        `load_primary` reads the primary database instead of a replica; it replaces
+        `load` for misses shortly after the scope was invalidated.
+        """
+        if self.backend is None:
+            return await load()
+
+        try:
+            version = await self._version(scope)
+            entry_key = f"{self.name}:{scope}@{version}:{key}"
+            cached = await self.backend.get(entry_key)
+        except CacheError as e:
+            log.warning("Cache %s unavailable, reading through: %s", self.name, e)
+            return await load()
+
+        if cached is not None:
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache=self.name, result="hit")
+            return decode(cached)
+
+        self.misses += 1
+        CACHE_REQUESTS.inc(cache=self.name, result="miss")
+
+        if (
+            load_primary is not None
+            and time.time() - _invalidated_at(version) < self.primary_window
+        ):
+            load = load_primary
+        value = await load()
+        if value is not None:  # absent rows are not cached, inserts never need to evict them
+            try:
+                await self.backend.set(entry_key, encode(value), self.ttl)
+            except CacheError as e:
+                log.warning("Cache %s set failed: %s", self.name, e)
+
+        return value
+
+    async def invalidate(self, scopes: Iterable[str]) -> None:
+        """Retire every entry in `scopes`; call after the write has committed"""
+        if self.backend is None:
+            return
+
+        for scope in set(scopes):
+            try:
+                await self.backend.set(
+                    self._version_key(scope), _new_token(time.time()), self._version_ttl
+                )
+            except CacheError as e:
+                # Entries in this scope can be served until their TTL runs out
+                log.error("Cache %s invalidation of %s failed: %s", self.name, scope, e)
+
+    async def close(self) -> None:
+        if self.backend is not None:
+            await self.backend.close()
+
+    async def _version(self, scope: str) -> str:
+        version_key = self._version_key(scope)
+        version = await self.backend.get(version_key)
+        if version is None:
+            version = _new_token()
+            if not await self.backend.add(version_key, version, self._version_ttl):
+                version = await self.backend.get(version_key) or version
+
+        return version.decode()
+
+    def _version_key(self, scope: str) -> str:
+        return f"{self.name}:{scope}:version"
+
+    @property
+    def _version_ttl(self) -> float:
+        # Outlive the entries so an expired token does not cause extra misses
+        return self.ttl * 2
+
+
+def _new_token(invalidated_at: float = 0.0) -> bytes:
+    """A random token prefixed with the invalidation time in ms; 0 for a first read"""
+    return f"{int(invalidated_at * 1000):x}.{uuid.uuid4().hex[:12]}".encode()
+
+
+def _invalidated_at(version: str) -> float:
+    stamp, _, _ = version.partition(".")
+    try:
+        return int(stamp, 16) / 1000
+    except ValueError:  # a token from before tokens were stamped
+        return 0.0
+
+
+def create_cache_backend(backend: str = settings.receipt_cache_backend) -> Optional[CacheBackend]:
+    if backend == "memory":
+        return InMemoryCacheBackend()
+    if backend == "redis":
+        return RedisCacheBackend()
+    if backend == "none":
+        return None
+
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+_receipt_cache: Optional[Cache] = None
+
+
+def get_receipt_cache() -> Cache:
+    """Process-wide receipt cache shared by every ReceiptRepository"""
+    global _receipt_cache
+    if _receipt_cache is None:
+        _receipt_cache = Cache(create_cache_backend(), name="receipts")
+
+    return _receipt_cache
+
+
+def set_receipt_cache(cache: Optional[Cache]) -> None:
+    global _receipt_cache
+    _receipt_cache = cache
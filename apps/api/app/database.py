@@ -1,17 +1,195 @@
+import itertools
+import logging
+import time
+from typing import Dict, List, Optional, Sequence
 from app.config import settings
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+from app.metrics import DB_POOL_CHECKOUT_WAIT, DB_POOL_CONNECTIONS
+from app.query_stats import instrument_engine
+from sqlalchemy import CompoundSelect, Select, event, text
+from sqlalchemy.engine import Engine, ExceptionContext
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+    async_sessionmaker,
+)
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+log = logging.getLogger("app.database")
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waits for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+def create_engine(database_url: str = settings.database_url) -> AsyncEngine:
+    """Create the async engine with pool sizes from settings and query instrumentation"""
+    pool_options = {}
+    if not database_url.startswith("sqlite"):
+        pool_options = {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_timeout": settings.db_pool_timeout,
+            "pool_recycle": settings.db_pool_recycle,
+            "pool_pre_ping": True,
+            "poolclass": InstrumentedQueuePool,
+        }
+
+    engine = create_async_engine(database_url, echo=settings.db_echo, future=True, **pool_options)
+    instrument_engine(engine)
+
+    return engine
+
+
+def expose_pool_metrics(engine: AsyncEngine) -> None:
+    """Report the engine's pool occupancy as gauges read at scrape time"""
+    pool = engine.pool
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        DB_POOL_CONNECTIONS.set_function(pool.checkedout, state="checked_out")
+        DB_POOL_CONNECTIONS.set_function(pool.checkedin, state="idle")
+        DB_POOL_CONNECTIONS.set_function(pool.overflow, state="overflow")
+
+
+class ReplicaSet:
+    """
+    Read replicas handed out round-robin.
+
+    A replica whose connection fails (refused connect, dropped connection) is
+    ejected for `retry_interval` seconds and then tried again. When every
+    replica is ejected, `pick` returns None and reads fall back to the primary.
+    """
+
+    def __init__(
+        self,
+        engines: Sequence[AsyncEngine],
+        retry_interval: float = settings.db_replica_retry_interval,
+    ) -> None:
+        self.engines: List[AsyncEngine] = list(engines)
+        self.retry_interval = retry_interval
+        self._ejected_until: Dict[int, float] = {}
+        self._turn = itertools.count()
+
+        for index, replica in enumerate(self.engines):
+            event.listen(
+                replica.sync_engine,
+                "handle_error",
+                lambda context, index=index: self._on_error(index, context),
+            )
+
+    def __len__(self) -> int:
+        return len(self.engines)
+
+    def pick(self) -> Optional[AsyncEngine]:
+        """Next healthy replica in turn, or None when there is none"""
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            index = next(self._turn) % len(self.engines)
+            if self._ejected_until.get(index, 0) <= now:
+                return self.engines[index]
+
+        return None
+
+    def eject(self, replica: AsyncEngine) -> None:
+        index = self.engines.index(replica)
+        self._ejected_until[index] = time.monotonic() + self.retry_interval
+        log.warning(
+            "Read replica %s ejected for %ss", replica.url.render_as_string(), self.retry_interval
+        )
+
+    async def dispose(self) -> None:
+        for replica in self.engines:
+            await replica.dispose()
+
+    def _on_error(self, index: int, context: ExceptionContext) -> None:
+        # Statement errors (constraint, syntax) say nothing about the replica's health
+        if context.is_disconnect or context.connection is None:
+            self.eject(self.engines[index])
+
 
-engine = create_async_engine(settings.database_url, echo=True, future=True)
+class RoutingSession(Session):
+    """
+    Session that sends plain SELECTs to a read replica and everything else to the primary.
+
+    Once the session writes (a flush, INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE or
+    raw SQL), every later statement in it goes to the primary as well, so a request
+    always reads its own writes; `read_from_primary` does the same without a write.
+    Reads stick to one replica for the session's lifetime. Without replicas this is
+    a plain primary-bound session.
+    """
+
+    def __init__(self, *args, replicas: Optional[ReplicaSet] = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, *, clause=None, **kwargs) -> Engine:
+        primary = super().get_bind(mapper, clause=clause, **kwargs)
+
+        if self._flushing or not _is_plain_read(clause):
+            self.info["wrote"] = True
+        if self.info.get("wrote") or self.info.get("primary") or not self.replicas:
+            return primary
+
+        replica = self.info.get("replica")
+        if replica is None:
+            replica = self.replicas.pick()
+            if replica is None:
+                return primary
+            self.info["replica"] = replica
+
+        return replica.sync_engine
+
+
+def read_from_primary(session: AsyncSession | Session) -> None:
+    """Send every later statement of a routing session to the primary"""
+    session.info["primary"] = True
+
+
+def _is_plain_read(clause) -> bool:
+    return isinstance(clause, (Select, CompoundSelect)) and clause._for_update_arg is None
+
+
+engine = create_engine()
+expose_pool_metrics(engine)
+
+replicas = ReplicaSet([create_engine(url) for url in settings.database_replica_urls])
 
 AsyncSessionLocal = async_sessionmaker(
     engine,
     expire_on_commit=False,
 )
 
+# Sessions for read-mostly endpoints; identical to AsyncSessionLocal without replicas
+ReadSessionLocal = async_sessionmaker(
+    engine,
+    expire_on_commit=False,
+    sync_session_class=RoutingSession,
+    replicas=replicas,
+)
+
 Base = declarative_base()
 
 
+async def warm_pool(engine: AsyncEngine, connections: int) -> None:
+    """Open `connections` pooled connections up front so first requests skip the handshake"""
+    opened = []
+    try:
+        for _ in range(max(connections, 1)):
+            conn = await engine.connect()
+            opened.append(conn)
+            await conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            await conn.close()
+
+
 async def get_db():
     """Dependency to get async DB session."""
     async with AsyncSessionLocal() as session:
@@ -19,3 +197,12 @@ async def get_db():
             yield session
         finally:
             await session.close()
+
+
+async def get_read_db():
+    """Dependency to get an async DB session that reads from replicas until it writes."""
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
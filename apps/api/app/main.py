@@ -2,22 +2,28 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-from app.database import engine, Base
-from app.routers import health_router, receipt_router
+from app.database import engine
+from app.metrics import MetricsMiddleware
+from app.query_stats import QueryStatsMiddleware
+from app.resources import close_resources, open_resources
+from app.routers import health_router, metrics_router, receipt_router
+from app.schema import check_schema_version
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # --- startup ---
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    print("✅ Database tables created")
+    # No DDL here: migrations run once per deploy with `alembic upgrade head`
+    revision = await check_schema_version(engine)
+    print(f"✅ Database schema at revision {revision}")
+
+    app.state.resources = await open_resources()
+    print("✅ Shared resources ready")
 
     yield  # app runs while we're yielded here
 
     # --- shutdown ---
-    # (optional) close resources, flush queues, etc.
-    # await engine.dispose()  # if you want to dispose engine on shutdown
+    await close_resources(app.state.resources)
     print("🛑 Shutdown complete")
 
 
@@ -39,8 +45,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(health_router)
+app.include_router(metrics_router)
 app.include_router(receipt_router)
 
 
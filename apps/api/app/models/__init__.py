@@ -1,4 +1,8 @@
 from app.models.users import Users
 from app.models.receipts import Receipt
+from app.models.jobs import Job
+from app.models.receipt_counters import ReceiptCounter
+from app.models.ocr_results import OcrResult
+from app.models.receipt_items import ReceiptItem
 
-__all__ = ["Users", "Receipt"]
+__all__ = ["Users", "Receipt", "Job", "ReceiptCounter", "OcrResult", "ReceiptItem"]
@@ -0,0 +1,48 @@
+from datetime import datetime
+from typing import Any
+from sqlalchemy import JSON, DateTime, Index, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class Job(Base):
+    """Background job claimed by workers with FOR UPDATE SKIP LOCKED"""
+
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_status_run_at", "status", "run_at"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    kind: Mapped[str] = mapped_column(String, nullable=False)  # handler name, e.g. process_receipt
+
+    # No foreign key: receipts is partitioned on PostgreSQL, and a key to it would have
+    # to include created_at
+    receipt_id: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+
+    payload: Mapped[dict[str, Any] | None] = mapped_column(JSON, nullable=True)
+
+    # queued, running, done, dead
+    status: Mapped[str] = mapped_column(String, nullable=False, default="queued")
+
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=5)
+
+    # Earliest time the job may be claimed; pushed back on retry
+    run_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+
+    # While running, the claim expires at this time and another worker may take over
+    locked_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+
+    updated_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        onupdate=func.now(),
+    )
@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import Any
+from sqlalchemy import JSON, BigInteger, DateTime, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class OcrResult(Base):
+    """
+    Stored OCR output of one image under one preprocessing and engine version.
+
+    Keyed by content rather than receipt: receipts with the same image share a
+    row, and reprocessing or reparsing a receipt never runs OCR again until
+    PREPROCESS_VERSION or the engine configuration changes.
+    """
+
+    __tablename__ = "ocr_results"
+
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)  # SHA-256 of the image
+
+    preprocess_version: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    engine_version: Mapped[str] = mapped_column(String, primary_key=True)  # OcrEngine.version
+
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+
+    lines: Mapped[list[dict[str, Any]]] = mapped_column(JSON, nullable=False)
+
+    # QualityMetrics of the preprocessed image, copied to receipts on a hit
+    quality_metrics: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False)
+
+    # Lookups answered from this row instead of running OCR
+    hits: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    last_hit_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
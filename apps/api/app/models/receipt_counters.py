@@ -0,0 +1,23 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class ReceiptCounter(Base):
+    """Number of receipts a user has in one status, kept in step with every insert and transition"""
+
+    __tablename__ = "receipt_counters"
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), primary_key=True)
+
+    status: Mapped[str] = mapped_column(String, primary_key=True)
+
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    updated_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
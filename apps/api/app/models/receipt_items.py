@@ -0,0 +1,45 @@
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import DateTime, Float, Integer, Numeric, String
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class ReceiptItem(Base):
+    """
+    Line item parsed from a receipt's OCR text (app.services.line_item_parser)
+
+    On PostgreSQL the table is range-partitioned by `created_at` month like
+    receipts (migration 0007, maintained by `app.partitions`) and its primary
+    key is (id, created_at).
+    """
+
+    __tablename__ = "receipt_items"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    # No foreign key: receipts is partitioned on PostgreSQL, and a key to it would have
+    # to include created_at. Items are replaced whenever the receipt is parsed again.
+    receipt_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+
+    line_number: Mapped[int] = mapped_column(Integer, nullable=False)  # 1-based OCR text line
+
+    item_name: Mapped[str] = mapped_column(String(255), nullable=False)
+
+    quantity: Mapped[Decimal | None] = mapped_column(Numeric(10, 3), nullable=True)
+
+    unit_price: Mapped[Decimal | None] = mapped_column(Numeric(10, 2), nullable=True)
+
+    unit: Mapped[str | None] = mapped_column(String(8), nullable=True)  # kg, lb, ... if weighed
+
+    total_price: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+
+    # From app.services.item_categorizer; category ids are those of its dictionary
+    category_id: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+    category_method: Mapped[str | None] = mapped_column(String(16), nullable=True)
+    category_score: Mapped[float | None] = mapped_column(Float, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
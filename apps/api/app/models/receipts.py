@@ -1,29 +1,65 @@
 from datetime import date, datetime
-from sqlalchemy import Integer, String, DateTime, ForeignKey, Date
+from typing import Any
+from sqlalchemy import BigInteger, Integer, String, DateTime, ForeignKey, Date, Float, Index, JSON
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 from app.database import Base
 
 
 class Receipt(Base):
-    """Receipt model"""
+    """
+    Receipt model
+
+    On PostgreSQL the table is range-partitioned by `created_at` month (migration
+    0004, maintained by `app.partitions`) and its primary key is (id, created_at).
+    `id` alone still identifies a receipt: it comes from one sequence.
+    """
 
     __tablename__ = "receipts"
+    __table_args__ = (
+        Index("ix_receipts_user_id_content_hash", "user_id", "content_hash"),
+        # Keyset pagination: one index per filter combination of GET /receipts
+        Index("ix_receipts_user_id_id", "user_id", "id"),
+        Index("ix_receipts_user_id_status_id", "user_id", "status", "id"),
+        Index("ix_receipts_user_id_purchase_date_id", "user_id", "purchase_date", "id"),
+        Index(
+            "ix_receipts_user_id_status_purchase_date_id",
+            "user_id",
+            "status",
+            "purchase_date",
+            "id",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
 
     user_id: Mapped[int] = mapped_column(
         Integer,
         ForeignKey("users.id"),
-        nullable=False,
-        index=True,  # optional but often useful
+        nullable=False,  # indexed through the composite indexes above
     )
 
     image_path: Mapped[str] = mapped_column(String, nullable=False)  # minio://bucket/object_name
 
+    # SHA-256 of the image bytes, also the object key in storage
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+
+    content_type: Mapped[str | None] = mapped_column(String, nullable=True)
+
+    # Downscaled JPEG copies stored next to the original, set after upload
+    thumbnail_path: Mapped[str | None] = mapped_column(String, nullable=True)
+    web_image_path: Mapped[str | None] = mapped_column(String, nullable=True)
+    image_size: Mapped[int | None] = mapped_column(BigInteger, nullable=True)  # bytes
+
     purchase_date: Mapped[date] = mapped_column(Date, nullable=False)
 
-    # uploaded, processing, processed, failed
+    # Set by the worker's preprocessing step (app.services.image_preprocessing.QualityMetrics)
+    quality_metrics: Mapped[dict[str, Any] | None] = mapped_column(JSON, nullable=True)
+
+    # Line-item parser confidence (0-1) of the items in receipt_items; None before parsing
+    parse_confidence: Mapped[float | None] = mapped_column(Float, nullable=True)
+
+    # pending (awaiting direct upload), uploaded, processing, processed, failed
     status: Mapped[str] = mapped_column(String, nullable=False, default="uploaded")
 
     created_at: Mapped[datetime] = mapped_column(
@@ -38,7 +74,21 @@ class Receipt(Base):
     )
 
 
-def create_receipt(user_id: int, image_path: str, purchase_date: date) -> Receipt:
+def create_receipt(
+    user_id: int,
+    image_path: str,
+    purchase_date: date,
+    content_hash: str | None = None,
+    content_type: str | None = None,
+    image_size: int | None = None,
+    status: str = "uploaded",
+) -> Receipt:
     return Receipt(
-        user_id=user_id, image_path=image_path, purchase_date=purchase_date, status="uploaded"
+        user_id=user_id,
+        image_path=image_path,
+        purchase_date=purchase_date,
+        content_hash=content_hash,
+        content_type=content_type,
+        image_size=image_size,
+        status=status,
     )
@@ -0,0 +1,152 @@
+"""
+Stored OCR results: hit-rate stats and bulk reparsing.
+
+The worker checks `ocr_results` before every OCR call (see `process_receipt`).
+Reparsing reruns only the steps that read OCR output (`apply_ocr`) for many
+receipts at once, from stored results: no image is fetched and no OCR runs.
+Receipts are read in id order, `reparse_batch_size` per transaction, and
+reparsed `failed` receipts become `processed`. Receipts with no stored result
+for the current preprocessing and engine versions are queued for full
+processing instead. Run it after a parser change:
+
+    python -m app.ocr_store stats
+    python -m app.ocr_store reparse
+    python -m app.ocr_store reparse --status failed --user-id 7
+"""
+
+import argparse
+import asyncio
+from typing import List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.database import AsyncSessionLocal, engine
+from app.models.receipts import Receipt
+from app.repository.job_repository import PROCESS_RECEIPT, JobRepository
+from app.repository.ocr_result_repository import OcrKey, OcrResultRepository, OcrStoreStats
+from app.repository.receipt_repository import ReceiptRepository
+from app.services.image_preprocessing import PREPROCESS_VERSION
+from app.services.ocr_service import OcrError, OcrText, create_ocr_engine
+from app.services.receipt_processor import apply_ocr
+
+REPARSE_STATUSES = ("processed", "failed")
+
+
+class ReparseResult(NamedTuple):
+    reparsed: int  # receipts updated from stored OCR output
+    queued: int  # receipts without stored output, queued for OCR
+
+
+async def reparse_receipts(
+    session_factory: async_sessionmaker[AsyncSession],
+    engine_version: str,
+    statuses: Sequence[str] = REPARSE_STATUSES,
+    user_id: Optional[int] = None,
+    batch_size: int = settings.reparse_batch_size,
+) -> ReparseResult:
+    """Rerun `apply_ocr` from stored OCR results for every matching receipt"""
+    reparsed = queued = 0
+    last_id = 0
+    while True:
+        async with session_factory() as db:
+            statement = (
+                select(Receipt.id, Receipt.content_hash)
+                .where(Receipt.id > last_id, Receipt.status.in_(statuses))
+                .order_by(Receipt.id)
+                .limit(batch_size)
+            )
+            if user_id is not None:
+                statement = statement.where(Receipt.user_id == user_id)
+
+            rows = (await db.execute(statement)).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            keys = {
+                row.id: OcrKey(row.content_hash, PREPROCESS_VERSION, engine_version)
+                for row in rows
+                if row.content_hash is not None
+            }
+            stored = await OcrResultRepository(db).get_many(keys.values())
+
+            repo = ReceiptRepository(db)
+            done: List[int] = []
+            missing: List[int] = []
+            for row in rows:
+                result = stored.get(keys.get(row.id))
+                if result is None:
+                    missing.append(row.id)
+                    continue
+
+                text = OcrText(text=result.text, lines=result.lines)
+                await apply_ocr(repo, row.id, result.quality_metrics, text)
+                done.append(row.id)
+
+            await repo.update_status(done, "processed", commit=False)
+            await repo.commit()
+            await JobRepository(db).enqueue(PROCESS_RECEIPT, missing)
+
+        reparsed += len(done)
+        queued += len(missing)
+
+    return ReparseResult(reparsed=reparsed, queued=queued)
+
+
+async def store_stats(session_factory: async_sessionmaker[AsyncSession]) -> List[OcrStoreStats]:
+    async with session_factory() as db:
+        return await OcrResultRepository(db).stats()
+
+
+def print_stats(stats: List[OcrStoreStats], engine_version: Optional[str]) -> None:
+    if not stats:
+        print("No stored OCR results")
+        return
+
+    print(f"{'preprocess':>10} {'results':>9} {'hits':>9} {'hit rate':>9}  engine")
+    current = (PREPROCESS_VERSION, engine_version)
+    for row in stats:
+        marker = " (current)" if (row.preprocess_version, row.engine_version) == current else ""
+        print(
+            f"{row.preprocess_version:>10} {row.results:>9} {row.hits:>9} "
+            f"{row.hit_rate:>9.1%}  {row.engine_version}{marker}"
+        )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("command", choices=["stats", "reparse"])
+    parser.add_argument("--status", action="append", help="receipt status to reparse (repeatable)")
+    parser.add_argument("--user-id", type=int)
+    parser.add_argument("--batch-size", type=int, default=settings.reparse_batch_size)
+    args = parser.parse_args()
+
+    ocr = create_ocr_engine()
+    try:
+        if args.command == "stats":
+            try:
+                engine_version = ocr.version if ocr else None
+            except OcrError:
+                engine_version = None  # stats do not need the engine itself
+            print_stats(await store_stats(AsyncSessionLocal), engine_version)
+            return
+
+        if ocr is None:
+            raise SystemExit("OCR is disabled (OCR_ENGINE=none); nothing to reparse from")
+
+        result = await reparse_receipts(
+            AsyncSessionLocal,
+            ocr.version,
+            statuses=args.status or REPARSE_STATUSES,
+            user_id=args.user_id,
+            batch_size=args.batch_size,
+        )
+        print(f"✅ Reparsed {result.reparsed} receipts, queued {result.queued} for OCR")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,278 @@
+"""
+Monthly range partitions for append-only tables (PostgreSQL only).
+
+`receipts` is partitioned by `created_at` month (migration 0004): every month
+is its own table with its own indexes, so index size and vacuum work per
+partition stay flat however many years of receipts accumulate. Rows older than
+the migration live in one `receipts_legacy` partition, and a DEFAULT partition
+catches anything outside the created range; once a month's partition is
+created, its rows are moved there out of DEFAULT. `receipt_items` is
+partitioned the same way from migration 0007 on, with no legacy partition.
+
+Maintenance keeps `partition_months_ahead` future months created and, when
+`partition_retention_months` is set, detaches older partitions and moves them
+to the `archive` schema. Receipt and item reads already stop at that cutoff
+(see `retention_cutoff`), so those partitions are pruned before they are
+detached. Detached rows stay queryable as `archive.<partition>` and can be
+dumped or dropped from there. The worker runs maintenance periodically; it can
+also be run by hand or from cron:
+
+    python -m app.partitions ensure
+    python -m app.partitions archive --retention-months 24
+"""
+
+import argparse
+import asyncio
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from app.config import settings
+from app.database import engine as default_engine
+from app.repository.receipt_repository import ReceiptRepository
+
+# Tables range-partitioned by created_at month
+PARTITIONED_TABLES: Tuple[str, ...] = ("receipts", "receipt_items")
+
+ARCHIVE_SCHEMA = "archive"
+
+MAINTENANCE_LOCK_ID = 7_240_118  # serialises maintenance across worker processes
+
+_UPPER_BOUND = re.compile(r"TO \('(\d{4}-\d{2}-\d{2})")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def current_month() -> date:
+    return month_start(datetime.now(timezone.utc).date())
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+
+def partition_bounds_sql(month: date) -> str:
+    """FOR VALUES clause of the partition holding `month`; bounds are UTC month starts"""
+    return (
+        f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') "
+        f"TO ('{add_months(month, 1):%Y-%m-%d} 00:00:00+00')"
+    )
+
+
+def create_partition_sql(table: str, month: date) -> str:
+    """DDL for the partition holding `month`"""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"{partition_bounds_sql(month)}"
+    )
+
+
+def in_month_sql(month: date) -> str:
+    """`created_at` predicate matching the rows of the partition holding `month`"""
+    return (
+        f"created_at >= '{month:%Y-%m-%d} 00:00:00+00' "
+        f"AND created_at < '{add_months(month, 1):%Y-%m-%d} 00:00:00+00'"
+    )
+
+
+def upper_bound(bound_expression: str) -> Optional[date]:
+    """Exclusive upper bound of a range partition, None for the DEFAULT partition"""
+    match = _UPPER_BOUND.search(bound_expression)
+    return date.fromisoformat(match.group(1)) if match else None
+
+
+async def list_partitions(conn: AsyncConnection, table: str) -> List[Tuple[str, Optional[date]]]:
+    """Attached partitions of `table` with their exclusive upper bounds"""
+    result = await conn.execute(
+        text(
+            "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) "
+            "FROM pg_inherits i "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "WHERE parent.relname = :table"
+        ),
+        {"table": table},
+    )
+
+    return [(name, upper_bound(bound)) for name, bound in result.all()]
+
+
+async def ensure_partitions(
+    engine: AsyncEngine,
+    months_ahead: int = settings.partition_months_ahead,
+    today: Optional[date] = None,
+) -> List[str]:
+    """
+    Create monthly partitions up to `months_ahead` months out; return the new ones.
+
+    Each month is created in its own transaction, so a failure (a lock timeout,
+    say) is reported and retried on the next run without holding back the others.
+    """
+    if engine.dialect.name != "postgresql":
+        return []
+
+    month = month_start(today) if today else current_month()
+    created = []
+    for table in PARTITIONED_TABLES:
+        async with engine.connect() as conn:
+            partitions = await list_partitions(conn, table)
+        existing = {name for name, _ in partitions}
+        default = next((name for name, bound in partitions if bound is None), None)
+
+        target = month
+        while target <= add_months(month, months_ahead):
+            name = partition_name(table, target)
+            if name not in existing:
+                try:
+                    await _create_partition(engine, table, target, default)
+                    created.append(name)
+                except SQLAlchemyError as e:
+                    print(f"⚠️  Creating partition {name} failed: {e}")
+            target = add_months(target, 1)
+
+    return created
+
+
+async def _create_partition(
+    engine: AsyncEngine, table: str, month: date, default: Optional[str]
+) -> None:
+    """
+    Create the partition holding `month`. Rows the DEFAULT partition took for
+    that month while no partition existed (maintenance was down) would make
+    `PARTITION OF` fail, so they are moved into the new table before it is
+    attached.
+    """
+    name = partition_name(table, month)
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MAINTENANCE_LOCK_ID})
+        await conn.execute(text(f"SET LOCAL lock_timeout = '{settings.partition_lock_timeout}s'"))
+
+        if default is not None:
+            # Block inserts into DEFAULT until the month's rows have left it
+            await conn.execute(text(f"LOCK TABLE {default} IN EXCLUSIVE MODE"))
+            absorbed = await conn.scalar(
+                text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_month_sql(month)})")
+            )
+        else:
+            absorbed = False
+
+        if not absorbed:
+            await conn.execute(text(create_partition_sql(table, month)))
+            return
+
+        await conn.execute(
+            text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        )
+        await conn.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {default} WHERE {in_month_sql(month)} RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved"
+            )
+        )
+        await conn.execute(
+            text(f"ALTER TABLE {table} ATTACH PARTITION {name} {partition_bounds_sql(month)}")
+        )
+        print(f"🗂️  Moved rows of {name} out of {default}")
+
+
+async def archive_partitions(
+    engine: AsyncEngine,
+    retention_months: int = settings.partition_retention_months,
+    today: Optional[date] = None,
+) -> List[str]:
+    """Detach partitions wholly older than `retention_months` into the archive schema"""
+    if engine.dialect.name != "postgresql" or retention_months <= 0:
+        return []
+
+    cutoff = add_months(month_start(today) if today else current_month(), -retention_months)
+    archived = []
+    for table in PARTITIONED_TABLES:
+        async with engine.connect() as conn:
+            partitions = await list_partitions(conn, table)
+
+        for name, bound in sorted(partitions, key=lambda partition: partition[1] or date.max):
+            if bound is None or bound > cutoff:
+                continue
+
+            await _archive_partition(engine, table, name)
+            archived.append(name)
+
+    return archived
+
+
+async def _archive_partition(engine: AsyncEngine, table: str, partition: str) -> None:
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        repo = ReceiptRepository(db)
+        await db.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MAINTENANCE_LOCK_ID})
+        await db.execute(text(f"SET LOCAL lock_timeout = '{settings.partition_lock_timeout}s'"))
+
+        if table == "receipts":
+            # Block writes to the partition so the counts match what is detached
+            await db.execute(text(f"LOCK TABLE {partition} IN SHARE MODE"))
+            counts = await db.execute(
+                text(f"SELECT user_id, status, COUNT(*) FROM {partition} GROUP BY user_id, status")
+            )
+            deltas = {(user_id, status): -count for user_id, status, count in counts.all()}
+            await repo.counters.apply(deltas)
+            repo.invalidate_later(user_ids={user_id for user_id, _ in deltas})
+
+        await db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition}"))
+        await db.execute(text(f"ALTER TABLE {partition} SET SCHEMA {ARCHIVE_SCHEMA}"))
+        await repo.commit()
+
+
+async def maintain_partitions(engine: AsyncEngine) -> None:
+    created = await ensure_partitions(engine)
+    archived = await archive_partitions(engine)
+    if created or archived:
+        print(f"🗂️  Partitions created: {created or '-'}, archived: {archived or '-'}")
+
+
+async def run_maintenance(
+    engine: AsyncEngine,
+    stop: asyncio.Event,
+    interval: float = settings.partition_maintenance_interval,
+) -> None:
+    """Run `maintain_partitions` now and every `interval` seconds until `stop` is set"""
+    while not stop.is_set():
+        try:
+            await maintain_partitions(engine)
+        except Exception as e:
+            print(f"⚠️  Partition maintenance failed: {e}")
+
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("command", choices=["ensure", "archive"])
+    parser.add_argument("--months-ahead", type=int, default=settings.partition_months_ahead)
+    parser.add_argument("--retention-months", type=int, default=settings.partition_retention_months)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "ensure":
+            names = await ensure_partitions(default_engine, args.months_ahead)
+        else:
+            names = await archive_partitions(default_engine, args.retention_months)
+        print(f"✅ {args.command}: {', '.join(names) or 'nothing to do'}")
+    finally:
+        await default_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+"""
+Per-request SQL instrumentation built on SQLAlchemy engine events.
+
+`QueryStatsMiddleware` opens a `QueryStats` for each HTTP request; every
+statement executed while it is active adds to its count and DB time. Totals
+go out as `X-DB-Query-Count` / `X-DB-Time-Ms` headers, statements slower than
+`slow_query_ms` go to the `app.sql.slow` log with parameters redacted, and a
+statement repeated `n_plus_one_threshold` times in one request is logged as a
+likely N+1.
+"""
+
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.metrics import DB_QUERY_DURATION
+
+slow_query_log = logging.getLogger("app.sql.slow")
+n_plus_one_log = logging.getLogger("app.sql.n_plus_one")
+
+_current: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_time: float = 0.0  # seconds
+    statements: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statements executed at least `threshold` times, the usual N+1 signature"""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Collect stats for statements executed in this context, e.g. one request or job"""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def redact_parameters(parameters: Any) -> str:
+    """Describe bound parameters by type only, so values never reach the log"""
+    if isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], dict):
+        return f"<{len(parameters)} parameter sets>"
+    if isinstance(parameters, dict):
+        return (
+            "{"
+            + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items())
+            + "}"
+        )
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+
+    return "<redacted>"
+
+
+def instrument_engine(engine: AsyncEngine | Engine, slow_query_ms: Optional[float] = None) -> None:
+    """Time every statement on `engine` and feed the active QueryStats and slow-query log"""
+    sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+    threshold = (slow_query_ms if slow_query_ms is not None else settings.slow_query_ms) / 1000
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["query_start"].pop()
+        DB_QUERY_DURATION.observe(duration)
+
+        stats = _current.get()
+        if stats is not None:
+            stats.record(statement, duration)
+
+        if duration >= threshold:
+            slow_query_log.warning(
+                "Slow query (%.1f ms): %s params=%s",
+                duration * 1000,
+                statement,
+                redact_parameters(parameters),
+            )
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        # Failed statements never reach after_cursor_execute
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start"):
+            connection.info["query_start"].pop()
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware reporting each request's SQL count and DB time"""
+
+    def __init__(self, app, n_plus_one_threshold: Optional[int] = None) -> None:
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold or settings.n_plus_one_threshold
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+
+            async def send_with_headers(message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-query-count", str(stats.count).encode()))
+                    headers.append((b"x-db-time-ms", f"{stats.total_time * 1000:.2f}".encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_headers)
+
+        for statement, times in stats.repeated(self.n_plus_one_threshold):
+            n_plus_one_log.warning(
+                "Possible N+1 in %s %s: statement ran %d times: %s",
+                scope["method"],
+                scope["path"],
+                times,
+                statement,
+            )
@@ -1,3 +1,5 @@
 from app.repository.receipt_repository import ReceiptRepository
+from app.repository.job_repository import JobRepository
+from app.repository.receipt_counter_repository import ReceiptCounterRepository
 
-__all__ = ["ReceiptRepository"]
+__all__ = ["ReceiptRepository", "JobRepository", "ReceiptCounterRepository"]
@@ -0,0 +1,172 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.jobs import Job
+from app.repository.receipt_repository import ReceiptRepository
+
+PROCESS_RECEIPT = "process_receipt"
+GENERATE_VARIANTS = "generate_variants"
+STORE_UPLOAD = "store_upload"  # hash and deduplicate a presigned upload
+
+# Job kinds whose progress is the receipt's status; the rest leave the status alone
+RECEIPT_STATUS_KINDS = frozenset({PROCESS_RECEIPT})
+
+
+def tracks_status(job: Job) -> bool:
+    return job.receipt_id is not None and job.kind in RECEIPT_STATUS_KINDS
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff after the given number of failed attempts"""
+    delay = settings.job_retry_backoff * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(delay, settings.job_retry_backoff_max))
+
+
+class JobRepository:
+    def __init__(self, db: AsyncSession) -> None:
+        self.db = db
+        self.receipt_repository = ReceiptRepository(db)
+
+    async def enqueue(
+        self,
+        kind: str,
+        receipt_ids: List[int],
+        payload: Optional[Dict[str, Any]] = None,
+        max_attempts: Optional[int] = None,
+        commit: bool = True,
+    ) -> None:
+        """
+        Queue one job per receipt in a single statement.
+
+        Pass commit=False to queue the jobs in the transaction that writes their
+        receipts, so a receipt is never committed without the job that processes it.
+        """
+        if not receipt_ids:
+            return
+
+        now = datetime.now(timezone.utc)
+        await self.db.execute(
+            insert(Job),
+            [
+                {
+                    "kind": kind,
+                    "receipt_id": receipt_id,
+                    "payload": payload,
+                    "status": "queued",
+                    "attempts": 0,
+                    "max_attempts": max_attempts or settings.job_max_attempts,
+                    "run_at": now,
+                }
+                for receipt_id in receipt_ids
+            ],
+        )
+        if commit:
+            await self.db.commit()
+
+    async def enqueue_processing(self, receipt_ids: List[int], commit: bool = True) -> None:
+        """Queue the variant and processing jobs of stored receipts"""
+        await self.enqueue(GENERATE_VARIANTS, receipt_ids, commit=False)
+        await self.enqueue(PROCESS_RECEIPT, receipt_ids, commit=commit)
+
+    async def claim(self, limit: int, visibility_timeout: Optional[int] = None) -> List[Job]:
+        """
+        Claim up to `limit` due jobs for this worker.
+
+        Rows locked by other workers are skipped rather than waited on, and running
+        jobs whose visibility timeout lapsed (crashed worker) become claimable again.
+        Receipts of claimed `RECEIPT_STATUS_KINDS` jobs move to `processing` in the
+        same transaction.
+        """
+        now = datetime.now(timezone.utc)
+        timeout = timedelta(seconds=visibility_timeout or settings.job_visibility_timeout)
+
+        result = await self.db.execute(
+            select(Job)
+            .where(
+                or_(
+                    and_(Job.status == "queued", Job.run_at <= now),
+                    and_(Job.status == "running", Job.locked_until < now),
+                )
+            )
+            .order_by(Job.run_at.asc(), Job.id.asc())
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        jobs = list(result.scalars().all())
+
+        for job in jobs:
+            job.status = "running"
+            job.attempts += 1
+            job.locked_until = now + timeout
+
+        await self.receipt_repository.update_status(
+            [job.receipt_id for job in jobs if tracks_status(job)],
+            "processing",
+            commit=False,
+        )
+        await self.receipt_repository.commit()
+
+        return jobs
+
+    async def extend_claim(self, job: Job, visibility_timeout: Optional[int] = None) -> bool:
+        """
+        Push back the visibility timeout of a job that is still running.
+
+        Only the claim that ran `job` is extended: once the job finished or another
+        worker reclaimed it (more attempts), nothing changes and False is returned.
+        """
+        timeout = timedelta(seconds=visibility_timeout or settings.job_visibility_timeout)
+        result = await self.db.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.status == "running", Job.attempts == job.attempts)
+            .values(locked_until=datetime.now(timezone.utc) + timeout)
+        )
+        await self.db.commit()
+
+        return result.rowcount > 0
+
+    async def complete(self, job: Job) -> bool:
+        """
+        Mark a job done and, for `RECEIPT_STATUS_KINDS`, its receipt processed.
+
+        Like `extend_claim`, only the claim that ran `job` counts: if it lapsed and
+        another worker reclaimed the job, nothing changes and False is returned.
+        """
+        result = await self.db.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.status == "running", Job.attempts == job.attempts)
+            .values(status="done", locked_until=None)
+        )
+        claimed = result.rowcount > 0
+        if claimed and tracks_status(job):
+            await self.receipt_repository.update_status([job.receipt_id], "processed", commit=False)
+        await self.receipt_repository.commit()
+
+        return claimed
+
+    async def fail(self, job: Job, error: str) -> bool:
+        """
+        Record a failed attempt; retry with backoff or dead-letter the job.
+
+        Returns True when the job was dead-lettered (and a tracked receipt marked `failed`).
+        """
+        dead = job.attempts >= job.max_attempts
+        values: Dict[str, Any] = {"last_error": error[:2000], "locked_until": None}
+
+        if dead:
+            values["status"] = "dead"
+        else:
+            values["status"] = "queued"
+            values["run_at"] = datetime.now(timezone.utc) + retry_delay(job.attempts)
+
+        await self.db.execute(update(Job).where(Job.id == job.id).values(**values))
+        if tracks_status(job):
+            await self.receipt_repository.update_status(
+                [job.receipt_id], "failed" if dead else "uploaded", commit=False
+            )
+        await self.receipt_repository.commit()
+
+        return dead
@@ -0,0 +1,162 @@
+from collections import Counter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+from sqlalchemy import bindparam, func, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.ocr_results import OcrResult
+from app.services.ocr_service import OcrText
+
+
+class OcrKey(NamedTuple):
+    content_hash: str
+    preprocess_version: int
+    engine_version: str
+
+
+class OcrStoreStats(NamedTuple):
+    preprocess_version: int
+    engine_version: str
+    results: int  # images recognized, one OCR call each
+    hits: int  # OCR calls saved
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.results
+        return self.hits / lookups if lookups else 0.0
+
+
+def _matches(key: OcrKey):
+    return (
+        OcrResult.content_hash == key.content_hash,
+        OcrResult.preprocess_version == key.preprocess_version,
+        OcrResult.engine_version == key.engine_version,
+    )
+
+
+class OcrHits:
+    """
+    Store hits counted in memory until `OcrResultRepository.flush_hits` writes them.
+
+    Counting with an UPDATE on every lookup would lock the result row until the
+    job commits, so workers processing copies of one image would queue on it.
+    """
+
+    def __init__(self) -> None:
+        self.pending: Counter[OcrKey] = Counter()
+
+    def add(self, key: OcrKey) -> None:
+        self.pending[key] += 1
+
+    def take(self) -> Counter[OcrKey]:
+        pending, self.pending = self.pending, Counter()
+        return pending
+
+
+# Hits of every repository in this process
+PENDING_HITS = OcrHits()
+
+
+class OcrResultRepository:
+    """
+    OCR results stored by image hash, preprocessing version and engine version.
+
+    Nothing here commits: new results join the caller's transaction, normally
+    the one completing the job. Hits are batched in `hits` and written by
+    `flush_hits` in a transaction of their own.
+    """
+
+    def __init__(self, db: AsyncSession, hits: Optional[OcrHits] = None) -> None:
+        self.db = db
+        self.hits = hits if hits is not None else PENDING_HITS
+
+    async def get(self, key: OcrKey) -> Optional[OcrResult]:
+        """Return the stored result for `key`, counting the hit, or None"""
+        result = await self.db.execute(select(OcrResult).where(*_matches(key)))
+        stored = result.scalar_one_or_none()
+        if stored is not None:
+            self.hits.add(key)
+
+        return stored
+
+    async def flush_hits(self) -> int:
+        """Add the pending hits to their results in one batch; return the results updated"""
+        pending = self.hits.take()
+        if not pending:
+            return 0
+
+        table = OcrResult.__table__
+        await self.db.execute(
+            update(table)
+            .where(
+                table.c.content_hash == bindparam("key_content_hash"),
+                table.c.preprocess_version == bindparam("key_preprocess_version"),
+                table.c.engine_version == bindparam("key_engine_version"),
+            )
+            .values(hits=table.c.hits + bindparam("key_hits"), last_hit_at=func.now()),
+            [
+                {
+                    "key_content_hash": key.content_hash,
+                    "key_preprocess_version": key.preprocess_version,
+                    "key_engine_version": key.engine_version,
+                    "key_hits": hits,
+                }
+                for key, hits in pending.items()
+            ],
+        )
+
+        return len(pending)
+
+    async def get_many(self, keys: Iterable[OcrKey]) -> Dict[OcrKey, OcrResult]:
+        """Stored results for several keys in one query; hits are not counted"""
+        keys = set(keys)
+        if not keys:
+            return {}
+
+        result = await self.db.execute(
+            select(OcrResult).where(
+                tuple_(
+                    OcrResult.content_hash, OcrResult.preprocess_version, OcrResult.engine_version
+                ).in_(keys)
+            )
+        )
+
+        return {
+            OcrKey(row.content_hash, row.preprocess_version, row.engine_version): row
+            for row in result.scalars().all()
+        }
+
+    async def save(self, key: OcrKey, text: OcrText, quality_metrics: Dict[str, Any]) -> None:
+        """Store a result; a result another worker stored first for the same key is kept"""
+        statement = self._insert().values(
+            **key._asdict(),
+            text=text.text,
+            lines=text.lines,
+            quality_metrics=quality_metrics,
+            hits=0,
+        )
+        await self.db.execute(statement.on_conflict_do_nothing())
+
+    async def stats(self) -> List[OcrStoreStats]:
+        """Stored results and hits per preprocessing and engine version"""
+        result = await self.db.execute(
+            select(
+                OcrResult.preprocess_version,
+                OcrResult.engine_version,
+                func.count(),
+                func.coalesce(func.sum(OcrResult.hits), 0),
+            )
+            .group_by(OcrResult.preprocess_version, OcrResult.engine_version)
+            .order_by(OcrResult.preprocess_version, OcrResult.engine_version)
+        )
+
+        return [OcrStoreStats(*row) for row in result.all()]
+
+    def _insert(self):
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert(OcrResult)
+        if dialect == "sqlite":
+            return sqlite.insert(OcrResult)
+
+        raise NotImplementedError(f"OCR results do not support {dialect}")
@@ -0,0 +1,61 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date
+from typing import Generic, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a page cursor cannot be decoded or does not match the query"""
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """
+    Position of a row in a keyset-paginated listing.
+
+    `backward` cursors select the page before the row (previous page) rather
+    than the page after it. Clients only ever see the encoded string.
+    """
+
+    id: int
+    purchase_date: Optional[date] = None
+    backward: bool = False
+
+    def encode(self) -> str:
+        data = {"id": self.id, "b": self.backward}
+        if self.purchase_date is not None:
+            data["pd"] = self.purchase_date.isoformat()
+
+        raw = json.dumps(data, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+    @classmethod
+    def decode(cls, token: str) -> "Cursor":
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            data = json.loads(raw)
+            purchase_date = date.fromisoformat(data["pd"]) if "pd" in data else None
+            return cls(id=int(data["id"]), purchase_date=purchase_date, backward=bool(data["b"]))
+        except (binascii.Error, ValueError, TypeError, KeyError) as e:
+            raise InvalidCursorError(f"Invalid cursor: {token}") from e
+
+    def key(self, by_purchase_date: bool) -> Tuple:
+        """Sort key values this cursor points at for the given ordering"""
+        if not by_purchase_date:
+            return (self.id,)
+        if self.purchase_date is None:
+            raise InvalidCursorError("Cursor does not match the purchase date filter")
+
+        return (self.purchase_date, self.id)
+
+
+@dataclass
+class Page(Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+    total: Optional[int] = None  # matching rows across all pages, when known
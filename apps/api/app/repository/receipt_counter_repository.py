@@ -0,0 +1,94 @@
+from collections import Counter
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.receipt_counters import ReceiptCounter
+from app.models.receipts import Receipt
+
+# (user_id, status) -> change in receipt count
+CounterDeltas = Mapping[Tuple[int, str], int]
+
+
+def count_deltas(rows: Iterable[Tuple[int, str]], sign: int = 1) -> Counter:
+    """Tally (user_id, status) pairs into counter deltas"""
+    deltas: Counter = Counter()
+    for user_id, status in rows:
+        deltas[(user_id, status)] += sign
+
+    return deltas
+
+
+class ReceiptCounterRepository:
+    """
+    Per-user, per-status receipt counts.
+
+    Writers call `apply` inside the transaction that inserts receipts or changes
+    their status, so counts commit or roll back together with the rows.
+    """
+
+    def __init__(self, db: AsyncSession) -> None:
+        self.db = db
+
+    async def apply(self, deltas: CounterDeltas) -> None:
+        """Add deltas to the counters without committing"""
+        changes = [
+            {"user_id": user_id, "status": status, "count": delta}
+            for (user_id, status), delta in sorted(deltas.items())  # fixed lock order
+            if delta
+        ]
+        if not changes:
+            return
+
+        statement = self._upsert()
+        statement = statement.on_conflict_do_update(
+            index_elements=[ReceiptCounter.user_id, ReceiptCounter.status],
+            set_={
+                "count": ReceiptCounter.count + statement.excluded.count,
+                "updated_at": func.now(),
+            },
+        )
+        await self.db.execute(statement, changes)
+
+    async def get(self, user_id: int) -> Dict[str, int]:
+        """Return the user's receipt count per status"""
+        result = await self.db.execute(
+            select(ReceiptCounter.status, ReceiptCounter.count).where(
+                ReceiptCounter.user_id == user_id, ReceiptCounter.count != 0
+            )
+        )
+
+        return {status: count for status, count in result.all()}
+
+    async def total(self, user_id: int, status: Optional[str] = None) -> int:
+        counts = await self.get(user_id)
+        if status is not None:
+            return counts.get(status, 0)
+
+        return sum(counts.values())
+
+    async def rebuild(self, user_id: Optional[int] = None) -> None:
+        """Recompute counters from the receipts table and commit, e.g. after a backfill"""
+        delete_counters = delete(ReceiptCounter)
+        count_receipts = select(Receipt.user_id, Receipt.status, func.count()).group_by(
+            Receipt.user_id, Receipt.status
+        )
+        if user_id is not None:
+            delete_counters = delete_counters.where(ReceiptCounter.user_id == user_id)
+            count_receipts = count_receipts.where(Receipt.user_id == user_id)
+
+        await self.db.execute(delete_counters)
+        await self.db.execute(
+            insert(ReceiptCounter).from_select(["user_id", "status", "count"], count_receipts)
+        )
+        await self.db.commit()
+
+    def _upsert(self):
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert(ReceiptCounter)
+        if dialect == "sqlite":
+            return sqlite.insert(ReceiptCounter)
+
+        raise NotImplementedError(f"Receipt counters do not support {dialect}")
@@ -0,0 +1,71 @@
+from typing import List, Optional, Sequence
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.receipt_items import ReceiptItem
+from app.repository.receipt_repository import retention_cutoff
+from app.services.item_categorizer import CategoryMatch
+from app.services.line_item_parser import LineItem
+
+
+class ReceiptItemRepository:
+    """
+    Parsed line items of receipts.
+
+    Nothing here commits: items are written in the transaction that stores the
+    rest of the parse (normally the one completing the job).
+    """
+
+    def __init__(self, db: AsyncSession) -> None:
+        self.db = db
+
+    async def replace(
+        self,
+        receipt_id: int,
+        items: Sequence[LineItem],
+        categories: Optional[Sequence[CategoryMatch]] = None,
+    ) -> None:
+        """
+        Replace a receipt's items with one DELETE and one INSERT.
+
+        The statement is fixed, so SQLAlchemy compiles it once; with RETURNING,
+        executemany sends all rows as a single multi-row INSERT ... VALUES.
+        `categories`, when given, holds one category match per item.
+        """
+        await self.db.execute(delete(ReceiptItem).where(ReceiptItem.receipt_id == receipt_id))
+
+        rows = [
+            {
+                "receipt_id": receipt_id,
+                "line_number": item.line_number,
+                "item_name": item.item_name,
+                "quantity": item.quantity,
+                "unit_price": item.unit_price,
+                "unit": item.unit,
+                "total_price": item.total_price,
+                "category_id": None,
+                "category_method": None,
+                "category_score": None,
+            }
+            for item in items
+        ]
+        for row, match in zip(rows, categories or ()):
+            row["category_id"] = match.category_id
+            row["category_method"] = match.match_method
+            row["category_score"] = match.match_score
+
+        if rows:
+            await self.db.execute(insert(ReceiptItem.__table__).returning(ReceiptItem.id), rows)
+
+    async def get_for_receipt(self, receipt_id: int) -> List[ReceiptItem]:
+        conditions = [ReceiptItem.receipt_id == receipt_id]
+        cutoff = retention_cutoff()
+        if cutoff:
+            # Items past the cutoff are archived with their receipts; prune those partitions
+            conditions.append(ReceiptItem.created_at >= cutoff)
+
+        result = await self.db.execute(
+            select(ReceiptItem).where(*conditions).order_by(ReceiptItem.line_number, ReceiptItem.id)
+        )
+
+        return list(result.scalars().all())
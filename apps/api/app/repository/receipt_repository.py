@@ -1,53 +1,470 @@
-from typing import List, Optional
+from datetime import date, datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, TypeVar
+import orjson
+from app.cache import Cache, get_receipt_cache
+from app.config import settings
+from app.database import read_from_primary
 from app.models.receipts import Receipt
+from app.repository.pagination import Cursor, Page
+from app.repository.receipt_counter_repository import ReceiptCounterRepository, count_deltas
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import Row, Select, delete, func, insert, select, tuple_, update, and_
+
+T = TypeVar("T")
+
+# Session.info key collecting cache scopes to retire once the transaction commits
+PENDING_INVALIDATIONS = "receipt_cache_invalidations"
+
+
+class ReceiptRow(NamedTuple):
+    """The columns every receipt response needs"""
+
+    id: int
+    user_id: int
+    image_path: str
+    purchase_date: date
+    status: str
+    created_at: datetime
+    content_hash: Optional[str]
+    thumbnail_path: Optional[str]
+    web_image_path: Optional[str]
+
+
+# Read paths select only these
+LIST_COLUMNS = tuple(getattr(Receipt, field) for field in ReceiptRow._fields)
+
+
+def receipt_scope(receipt_id: int) -> str:
+    return f"receipt:{receipt_id}"
+
+
+def user_scope(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def encode_row(row: ReceiptRow | Row) -> bytes:
+    return orjson.dumps(tuple(row))
+
+
+def decode_row(data: bytes | list) -> ReceiptRow:
+    values = orjson.loads(data) if isinstance(data, bytes) else data
+    row = ReceiptRow(*values)
+    return row._replace(
+        purchase_date=date.fromisoformat(row.purchase_date),
+        created_at=datetime.fromisoformat(row.created_at),
+    )
+
+
+def encode_page(page: Page) -> bytes:
+    return orjson.dumps(
+        {
+            "items": [tuple(row) for row in page.items],
+            "next_cursor": page.next_cursor,
+            "prev_cursor": page.prev_cursor,
+        }
+    )
+
+
+def decode_page(data: bytes) -> Page[ReceiptRow]:
+    values = orjson.loads(data)
+    return Page(
+        items=[decode_row(row) for row in values["items"]],
+        next_cursor=values["next_cursor"],
+        prev_cursor=values["prev_cursor"],
+    )
+
+
+def retention_cutoff() -> Optional[datetime]:
+    """
+    Start of the oldest month queries cover, None when nothing is archived.
+
+    Every read filters on `created_at >= retention_cutoff()`, so PostgreSQL
+    prunes the monthly partitions before it (the ones `app.partitions` is about
+    to archive) instead of probing each of them.
+    """
+    months = settings.partition_retention_months
+    if months <= 0:
+        return None
+
+    now = datetime.now(timezone.utc)
+    index = now.year * 12 + now.month - 1 - months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def retained(*conditions) -> List:
+    """`conditions` plus the retention cutoff on the `created_at` partition key"""
+    cutoff = retention_cutoff()
+    return [*conditions, Receipt.created_at >= cutoff] if cutoff else list(conditions)
+
+
+class InsertedReceipt(NamedTuple):
+    id: int
+    created_at: datetime
 
 
 class ReceiptRepository:
-    def __init__(self, db: AsyncSession) -> None:
+    def __init__(self, db: AsyncSession, cache: Optional[Cache] = None) -> None:
         self.db = db
+        self.counters = ReceiptCounterRepository(db)
+        self.cache = cache if cache is not None else get_receipt_cache()
 
-    async def save(self, receipt: Receipt) -> Receipt:
-        """Save a single receipt and return it"""
-        self.db.add(receipt)
+    async def commit(self) -> None:
+        """Commit, then retire cached reads of every receipt and listing the transaction touched"""
         await self.db.commit()
+
+        scopes = self.db.info.pop(PENDING_INVALIDATIONS, None)
+        if scopes:
+            await self.cache.invalidate(scopes)
+
+    def invalidate_later(
+        self, receipt_ids: Iterable[int] = (), user_ids: Iterable[int] = ()
+    ) -> None:
+        """Queue cache invalidations for the next `commit`"""
+        scopes = self.db.info.setdefault(PENDING_INVALIDATIONS, set())
+        scopes.update(receipt_scope(receipt_id) for receipt_id in receipt_ids)
+        scopes.update(user_scope(user_id) for user_id in user_ids)
+
+    async def save(self, receipt: Receipt, commit: bool = True) -> Receipt:
+        """Save a single receipt and return it; pass commit=False to join a larger transaction"""
+        self.db.add(receipt)
+        await self.db.flush()
+        await self.counters.apply(count_deltas([(receipt.user_id, receipt.status)]))
+        self.invalidate_later(user_ids=[receipt.user_id])
+        if commit:
+            await self.commit()
         await self.db.refresh(receipt)
 
         return receipt
 
-    async def save_many(self, receipts: List[Receipt]) -> int:
+    async def save_many(self, receipts: List[Receipt], commit: bool = True) -> int:
         """Save multiple receipts and return the number of rows inserted"""
         self.db.add_all(receipts)
-        await self.db.commit()
+        await self.db.flush()
+        await self.counters.apply(count_deltas((r.user_id, r.status) for r in receipts))
+        self.invalidate_later(user_ids={receipt.user_id for receipt in receipts})
+        if commit:
+            await self.commit()
 
         return len(receipts)
 
+    async def bulk_insert(
+        self, rows: List[Dict[str, Any]], chunk_size: Optional[int] = None
+    ) -> List[InsertedReceipt]:
+        """
+        Insert many receipts with multi-row INSERT ... RETURNING and return their ids.
+
+        Rows are plain column dicts, so no ORM objects are built or tracked. Large
+        batches are sent in chunks within one transaction; results keep input order.
+        """
+        chunk_size = chunk_size or settings.bulk_insert_chunk_size
+        statement = insert(Receipt).returning(
+            Receipt.id, Receipt.created_at, sort_by_parameter_order=True
+        )
+        inserted: List[InsertedReceipt] = []
+
+        try:
+            for start in range(0, len(rows), chunk_size):
+                result = await self.db.execute(statement, rows[start : start + chunk_size])
+                inserted.extend(InsertedReceipt(*row) for row in result.all())
+
+            await self.counters.apply(
+                count_deltas((row["user_id"], row.get("status") or "uploaded") for row in rows)
+            )
+            self.invalidate_later(user_ids={row["user_id"] for row in rows})
+            await self.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+
+        return inserted
+
     async def get_by_id(self, receipt_id: int) -> Receipt | None:
-        result = await self.db.execute(select(Receipt).where(Receipt.id == receipt_id))
+        result = await self.db.execute(select(Receipt).where(*retained(Receipt.id == receipt_id)))
 
         return result.scalar_one_or_none()
 
-    async def get_all(self, params: dict) -> List[Receipt]:
+    async def get_by_ids(self, user_id: int, receipt_ids: Iterable[int]) -> List[Receipt]:
+        """Return the user's receipts with the given ids, in one query"""
+        receipt_ids = set(receipt_ids)
+        if not receipt_ids:
+            return []
+
+        result = await self.db.execute(
+            select(Receipt).where(
+                *retained(Receipt.user_id == user_id, Receipt.id.in_(receipt_ids))
+            )
+        )
+
+        return list(result.scalars().all())
+
+    async def set_status(self, receipts: List[Receipt], status: str, commit: bool = True) -> None:
+        """Move receipts to `status`; loaded receipts are updated in place"""
+        await self.update_status([receipt.id for receipt in receipts], status, commit=commit)
+
+    async def update_status(self, receipt_ids: List[int], status: str, commit: bool = True) -> None:
+        """Move receipts to `status` by id; pass commit=False to join a larger transaction"""
+        if receipt_ids:
+            # Lock the rows that actually change so their old status feeds the counters
+            result = await self.db.execute(
+                select(Receipt.id, Receipt.user_id, Receipt.status)
+                .where(Receipt.id.in_(receipt_ids), Receipt.status != status)
+                .with_for_update()
+            )
+            changed = result.all()
+
+            if changed:
+                await self.db.execute(
+                    update(Receipt)
+                    .where(Receipt.id.in_([row.id for row in changed]))
+                    .values(status=status)
+                )
+                deltas = count_deltas(((row.user_id, row.status) for row in changed), sign=-1)
+                deltas.update(count_deltas((row.user_id, status) for row in changed))
+                await self.counters.apply(deltas)
+                self.invalidate_later(
+                    receipt_ids=[row.id for row in changed],
+                    user_ids={row.user_id for row in changed},
+                )
+
+        if commit:
+            await self.commit()
 
+    async def delete(self, receipts: List[Receipt], commit: bool = True) -> None:
+        """Delete receipts; pass commit=False to join a larger transaction"""
+        if receipts:
+            await self.db.execute(
+                delete(Receipt).where(Receipt.id.in_([receipt.id for receipt in receipts]))
+            )
+            await self.counters.apply(
+                count_deltas(((r.user_id, r.status) for r in receipts), sign=-1)
+            )
+            self.invalidate_later(
+                receipt_ids=[receipt.id for receipt in receipts],
+                user_ids={receipt.user_id for receipt in receipts},
+            )
+
+        if commit:
+            await self.commit()
+
+    async def set_image_variants(
+        self,
+        receipt_ids: List[int],
+        thumbnail_path: str,
+        web_image_path: str,
+        commit: bool = True,
+    ) -> None:
+        """Record generated image variants on receipts"""
+        result = await self.db.execute(
+            update(Receipt)
+            .where(Receipt.id.in_(receipt_ids))
+            .values(thumbnail_path=thumbnail_path, web_image_path=web_image_path)
+            .returning(Receipt.user_id)
+        )
+        self.invalidate_later(receipt_ids, set(result.scalars().all()))
+        if commit:
+            await self.commit()
+
+    async def set_content_hash(
+        self,
+        receipt_id: int,
+        content_hash: str,
+        image_path: Optional[str] = None,
+        commit: bool = True,
+    ) -> None:
+        """Record the image hash of a receipt, and its new path if the image moved"""
+        values: Dict[str, Any] = {"content_hash": content_hash}
+        if image_path is not None:
+            values["image_path"] = image_path
+        result = await self.db.execute(
+            update(Receipt)
+            .where(Receipt.id == receipt_id)
+            .values(**values)
+            .returning(Receipt.user_id)
+        )
+        self.invalidate_later([receipt_id], set(result.scalars().all()))
+        if commit:
+            await self.commit()
+
+    async def set_processing_results(
+        self,
+        receipt_id: int,
+        quality_metrics: Dict[str, Any],
+        parse_confidence: Optional[float] = None,
+        commit: bool = True,
+    ) -> None:
+        """Record image quality metrics and parser confidence; neither is part of cached rows"""
+        await self.db.execute(
+            update(Receipt)
+            .where(Receipt.id == receipt_id)
+            .values(quality_metrics=quality_metrics, parse_confidence=parse_confidence)
+        )
+        if commit:
+            await self.commit()
+
+    async def get_by_content_hash(self, user_id: int, content_hash: str) -> Receipt | None:
+        """Return the user's earliest receipt with the given image hash"""
+        receipts = await self.get_by_content_hashes(user_id, [content_hash])
+
+        return receipts.get(content_hash)
+
+    async def get_by_content_hashes(
+        self, user_id: int, content_hashes: Iterable[str]
+    ) -> Dict[str, Receipt]:
+        """Map each image hash to the user's earliest receipt with it, in one query"""
+        content_hashes = set(content_hashes)
+        if not content_hashes:
+            return {}
+
+        result = await self.db.execute(
+            select(Receipt)
+            .where(*retained(Receipt.user_id == user_id, Receipt.content_hash.in_(content_hashes)))
+            .order_by(Receipt.id.asc())
+        )
+
+        receipts: Dict[str, Receipt] = {}
+        for receipt in result.scalars():
+            receipts.setdefault(receipt.content_hash, receipt)
+
+        return receipts
+
+    async def get_all(self, params: dict) -> Page[Receipt]:
+        """
+        Return one newest-first page of receipts using keyset pagination.
+
+        Pages are ordered by id, or by (purchase_date, id) when a purchase date
+        range is given, so every filter combination walks one composite index
+        and a page costs the same at any depth. `cursor` comes from a previous
+        page's `next_cursor` or `prev_cursor`.
+        """
+        return await self.__get_page(select(Receipt), params, entities=True)
+
+    async def get_rows(self, params: dict) -> Page[Row | ReceiptRow]:
+        """
+        Same page as `get_all`, as plain `LIST_COLUMNS` rows for read-only responses.
+
+        Rows skip ORM hydration and the identity map, which dominate the cost of
+        large listings. A user's unfiltered first page is served from the cache.
+        """
+
+        async def load() -> Page[Row]:
+            return await self.__get_page(select(*LIST_COLUMNS), params, entities=False)
+
+        filtered = any(
+            params.get(name) is not None
+            for name in ("cursor", "status", "purchase_date_from", "purchase_date_to")
+        )
+        if filtered or "user_id" not in params:
+            return await load()
+
+        return await self.cache.get_or_load(
+            user_scope(params["user_id"]),
+            f"first:{int(params.get('limit', 5))}",
+            load,
+            encode_page,
+            decode_page,
+            load_primary=self.__on_primary(load),
+        )
+
+    async def get_row_by_id(self, receipt_id: int) -> Row | ReceiptRow | None:
+        """Response columns of one receipt, served from the cache when possible"""
+
+        async def load() -> Row | None:
+            result = await self.db.execute(
+                select(*LIST_COLUMNS).where(*retained(Receipt.id == receipt_id))
+            )
+            return result.one_or_none()
+
+        return await self.cache.get_or_load(
+            receipt_scope(receipt_id),
+            "row",
+            load,
+            encode_row,
+            decode_row,
+            load_primary=self.__on_primary(load),
+        )
+
+    def __on_primary(self, load: Callable[[], Awaitable[T]]) -> Callable[[], Awaitable[T]]:
+        """`load` with the session moved off its read replica first"""
+
+        async def load_primary() -> T:
+            read_from_primary(self.db)
+            return await load()
+
+        return load_primary
+
+    async def __get_page(self, statement: Select, params: dict, entities: bool) -> Page:
         # pagination params
-        last_id: Optional[int] = params.get("last_id")
+        cursor: Optional[Cursor] = params.get("cursor")
         limit: int = int(params.get("limit", 5))
 
+        by_purchase_date = (
+            params.get("purchase_date_from") is not None
+            or params.get("purchase_date_to") is not None
+        )
+        key_columns = [Receipt.purchase_date, Receipt.id] if by_purchase_date else [Receipt.id]
+        backward = cursor is not None and cursor.backward
+
         conditions = self.__get_conditions(params)
 
-        if last_id is not None:
-            conditions.append(Receipt.id > last_id)
+        if cursor is not None:
+            position = tuple_(*key_columns)
+            bound = tuple_(*cursor.key(by_purchase_date))
+            conditions.append(position > bound if backward else position < bound)
 
+        order_by = [column.asc() if backward else column.desc() for column in key_columns]
         result = await self.db.execute(
-            select(Receipt).where(and_(*conditions)).order_by(Receipt.id.asc()).limit(limit)
+            statement.where(and_(*conditions)).order_by(*order_by).limit(limit + 1)
         )
+        receipts = list(result.scalars().all() if entities else result.all())
 
-        return list(result.scalars().all())
+        # One extra row tells whether there is another page in the direction of travel
+        has_more = len(receipts) > limit
+        receipts = receipts[:limit]
+        if backward:
+            receipts.reverse()
+
+        has_next = cursor is not None if backward else has_more
+        has_prev = has_more if backward else cursor is not None
+
+        page = Page(items=receipts)
+        if receipts and has_next:
+            page.next_cursor = self.__cursor(receipts[-1], by_purchase_date).encode()
+        if receipts and has_prev:
+            page.prev_cursor = self.__cursor(receipts[0], by_purchase_date, backward=True).encode()
+
+        return page
+
+    async def count(self, params: dict) -> int:
+        """
+        Count receipts matching the `get_all` filters.
+
+        Served from the per-user counters unless a purchase date range is given,
+        which only the (user_id, purchase_date, id) indexes can answer.
+        """
+        if params.get("purchase_date_from") is None and params.get("purchase_date_to") is None:
+            return await self.counters.total(params["user_id"], params.get("status"))
+
+        result = await self.db.execute(
+            select(func.count()).select_from(Receipt).where(and_(*self.__get_conditions(params)))
+        )
+
+        return result.scalar_one()
 
     def __get_conditions(self, params: dict) -> List:
-        conditions = []
+        conditions = retained()
         if "user_id" in params:
             conditions.append(Receipt.user_id == params["user_id"])
+        if params.get("status") is not None:
+            conditions.append(Receipt.status == params["status"])
+        if params.get("purchase_date_from") is not None:
+            conditions.append(Receipt.purchase_date >= params["purchase_date_from"])
+        if params.get("purchase_date_to") is not None:
+            conditions.append(Receipt.purchase_date <= params["purchase_date_to"])
 
         return conditions
+
+    def __cursor(
+        self, receipt: Receipt | Row, by_purchase_date: bool, backward: bool = False
+    ) -> Cursor:
+        purchase_date = receipt.purchase_date if by_purchase_date else None
+        return Cursor(id=receipt.id, purchase_date=purchase_date, backward=backward)
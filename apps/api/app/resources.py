@@ -0,0 +1,82 @@
+from dataclasses import dataclass
+from fastapi import HTTPException, Request
+from qdrant_client import AsyncQdrantClient
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.cache import get_receipt_cache
+from app.config import settings
+from app.database import engine, replicas, warm_pool
+from app.services.image_url_service import ImageUrlService
+from app.services.storage_service import StorageService, create_storage_service
+
+
+@dataclass
+class Resources:
+    """Clients shared by every request, created once per process in the app lifespan"""
+
+    engine: AsyncEngine
+    storage: StorageService
+    qdrant: AsyncQdrantClient
+    image_urls: ImageUrlService
+
+
+def create_qdrant_client() -> AsyncQdrantClient:
+    return AsyncQdrantClient(
+        url=settings.qdrant_url,
+        timeout=settings.qdrant_timeout,
+        pool_size=settings.qdrant_pool_size,
+        check_compatibility=False,  # checked during warm-up instead of blocking here
+    )
+
+
+async def open_resources() -> Resources:
+    """Create shared clients and warm their connection pools"""
+    storage = create_storage_service()
+    resources = Resources(
+        engine=engine,
+        storage=storage,
+        qdrant=create_qdrant_client(),
+        image_urls=ImageUrlService(storage),
+    )
+
+    await warm_pool(resources.engine, settings.db_pool_warm)
+    await resources.storage.ensure_bucket()
+
+    try:
+        await resources.qdrant.get_collections()
+    except Exception as e:
+        print(f"⚠️  Qdrant warm-up failed: {e}")
+
+    return resources
+
+
+async def close_resources(resources: Resources) -> None:
+    """Release pooled connections held by shared clients"""
+    await resources.storage.close()
+    await resources.qdrant.close()
+    await get_receipt_cache().close()
+    await replicas.dispose()
+    await resources.engine.dispose()
+
+
+def get_resources(request: Request) -> Resources:
+    resources = getattr(request.app.state, "resources", None)
+    if resources is None:
+        raise HTTPException(status_code=503, detail="Application resources are not initialized")
+
+    return resources
+
+
+def get_storage_service(request: Request) -> StorageService:
+    """Dependency to get the shared StorageService instance"""
+    return get_resources(request).storage
+
+
+def get_qdrant_client(request: Request) -> AsyncQdrantClient:
+    """Dependency to get the shared Qdrant client"""
+    return get_resources(request).qdrant
+
+
+def get_image_url_service(request: Request) -> ImageUrlService:
+    """Dependency to get the shared ImageUrlService and its URL cache"""
+    return get_resources(request).image_urls
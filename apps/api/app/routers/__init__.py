@@ -1,4 +1,5 @@
 from app.routers.health import router as health_router
+from app.routers.metrics import router as metrics_router
 from app.routers.receipts import router as receipt_router
 
-__all__ = ["health_router", "receipt_router"]
+__all__ = ["health_router", "metrics_router", "receipt_router"]
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+
+from app.metrics import CONTENT_TYPE, REGISTRY
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -1,29 +1,39 @@
 from datetime import date
-from typing import List
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from typing import List, Optional
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app.routers.response.receipt import ReceiptResponse, ReceiptsResponse, ReceiptsUploadResponse
-from app.services.minio_service import MinioService
-from app.services.receipt_service import ReceiptService
-
+from app.database import get_db, get_read_db
+from app.routers.request.receipt import FinalizeUploadsRequest, PresignUploadsRequest
+from app.routers.response.receipt import (
+    FinalizeUploadResult,
+    FinalizeUploadsResponse,
+    PresignedUploadResponse,
+    PresignedUploadsResponse,
+    ReceiptResponse,
+    ReceiptsResponse,
+    ReceiptStatsResponse,
+    ReceiptsUploadResponse,
+    ReceiptUploadResult,
+    receipt_payload,
+)
+from app.routers.response.encoding import JSONBytesResponse
+from app.resources import get_image_url_service, get_storage_service
+from app.services.image_url_service import ImageUrlService
+from app.services.storage_service import StorageService
+from app.services.receipt_service import DirectUpload, DuplicatePolicy, ReceiptService
 
 router = APIRouter(prefix="/receipts", tags=["receipts"])
 
 
-def get_minio_service() -> MinioService:
-    """Dependency to get MinioService instance"""
-    return MinioService()
-
-
 @router.post("", status_code=201, response_model=ReceiptResponse)
 async def upload_receipt(
     file: UploadFile = File(...),
     purchase_date: date = Form(...),
     user_id: int = Form(1),
+    on_duplicate: DuplicatePolicy = Form("link"),
     db: AsyncSession = Depends(get_db),
-    minio_service: MinioService = Depends(get_minio_service),
+    storage_service: StorageService = Depends(get_storage_service),
 ):
     """
     Upload receipt image
@@ -31,18 +41,16 @@ async def upload_receipt(
     - **file**: Image file (jpg/png/jpeg)
     - **purchase_date**: Date of purchase
     - **user_id**: User ID (default: 1)
+    - **on_duplicate**: `link` returns the existing receipt with 200, `reject` returns 409
     """
 
-    receipt_service = ReceiptService(db, minio_service)
-    receipt = await receipt_service.upload_receipt(file, purchase_date, user_id)
+    receipt_service = ReceiptService(db, storage_service)
+    receipt, duplicate = await receipt_service.upload_receipt(
+        file, purchase_date, user_id, on_duplicate
+    )
 
-    return ReceiptResponse(
-        id=receipt.id,
-        user_id=receipt.user_id,
-        image_path=receipt.image_path,
-        purchase_date=str(receipt.purchase_date),
-        status=receipt.status,
-        created_at=receipt.created_at.isoformat() if receipt.created_at else "",
+    return JSONBytesResponse(
+        receipt_payload(receipt, duplicate=duplicate), status_code=200 if duplicate else 201
     )
 
 
@@ -51,8 +59,9 @@ async def upload_receipts(
     files: List[UploadFile] = File(...),
     purchase_date: date = Form(...),
     user_id: int = Form(1),
+    on_duplicate: DuplicatePolicy = Form("link"),
     db: AsyncSession = Depends(get_db),
-    minio_service: MinioService = Depends(get_minio_service),
+    storage_service: StorageService = Depends(get_storage_service),
 ):
     """
     Upload multiple receipt images
@@ -60,65 +69,195 @@ async def upload_receipts(
     - **files**: List of image files (jpg/png/jpeg)
     - **purchase_date**: Date of purchase
     - **user_id**: User ID (default: 1)
+    - **on_duplicate**: `link` reports the existing receipt id, `reject` fails the file
+
+    Returns a per-file report; files that fail are skipped and the rest are saved.
     """
 
-    receipt_service = ReceiptService(db, minio_service)
-    total = await receipt_service.upload_receipts(files, purchase_date, user_id)
+    receipt_service = ReceiptService(db, storage_service)
+    results = await receipt_service.upload_receipts(files, purchase_date, user_id, on_duplicate)
+
+    succeeded = sum(1 for result in results if result.success)
 
-    return ReceiptsUploadResponse(total=total)
+    return ReceiptsUploadResponse(
+        total=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=[
+            ReceiptUploadResult(
+                filename=result.filename,
+                success=result.success,
+                id=result.receipt_id,
+                image_path=result.image_path,
+                error=result.error,
+                duplicate=result.duplicate,
+            )
+            for result in results
+        ],
+    )
+
+
+@router.post("/uploads", status_code=201, response_model=PresignedUploadsResponse)
+async def create_uploads(
+    request: PresignUploadsRequest,
+    db: AsyncSession = Depends(get_db),
+    storage_service: StorageService = Depends(get_storage_service),
+):
+    """
+    Start direct-to-storage uploads
+
+    Creates a `pending` receipt per file and returns presigned PUT URLs. Clients
+    upload the bytes to those URLs, then call `/receipts/uploads/finalize`.
+    """
+
+    receipt_service = ReceiptService(db, storage_service)
+    uploads = await receipt_service.create_presigned_uploads(
+        [DirectUpload(f.filename, f.content_type, f.size) for f in request.files],
+        request.purchase_date,
+        request.user_id,
+    )
+
+    return PresignedUploadsResponse(
+        uploads=[
+            PresignedUploadResponse(
+                receipt_id=upload.receipt.id,
+                filename=file.filename,
+                image_path=upload.receipt.image_path,
+                upload_url=upload.upload_url,
+                expires_at=upload.expires_at.isoformat(),
+            )
+            for upload, file in zip(uploads, request.files)
+        ]
+    )
+
+
+@router.post("/uploads/finalize", response_model=FinalizeUploadsResponse)
+async def finalize_uploads(
+    request: FinalizeUploadsRequest,
+    db: AsyncSession = Depends(get_db),
+    storage_service: StorageService = Depends(get_storage_service),
+):
+    """
+    Finish direct-to-storage uploads
+
+    Checks each object exists with the announced size and type and moves its
+    receipt from `pending` to `uploaded`. Mismatched objects are deleted and the
+    receipt is marked `failed`.
+
+    The worker then stores the image by content hash as with `/receipts`,
+    without the API reading it. For an image the user already has,
+    `on_duplicate=link` deletes the new receipt in favour of the existing one;
+    `reject` marks it `failed`.
+    """
+
+    receipt_service = ReceiptService(db, storage_service)
+    results = await receipt_service.finalize_uploads(
+        request.receipt_ids, request.user_id, request.on_duplicate
+    )
+
+    return FinalizeUploadsResponse(
+        results=[
+            FinalizeUploadResult(
+                receipt_id=result.receipt_id,
+                success=result.error is None,
+                status=result.status,
+                error=result.error,
+            )
+            for result in results
+        ]
+    )
 
 
 @router.get("", response_model=ReceiptsResponse)
 async def list_receipts(
-    last_id: int = -1, limit: int = 50, user_id: int = 1, db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    user_id: int = 1,
+    status: Optional[str] = None,
+    purchase_date_from: Optional[date] = None,
+    purchase_date_to: Optional[date] = None,
+    db: AsyncSession = Depends(get_read_db),
+    storage_service: StorageService = Depends(get_storage_service),
+    image_url_service: ImageUrlService = Depends(get_image_url_service),
 ):
     """
     Get all receipts for a user
 
     - **user_id**: User ID (default = 1)
+    - **cursor**: `next_cursor` or `prev_cursor` from a previous page
+    - **status**: Only receipts with this status
+    - **purchase_date_from** / **purchase_date_to**: Inclusive purchase date range;
+      when set, pages are ordered by purchase date instead of upload order
+
+    Receipts come newest first. Each carries a `thumbnail_url` for previews; full
+    images are on the detail route.
     """
 
-    receipt_service = ReceiptService(db)
-    receipts = await receipt_service.get_receipts(user_id, last_id, limit)
+    receipt_service = ReceiptService(db, storage_service)
+    page = await receipt_service.get_receipts(
+        user_id, cursor, limit, status, purchase_date_from, purchase_date_to
+    )
+    receipts = page.items
+    thumbnail_urls = await image_url_service.get_urls(
+        receipt.thumbnail_path for receipt in receipts if receipt.status != "pending"
+    )
+
+    return JSONBytesResponse(
+        {
+            "total": page.total if page.total is not None else len(receipts),
+            "receipts": [
+                receipt_payload(receipt, thumbnail_url=thumbnail_urls.get(receipt.thumbnail_path))
+                for receipt in receipts
+            ],
+            "next_cursor": page.next_cursor,
+            "prev_cursor": page.prev_cursor,
+        }
+    )
+
 
-    responses = [
-        ReceiptResponse(
-            id=receipt.id,
-            user_id=receipt.user_id,
-            image_path=receipt.image_path,
-            purchase_date=str(receipt.purchase_date),
-            status=receipt.status,
-            created_at=receipt.created_at.isoformat() if receipt.created_at else "",
-        )
-        for receipt in receipts
-    ]
+@router.get("/stats", response_model=ReceiptStatsResponse)
+async def receipt_stats(
+    user_id: int = 1,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Get receipt counts for a user
+
+    - **user_id**: User ID (default = 1)
+
+    Read from per-user counters, so the cost does not grow with the number of receipts.
+    """
 
-    last_id = -1
-    if len(responses) > 0:
-        last_id = responses[-1].id
+    receipt_service = ReceiptService(db)
+    by_status = await receipt_service.get_stats(user_id)
 
-    return ReceiptsResponse(total=len(responses), receipts=responses, last_id=last_id)
+    return ReceiptStatsResponse(user_id=user_id, total=sum(by_status.values()), by_status=by_status)
 
 
 @router.get("/{id}", response_model=ReceiptResponse)
-async def get_receipt(id: int, db: AsyncSession = Depends(get_db)):
+async def get_receipt(
+    id: int,
+    db: AsyncSession = Depends(get_read_db),
+    storage_service: StorageService = Depends(get_storage_service),
+    image_url_service: ImageUrlService = Depends(get_image_url_service),
+):
     """
     Get receipt by id
 
     - **id**: Id of receipt
+
+    `image_url` points at the web-size variant when it exists, else the original.
     """
 
-    receipt_service = ReceiptService(db)
-    receipt = await receipt_service.get(id)
+    receipt_service = ReceiptService(db, storage_service)
+    receipt = await receipt_service.get_row(id)
 
     if not receipt:
         raise HTTPException(status_code=404, detail=f"Receipt with id {id} not found")
 
-    return ReceiptResponse(
-        id=receipt.id,
-        user_id=receipt.user_id,
-        image_path=receipt.image_path,
-        purchase_date=str(receipt.purchase_date),
-        status=receipt.status,
-        created_at=receipt.created_at.isoformat() if receipt.created_at else "",
-    )
+    image_url = thumbnail_url = None
+    if receipt.status != "pending":
+        image_url = await image_url_service.get_url(receipt.web_image_path or receipt.image_path)
+        thumbnail_url = await image_url_service.get_url(receipt.thumbnail_path)
+
+    return JSONBytesResponse(receipt_payload(receipt, image_url, thumbnail_url))
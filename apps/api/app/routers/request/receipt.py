@@ -0,0 +1,21 @@
+from datetime import date
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+
+
+class UploadFileInfo(BaseModel):
+    filename: Optional[str] = None
+    content_type: str
+    size: int = Field(gt=0)
+
+
+class PresignUploadsRequest(BaseModel):
+    user_id: int = 1
+    purchase_date: date
+    files: List[UploadFileInfo] = Field(min_length=1)
+
+
+class FinalizeUploadsRequest(BaseModel):
+    user_id: int = 1
+    receipt_ids: List[int] = Field(min_length=1)
+    on_duplicate: Literal["link", "reject"] = "link"
@@ -0,0 +1,17 @@
+from typing import Any
+import orjson
+from fastapi import Response
+
+
+class JSONBytesResponse(Response):
+    """
+    JSON response encoded with orjson.
+
+    Handlers return it with plain dicts to skip a second pydantic pass; the
+    route's `response_model` still documents the shape in OpenAPI.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import List
+from typing import Any, Dict, List, Optional
 
 
 class ReceiptResponse(BaseModel):
@@ -11,13 +11,88 @@ class ReceiptResponse(BaseModel):
     purchase_date: str
     status: str
     created_at: str
+    content_hash: Optional[str] = None
+    thumbnail_path: Optional[str] = None
+    web_image_path: Optional[str] = None
+    image_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    duplicate: bool = False
+
+
+def receipt_payload(
+    receipt: Any,
+    image_url: Optional[str] = None,
+    thumbnail_url: Optional[str] = None,
+    duplicate: bool = False,
+) -> Dict[str, Any]:
+    """
+    `ReceiptResponse` fields for a Receipt or a `LIST_COLUMNS` row.
+
+    Dates stay native; `JSONBytesResponse` encodes them in ISO format.
+    """
+    return {
+        "id": receipt.id,
+        "user_id": receipt.user_id,
+        "image_path": receipt.image_path,
+        "purchase_date": receipt.purchase_date,
+        "status": receipt.status,
+        "created_at": receipt.created_at or "",
+        "content_hash": receipt.content_hash,
+        "thumbnail_path": receipt.thumbnail_path,
+        "web_image_path": receipt.web_image_path,
+        "image_url": image_url,
+        "thumbnail_url": thumbnail_url,
+        "duplicate": duplicate,
+    }
+
+
+class ReceiptUploadResult(BaseModel):
+    filename: Optional[str]
+    success: bool
+    id: Optional[int] = None
+    image_path: Optional[str] = None
+    error: Optional[str] = None
+    duplicate: bool = False
 
 
 class ReceiptsUploadResponse(BaseModel):
     total: int
+    succeeded: int
+    failed: int
+    results: List[ReceiptUploadResult]
 
 
 class ReceiptsResponse(BaseModel):
-    total: int
+    total: int  # receipts matching the filters across all pages
     receipts: List[ReceiptResponse]
-    last_id: int
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+class PresignedUploadResponse(BaseModel):
+    receipt_id: int
+    filename: Optional[str]
+    image_path: str
+    upload_url: str
+    expires_at: str
+
+
+class PresignedUploadsResponse(BaseModel):
+    uploads: List[PresignedUploadResponse]
+
+
+class FinalizeUploadResult(BaseModel):
+    receipt_id: int
+    success: bool
+    status: Optional[str] = None
+    error: Optional[str] = None
+
+
+class FinalizeUploadsResponse(BaseModel):
+    results: List[FinalizeUploadResult]
+
+
+class ReceiptStatsResponse(BaseModel):
+    user_id: int
+    total: int
+    by_status: Dict[str, int]
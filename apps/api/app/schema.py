@@ -0,0 +1,47 @@
+"""
+Schema version check.
+
+DDL runs only through the Alembic migrations in `migrations/`, as a separate
+deploy step (`alembic upgrade head`). App and worker processes never create
+or alter tables; at startup they read the database's revision and refuse to
+start unless it is the newest revision shipped with the code.
+"""
+
+from pathlib import Path
+from typing import Optional
+
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+
+class SchemaVersionError(RuntimeError):
+    """Raised when the database is not at the revision the code expects"""
+
+
+def head_revision() -> str:
+    """Newest migration revision shipped with this code"""
+    return ScriptDirectory(str(MIGRATIONS_DIR)).get_current_head()
+
+
+async def current_revision(engine: AsyncEngine) -> Optional[str]:
+    """Revision recorded in the database's alembic_version table, or None"""
+    async with engine.connect() as conn:
+        return await conn.run_sync(
+            lambda sync_conn: MigrationContext.configure(sync_conn).get_current_revision()
+        )
+
+
+async def check_schema_version(engine: AsyncEngine) -> str:
+    """Return the database revision, raising SchemaVersionError if it is not the head"""
+    expected = head_revision()
+    current = await current_revision(engine)
+    if current != expected:
+        raise SchemaVersionError(
+            f"Database schema is at revision {current or '<none>'} but the code expects "
+            f"{expected}; run `alembic upgrade head` before starting the app"
+        )
+
+    return current
@@ -1,3 +1,17 @@
 from app.services.minio_service import MinioService
+from app.services.storage_service import (
+    InMemoryStorageService,
+    LocalStorageService,
+    StorageService,
+    StoredObject,
+    create_storage_service,
+)
 
-__all__ = ["MinioService"]
+__all__ = [
+    "MinioService",
+    "StorageService",
+    "InMemoryStorageService",
+    "LocalStorageService",
+    "StoredObject",
+    "create_storage_service",
+]
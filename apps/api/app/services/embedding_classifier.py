@@ -0,0 +1,217 @@
+"""
+Embedding-based item categories, the fallback for names the dictionary
+matcher (`app.services.item_categorizer`) leaves uncategorized.
+
+The name and aliases of every category are embedded once and L2-normalized
+into one (aliases x dimension) matrix, with each category's rows contiguous.
+A receipt's item names are encoded in one batch, so scoring every item
+against every alias is a single matrix multiply of unit vectors (cosine
+similarity); `np.maximum.reduceat` turns that into each category's best
+alias, and the top k categories per item come from `np.argpartition` on each
+row, with only those k sorted.
+
+Encoders are pluggable (`Encoder`). `HashingEncoder` hashes the normalized
+tokens and character trigrams of a name into a fixed number of signed
+buckets: deterministic, no model or download, used offline and in tests.
+`SentenceTransformerEncoder` uses a sentence-transformers model when that
+package is installed. `ITEM_ENCODER=none` (the default) disables the fallback.
+"""
+
+import zlib
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.item_categorizer import (
+    UNCATEGORIZED,
+    CategoryMatch,
+    load_categories,
+    normalize_item_name,
+    trigrams,
+)
+
+
+class EncoderError(Exception):
+    """Raised when an encoder is unknown or its model cannot be loaded"""
+
+
+class Encoder(ABC):
+    @property
+    @abstractmethod
+    def dimension(self) -> int:
+        pass
+
+    @abstractmethod
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed every text in one batch: a float32 (len(texts) x dimension) array"""
+        pass
+
+
+@lru_cache(maxsize=65536)
+def _bucket(feature: str, dimension: int) -> Tuple[int, float]:
+    # crc32 rather than hash(): stable across processes and runs
+    hashed = zlib.crc32(feature.encode())
+    return hashed % dimension, 1.0 if hashed & 0x80000000 else -1.0
+
+
+class HashingEncoder(Encoder):
+    """Signed feature hashing of word tokens and character trigrams"""
+
+    def __init__(self, dimension: int = settings.hashing_encoder_dimension) -> None:
+        self._dimension = dimension
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        rows: List[int] = []
+        columns: List[int] = []
+        signs: List[float] = []
+        for row, text in enumerate(texts):
+            for token in normalize_item_name(text):
+                for feature in (f"w:{token}", *trigrams(token)):
+                    column, sign = _bucket(feature, self._dimension)
+                    rows.append(row)
+                    columns.append(column)
+                    signs.append(sign)
+
+        # One bincount scatters every feature of the batch into the flat matrix
+        flat = np.bincount(
+            np.asarray(rows, dtype=np.int64) * self._dimension
+            + np.asarray(columns, dtype=np.int64),
+            weights=np.asarray(signs, dtype=np.float64),
+            minlength=len(texts) * self._dimension,
+        )
+        return flat.reshape(len(texts), self._dimension).astype(np.float32)
+
+
+class SentenceTransformerEncoder(Encoder):
+    """A sentence-transformers model; the package is optional and imported here only"""
+
+    def __init__(self, model_name: str = settings.item_encoder_model) -> None:
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise EncoderError(
+                "sentence-transformers is not installed; install it or set ITEM_ENCODER=hashing"
+            ) from e
+
+        self.model = SentenceTransformer(model_name)
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        return self.model.encode(list(texts), convert_to_numpy=True).astype(np.float32)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, np.finfo(np.float32).tiny)
+
+
+class EmbeddingClassifier:
+    """Alias embeddings as one normalized matrix, scored a receipt at a time"""
+
+    def __init__(
+        self,
+        encoder: Encoder,
+        categories: Iterable[Dict[str, Any]],
+        min_score: float = settings.embedding_min_score,
+    ) -> None:
+        self.encoder = encoder
+        self.min_score = min_score
+        self.categories: List[Tuple[int, str]] = []
+        texts: List[str] = []
+        starts: List[int] = []  # first matrix row of each category
+        for category in categories:
+            self.categories.append((category["id"], category["name"]))
+            starts.append(len(texts))
+            texts.extend([category["name"], *category["aliases"]])
+
+        self.starts = np.asarray(starts, dtype=np.intp)
+        self.matrix = normalize_rows(encoder.encode(texts))  # (aliases x dimension)
+
+    def scores(self, names: Sequence[str]) -> np.ndarray:
+        """
+        Cosine similarity of every name to every category: (len(names) x categories).
+
+        One matrix multiply scores the names against every alias; a category
+        scores as its closest alias, reduced over its contiguous block of rows.
+        """
+        similarities = normalize_rows(self.encoder.encode(names)) @ self.matrix.T
+        return np.maximum.reduceat(similarities, self.starts, axis=1)
+
+    def top_k(self, names: Sequence[str], k: int = 3) -> List[List[CategoryMatch]]:
+        """The k best categories of every name, best first"""
+        if not names:
+            return []
+
+        k = min(k, len(self.categories))
+        scores = self.scores(names)
+        # Unordered top k per row in linear time, then sort only those k; ties go to the
+        # first category
+        top = np.sort(np.argpartition(-scores, k - 1, axis=1)[:, :k], axis=1)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        return [
+            [
+                CategoryMatch(*self.categories[index], round(float(score), 3), "embedding")
+                for index, score in zip(indexes, row_scores)
+            ]
+            for indexes, row_scores in zip(top.tolist(), top_scores.tolist())
+        ]
+
+    def classify(self, names: Sequence[str]) -> List[CategoryMatch]:
+        """The best category of every name, or Uncategorized below `min_score`"""
+        return [
+            matches[0] if matches[0].match_score >= self.min_score else UNCATEGORIZED
+            for matches in self.top_k(names, k=1)
+        ]
+
+
+def create_encoder(encoder: str = settings.item_encoder) -> Optional[Encoder]:
+    if encoder == "hashing":
+        return HashingEncoder()
+    if encoder == "sentence-transformers":
+        return SentenceTransformerEncoder()
+    if encoder == "none":
+        return None
+
+    raise EncoderError(f"Unknown item encoder: {encoder}")
+
+
+_embedding_classifier: Optional[EmbeddingClassifier] = None
+_loaded = False
+
+
+def get_embedding_classifier() -> Optional[EmbeddingClassifier]:
+    """Process-wide classifier over the item category dictionary; None when disabled"""
+    if not _loaded:
+        reload_embedding_classifier()
+
+    return _embedding_classifier
+
+
+def reload_embedding_classifier() -> Optional[EmbeddingClassifier]:
+    """Re-embed the categories from the dictionary file, reusing the current encoder"""
+    global _embedding_classifier, _loaded
+    if _embedding_classifier is not None:
+        encoder: Optional[Encoder] = _embedding_classifier.encoder
+    else:
+        encoder = create_encoder()
+
+    classifier = None
+    if encoder is not None:
+        classifier = EmbeddingClassifier(encoder, load_categories(settings.item_categories_path))
+
+    _embedding_classifier, _loaded = classifier, True
+    return classifier
@@ -0,0 +1,67 @@
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.config import settings
+from app.services.storage_service import StorageService
+
+# Objects are content-addressed or write-once, so browsers may keep them indefinitely
+IMAGE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+class ImageUrlService:
+    """
+    Hands out presigned GET URLs for stored images, reusing each URL until shortly
+    before it expires. Stable URLs also let browsers serve repeat views from cache.
+    """
+
+    def __init__(
+        self,
+        storage_service: StorageService,
+        expiry: int = settings.image_url_expiry,
+        refresh_margin: int = settings.image_url_refresh_margin,
+        max_entries: int = settings.image_url_cache_size,
+    ) -> None:
+        self.storage_service = storage_service
+        self.expiry = expiry
+        self.refresh_margin = refresh_margin
+        self.max_entries = max_entries
+        self._cache: OrderedDict[str, Tuple[str, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get_url(self, image_path: Optional[str]) -> Optional[str]:
+        """Return a browser-loadable URL for a stored image path"""
+        if not image_path:
+            return None
+
+        now = time.monotonic()
+        cached = self._cache.get(image_path)
+        if cached is not None and cached[1] > now:
+            self._cache.move_to_end(image_path)
+            self.hits += 1
+            return cached[0]
+
+        self.misses += 1
+        object_name = self.storage_service.object_name_from_path(image_path)
+        url = await self.storage_service.presigned_get_url(
+            object_name, timedelta(seconds=self.expiry), cache_control=IMAGE_CACHE_CONTROL
+        )
+
+        # Stop handing the URL out before it expires so clients never get a dead link
+        self._cache[image_path] = (url, now + self.expiry - self.refresh_margin)
+        self._cache.move_to_end(image_path)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+        return url
+
+    async def get_urls(self, image_paths: Iterable[Optional[str]]) -> Dict[str, str]:
+        """Return URLs for many image paths, signing each distinct path at most once"""
+        urls = {}
+        for image_path in image_paths:
+            if image_path and image_path not in urls:
+                urls[image_path] = await self.get_url(image_path)
+
+        return urls
@@ -0,0 +1,60 @@
+import asyncio
+from concurrent.futures import Executor
+from io import BytesIO
+from typing import Dict, Tuple
+from PIL import Image, ImageOps
+
+from app.services.storage_service import StorageService
+
+# name -> (longest side in px, JPEG quality)
+VARIANTS: Dict[str, Tuple[int, int]] = {
+    "thumbnail": (256, 70),
+    "web": (1280, 80),
+}
+
+
+def generate_variants(data: bytes) -> Dict[str, bytes]:
+    """Decode an image once and return JPEG bytes for every entry in VARIANTS"""
+    with Image.open(BytesIO(data)) as image:
+        # Let the JPEG decoder downscale by a power of two before full decode
+        largest = max(size for size, _ in VARIANTS.values())
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+
+        variants = {}
+        for name, (size, quality) in sorted(VARIANTS.items(), key=lambda v: -v[1][0]):
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+            out = BytesIO()
+            image.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+            variants[name] = out.getvalue()
+
+        return variants
+
+
+def variant_object_name(object_name: str, variant: str) -> str:
+    return f"variants/{object_name}/{variant}.jpg"
+
+
+async def store_variants(
+    storage_service: StorageService, executor: Executor, image_path: str
+) -> Dict[str, str]:
+    """
+    Generate every variant of a stored image in `executor` and write them next to it.
+
+    Runs in the worker as a `generate_variants` job, so variants of a receipt are
+    retried like any job and survive API restarts. Writes are idempotent.
+    """
+    object_name = storage_service.object_name_from_path(image_path)
+    data = await storage_service.get_object(object_name)
+
+    loop = asyncio.get_running_loop()
+    variants = await loop.run_in_executor(executor, generate_variants, data)
+
+    paths = {}
+    for name, content in variants.items():
+        variant_name = variant_object_name(object_name, name)
+        await storage_service.put_object(variant_name, BytesIO(content), "image/jpeg")
+        paths[name] = storage_service.build_path(variant_name)
+
+    return paths
@@ -0,0 +1,242 @@
+"""
+Item-name normalization and category matching.
+
+Names are normalized to tokens once: accents and case folded, sizes, counts
+and packaging words ("2L", "12PK", "organic") dropped, plural "s" removed.
+Category aliases go through the same normalization into three indexes, built
+once per process:
+
+- a token trie of the aliases, walked from each token of a name, so every
+  exact or alias hit costs one dict step per matched token; the longest hit
+  wins, so "peanut butter" beats "butter"
+- the token vocabulary of the aliases
+- a character trigram inverted index over the vocabulary; a token that is not
+  in the vocabulary ("bannana", a truncated "banan") is replaced by the
+  vocabulary token sharing the most trigrams, when the Dice similarity of the
+  two reaches `category_fuzzy_min_score`. Only tokens of similar length are
+  compared, and corrections are memoized per matcher.
+
+Match methods are `exact` (an alias is the whole name, score 1.0), `alias`
+(an alias covers part of the name, scored by the share it covers), `fuzzy`
+(the hit needed corrected tokens; the alias score times their similarity) and
+`default` (no hit). The dictionary is `item_categories.json` next to this
+module unless `item_categories_path` is set; `reload_item_categorizer` swaps in
+a rebuilt matcher (the worker does so on SIGHUP).
+"""
+
+import json
+import re
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.config import settings
+
+DEFAULT_CATEGORIES_PATH = Path(__file__).with_name("item_categories.json")
+
+TOKEN = re.compile(r"[^\W_]+")
+NOISE_WORDS = frozenset(
+    "an and of the with org organic fresh frozen lg large med sm small xl pk pack ea each "
+    "ct count bag box btl bottle can jar tub pc pcs kg g lb lbs oz l ml".split()
+)
+ALIAS_BASE_SCORE = 0.75  # score of an alias covering none of the name; 1.0 when it covers it all
+FUZZY_MIN_LENGTH = 4  # shorter unknown tokens are not corrected
+FUZZY_CACHE_SIZE = 50_000  # memoized corrections kept per matcher
+
+
+class CategoryMatch(NamedTuple):
+    category_id: Optional[int]
+    category_name: str
+    match_score: float  # 0-1
+    match_method: str  # exact, alias, fuzzy or default
+
+
+UNCATEGORIZED = CategoryMatch(None, "Uncategorized", 0.0, "default")
+
+
+def normalize_token(token: str) -> str:
+    if token.endswith("ies") and len(token) > 4:
+        return token[:-3] + "y"
+    if token.endswith("oes") and len(token) > 4:
+        return token[:-2]
+    if token.endswith("s") and not token.endswith("ss") and len(token) > 3:
+        return token[:-1]
+    return token
+
+
+def normalize_item_name(name: str) -> List[str]:
+    """Accent- and case-folded tokens of an item name, without sizes and packaging words"""
+    if not name.isascii():
+        decomposed = unicodedata.normalize("NFKD", name)
+        name = "".join(char for char in decomposed if not unicodedata.combining(char))
+
+    tokens = []
+    for token in TOKEN.findall(name.casefold()):
+        if len(token) < 2 or token in NOISE_WORDS or not token.isalpha():
+            continue
+        tokens.append(normalize_token(token))
+
+    return tokens
+
+
+def trigrams(token: str) -> set:
+    padded = f"${token}$"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def load_categories(path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Read a JSON list of {"id", "name", "aliases"}"""
+    with open(path or DEFAULT_CATEGORIES_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class CategoryMatcher:
+    """Immutable indexes over a category dictionary; build once, share between tasks"""
+
+    def __init__(
+        self,
+        categories: Iterable[Dict[str, Any]],
+        fuzzy_min_score: float = settings.category_fuzzy_min_score,
+    ) -> None:
+        self.fuzzy_min_score = fuzzy_min_score
+        self.categories: List[Tuple[int, str]] = []
+        self.trie: Dict[str, Any] = {}  # token -> child node; "" -> index into categories
+        self.aliases = 0
+
+        for category in categories:
+            index = len(self.categories)
+            self.categories.append((category["id"], category["name"]))
+            for alias in [category["name"], *category["aliases"]]:
+                tokens = normalize_item_name(alias)
+                if not tokens:
+                    continue
+
+                node = self.trie
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                node.setdefault("", index)  # the first category listing an alias keeps it
+                self.aliases += 1
+
+        self.vocabulary: List[str] = sorted(self._tokens(self.trie))
+        self.known = frozenset(self.vocabulary)
+        self.gram_counts: List[int] = []
+        self.grams: Dict[str, List[int]] = {}
+        for token_id, token in enumerate(self.vocabulary):
+            token_grams = trigrams(token)
+            self.gram_counts.append(len(token_grams))
+            for gram in token_grams:
+                self.grams.setdefault(gram, []).append(token_id)
+
+        self._corrections: Dict[str, Optional[Tuple[str, float]]] = {}
+
+    def match(self, name: str) -> CategoryMatch:
+        return self.match_many([name])[0]
+
+    def match_many(self, names: Sequence[str]) -> List[CategoryMatch]:
+        """Match every item name of a receipt; repeated names are matched once"""
+        seen: Dict[str, CategoryMatch] = {}
+        matches = []
+        for name in names:
+            match = seen.get(name)
+            if match is None:
+                match = seen[name] = self._match_tokens(normalize_item_name(name))
+            matches.append(match)
+
+        return matches
+
+    def _match_tokens(self, tokens: List[str]) -> CategoryMatch:
+        if not tokens:
+            return UNCATEGORIZED
+
+        similarities = [1.0] * len(tokens)
+        for i, token in enumerate(tokens):
+            if token not in self.known:
+                correction = self._correct(token)
+                if correction is not None:
+                    tokens[i], similarities[i] = correction
+
+        # Longest alias hit; the rightmost one on ties (the head noun of "chocolate milk")
+        best: Optional[Tuple[int, int, int]] = None  # length, start, category index
+        for start in range(len(tokens)):
+            node = self.trie
+            for end in range(start, len(tokens)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                index = node.get("")
+                if index is not None and (best is None or end - start + 1 >= best[0]):
+                    best = (end - start + 1, start, index)
+
+        if best is None:
+            return UNCATEGORIZED
+
+        length, start, index = best
+        score = ALIAS_BASE_SCORE + (1 - ALIAS_BASE_SCORE) * length / len(tokens)
+        similarity = min(similarities[start : start + length])
+        if similarity < 1.0:
+            method = "fuzzy"
+        else:
+            method = "exact" if length == len(tokens) else "alias"
+
+        category_id, category_name = self.categories[index]
+        return CategoryMatch(category_id, category_name, round(score * similarity, 3), method)
+
+    def _correct(self, token: str) -> Optional[Tuple[str, float]]:
+        """The most similar vocabulary token and its Dice similarity, if similar enough"""
+        if token in self._corrections:
+            return self._corrections[token]
+
+        correction = None
+        if len(token) >= FUZZY_MIN_LENGTH:
+            grams = trigrams(token)
+            shared: Counter = Counter()
+            for gram in grams:
+                shared.update(self.grams.get(gram, ()))
+
+            # Dice = 2 * shared / (grams of both) <= 2 * min / (sum), so a candidate with
+            # this many more or fewer grams cannot reach the threshold
+            slack = 2 * len(grams) * (1 - self.fuzzy_min_score) / self.fuzzy_min_score
+            best_score = self.fuzzy_min_score
+            for token_id, count in shared.items():
+                size = self.gram_counts[token_id]
+                if abs(size - len(grams)) > slack:
+                    continue
+                score = 2 * count / (len(grams) + size)
+                if score >= best_score:
+                    correction = (self.vocabulary[token_id], round(score, 3))
+                    best_score = score
+
+        if len(self._corrections) >= FUZZY_CACHE_SIZE:
+            self._corrections.clear()
+        self._corrections[token] = correction
+        return correction
+
+    @staticmethod
+    def _tokens(node: Dict[str, Any]) -> set:
+        tokens = set()
+        for token, child in node.items():
+            if token:
+                tokens.add(token)
+                tokens |= CategoryMatcher._tokens(child)
+        return tokens
+
+
+_item_categorizer: Optional[CategoryMatcher] = None
+
+
+def get_item_categorizer() -> CategoryMatcher:
+    """Process-wide matcher, built from the configured dictionary on first use"""
+    global _item_categorizer
+    if _item_categorizer is None:
+        _item_categorizer = CategoryMatcher(load_categories(settings.item_categories_path))
+
+    return _item_categorizer
+
+
+def reload_item_categorizer() -> CategoryMatcher:
+    """Rebuild the matcher from the dictionary file; a broken file keeps the current one"""
+    global _item_categorizer
+    _item_categorizer = CategoryMatcher(load_categories(settings.item_categories_path))
+
+    return _item_categorizer
@@ -0,0 +1,219 @@
+"""
+Deterministic line-item parser for OCR receipt text.
+
+One precompiled pattern classifies every line in a single `finditer` pass over
+the text: an alternation of totals, non-item lines (tax, payment and savings
+summary lines, and store details such as `DATE ...` unless they end in a
+price, which makes `STORE BRAND MILK 2.49` an item), quantity detail lines
+(`2 @ 1.25`, `0.734 kg @ 1.99/kg`) and priced lines (`MILK 2L  2.49`,
+`2 x EGGS  5.98`, `APPLES 3 @ 0.50  1.50`), with a catch-all for everything
+else. Each alternative is anchored at the start of
+the line or matches its name greedily, so a line is classified without
+rescanning it; only the short name of a priced line is searched again, for a
+discount keyword or an inline quantity. Priced lines become `LineItem`s;
+detail lines fill in the quantity of the item they belong to.
+
+The confidence (0-1) is the share of priced lines that parsed as items,
+halved when the items do not add up to a printed subtotal or total and
+reduced when the receipt prints none. It is stored on the receipt as
+`parse_confidence`, so low-confidence receipts can be sent to a model-based
+extractor instead of every receipt.
+"""
+
+import re
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import List, Optional
+
+# 2.49, 2,49, 1,234.56 and 1.234,56; the decimal separator is always third from the end
+AMOUNT = r"-?[$€£]?\d{1,3}(?:\d{0,4}[.,]\d{2}|(?:,\d{3})+\.\d{2}|(?:\.\d{3})+,\d{2})"
+QUANTITY = r"\d{1,4}(?:[.,]\d{1,3})?"
+UNIT = r"(?:KG|G|LB|LBS|OZ|L|ML|EA|PC|PCS)"
+TIMES = r"(?:[@x×*]|AT)"
+# Summaries of the discounts already listed, never the receipt total or a discount of their own
+SAVINGS = r"(?:TOTAL[ ](?:SAVINGS?|SAVED|DISCOUNTS?)|YOU[ ]SAVED|YOUR[ ]SAVINGS)"
+
+LINE = re.compile(
+    rf"""
+    ^[ \t]*(?:
+        (?P<total>
+            (?!{SAVINGS})
+            (?P<total_label>SUB[ -]?TOTAL|TOTAL|BALANCE(?:[ ]DUE)?|AMOUNT[ ]DUE)\b
+            [^\n]*?(?P<total_amount>{AMOUNT})
+        )
+      | (?P<skip>
+            (?:TAX|VAT|GST|HST|CASH|CHANGE|CARD|VISA|MASTERCARD|AMEX|DEBIT|CREDIT|TEND(?:ER)?
+              |PAID|{SAVINGS})\b[^\n]*
+          | (?:THANK|TEL|PHONE|DATE|TIME|RECEIPT|INVOICE|STORE|CASHIER|REG(?:ISTER)?
+              |TRANS(?:ACTION)?|AUTH|APPROVED|ITEMS?[ ]SOLD|NO[ ]OF[ ]ITEMS)\b
+            (?![^\n]*[ \t]{AMOUNT}-?(?:[ \t]+[A-Z*]{{1,2}})?[ \t]*$)[^\n]*
+        )
+      | (?P<detail>
+            (?P<detail_quantity>{QUANTITY})[ \t]*(?P<detail_unit>{UNIT})?[ \t]*{TIMES}[ \t]*
+            (?P<detail_price>{AMOUNT})(?:[ \t]*/[ \t]*{UNIT})?
+            (?:[ \t]+(?P<detail_amount>{AMOUNT}))?
+        )
+      | (?P<item>
+            (?:(?P<lead_quantity>\d{{1,3}})[ \t]*[x×*][ \t]+)?
+            (?P<name>[^\n]*[A-Za-z][^\n]*)
+            [ \t]+(?P<amount>{AMOUNT})(?P<credit>-)?(?:[ \t]+[A-Z*]{{1,2}})?
+        )
+      | (?P<other>[^\n]*)
+    )[ \t]*$
+    """,
+    re.MULTILINE | re.IGNORECASE | re.VERBOSE,
+)
+
+# Searched in the name of a priced line only
+INLINE_DETAIL = re.compile(
+    rf"[ \t]+(?P<quantity>{QUANTITY})[ \t]*(?P<unit>{UNIT})?[ \t]*{TIMES}[ \t]*"
+    rf"(?P<unit_price>{AMOUNT})(?:[ \t]*/[ \t]*{UNIT})?$",
+    re.IGNORECASE,
+)
+DISCOUNT = re.compile(r"\b(?:DISCOUNT|COUPON|SAVINGS?|PROMO|MARKDOWN)\b", re.IGNORECASE)
+HAS_AMOUNT = re.compile(AMOUNT)
+HAS_LETTER = re.compile(r"[A-Za-z]")
+NAME_NOISE = re.compile(r"[ \t]{2,}|[.·]{3,}")
+
+DECIMAL_TEXT = str.maketrans({"$": None, "€": None, "£": None, ",": "."})
+NOT_DIGIT = re.compile(r"[^\d-]")
+CENT = Decimal("0.01")
+NO_TOTAL_FACTOR = 0.8  # confidence kept when no printed total can confirm the items
+MISMATCH_FACTOR = 0.5  # confidence kept when the items do not add up to the printed total
+TAX_SHARE = Decimal("0.15")  # largest tax a total without a subtotal may add to the items
+
+
+@dataclass
+class LineItem:
+    item_name: str
+    total_price: Decimal
+    line_number: int  # 1-based line of the OCR text
+    quantity: Optional[Decimal] = None
+    unit_price: Optional[Decimal] = None
+    unit: Optional[str] = None  # kg, lb, ... for weighed items
+
+
+@dataclass
+class ParsedReceipt:
+    items: List[LineItem] = field(default_factory=list)
+    subtotal: Optional[Decimal] = None
+    total: Optional[Decimal] = None
+    discounts: Decimal = Decimal(0)
+    confidence: float = 0.0
+
+
+def to_decimal(text: str) -> Decimal:
+    return Decimal(text.translate(DECIMAL_TEXT))
+
+
+def to_amount(text: str) -> Decimal:
+    """Value of an `AMOUNT` match, dropping currency symbols and thousands separators"""
+    return Decimal(f"{NOT_DIGIT.sub('', text[:-3])}.{text[-2:]}")
+
+
+def parse_line_items(text: str) -> ParsedReceipt:
+    """Parse OCR text into line items in one pass over its lines"""
+    # `LINE` ends at `\n`; a `\r` left before it would keep the line from matching
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    result = ParsedReceipt()
+    unparsed = 0  # lines with an amount that were not understood
+    pending_name: Optional[str] = None  # a name line whose price is on the next line
+    pending_line = 0
+    line_number = 1
+    position = 0
+
+    for match in LINE.finditer(text):
+        start = match.start()
+        line_number += text.count("\n", position, start)
+        position = start
+        kind = match.lastgroup
+
+        if kind == "item":
+            name, amount = match["name"].rstrip(), to_amount(match["amount"])
+            if match["credit"] or amount < 0 or DISCOUNT.search(name):
+                result.discounts -= abs(amount)
+                pending_name = None
+                continue
+
+            quantity = unit_price = unit = None
+            inline = INLINE_DETAIL.search(name)
+            if inline is not None:
+                name = name[: inline.start()]
+                quantity = to_decimal(inline["quantity"])
+                unit_price = to_amount(inline["unit_price"])
+                unit = inline["unit"].lower() if inline["unit"] else None
+            elif match["lead_quantity"]:
+                quantity = to_decimal(match["lead_quantity"])
+
+            result.items.append(
+                LineItem(
+                    item_name=clean_name(name),
+                    total_price=amount,
+                    line_number=line_number,
+                    quantity=quantity,
+                    unit_price=unit_price,
+                    unit=unit,
+                )
+            )
+            pending_name = None
+        elif kind == "detail":
+            quantity = to_decimal(match["detail_quantity"])
+            unit_price = to_amount(match["detail_price"])
+            unit = match["detail_unit"].lower() if match["detail_unit"] else None
+            if pending_name is not None and match["detail_amount"]:
+                result.items.append(
+                    LineItem(
+                        item_name=pending_name,
+                        total_price=to_amount(match["detail_amount"]),
+                        line_number=pending_line,
+                        quantity=quantity,
+                        unit_price=unit_price,
+                        unit=unit,
+                    )
+                )
+            elif result.items and result.items[-1].quantity is None:
+                item = result.items[-1]
+                item.quantity, item.unit_price, item.unit = quantity, unit_price, unit
+            pending_name = None
+        elif kind == "total":
+            amount = to_amount(match["total_amount"])
+            if match["total_label"].upper().startswith("SUB"):
+                result.subtotal = amount
+            elif result.total is None:
+                result.total = amount
+            pending_name = None
+        elif kind == "other":
+            line = match["other"]
+            if HAS_AMOUNT.search(line):
+                unparsed += 1
+                pending_name = None
+            elif HAS_LETTER.search(line):
+                pending_name, pending_line = clean_name(line), line_number
+        else:
+            pending_name = None
+
+    result.confidence = confidence(result, unparsed)
+    return result
+
+
+def clean_name(name: str) -> str:
+    return NAME_NOISE.sub(" ", name).strip(" \t.-:*")[:255]
+
+
+def confidence(result: ParsedReceipt, unparsed: int) -> float:
+    if not result.items:
+        return 0.0
+
+    score = len(result.items) / (len(result.items) + unparsed)
+    expected = result.subtotal if result.subtotal is not None else result.total
+    if expected is None:
+        return round(score * NO_TOTAL_FACTOR, 3)
+
+    # A total including tax cannot confirm the items exactly; allow 15% when there is no subtotal
+    tolerance = max(CENT * 2, expected * (CENT if result.subtotal is not None else TAX_SHARE))
+    items = sum((item.total_price for item in result.items), Decimal(0))
+    # Some receipts print the subtotal before discounts, some after
+    if min(abs(items - expected), abs(items + result.discounts - expected)) > tolerance:
+        score *= MISMATCH_FACTOR
+
+    return round(score, 3)
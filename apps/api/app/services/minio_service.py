@@ -1,59 +1,167 @@
-import uuid
-from io import BytesIO
+import asyncio
+from datetime import timedelta
+from typing import BinaryIO, Optional
+import urllib3
 from minio import Minio
+from minio.commonconfig import CopySource
 from minio.error import S3Error
-from fastapi import UploadFile, HTTPException
 from app.config import settings
+from app.metrics import STORAGE_BYTES, STORAGE_OPERATION_DURATION
+from app.services.storage_service import ObjectInfo, StorageError, StorageService
 
 
-class MinioService:
+class _CountingReader:
+    """Pass-through reader counting the bytes MinIO pulls from `stream`"""
+
+    def __init__(self, stream: BinaryIO) -> None:
+        self.stream = stream
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+class MinioService(StorageService):
     """Service for MinIO object store"""
 
     def __init__(self) -> None:
+        super().__init__(settings.minio_bucket, settings.max_upload_size)
+
+        # Pooled HTTP connections shared by every call made through this client
+        self.http_client = urllib3.PoolManager(
+            maxsize=settings.minio_max_connections,
+            block=True,
+            timeout=urllib3.Timeout(connect=5.0, read=60.0),
+            retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503]),
+        )
         self.client = Minio(
             settings.minio_endpoint,
             access_key=settings.minio_access_key,
             secret_key=settings.minio_secret_key,
             secure=settings.minio_secure,
+            region=settings.minio_region,
+            http_client=self.http_client,
         )
 
-        self.bucket = settings.minio_bucket
-        self._ensure_bucket()
+        # Presigned URLs are signed offline against the endpoint browsers can reach
+        self.signing_client = self.client
+        if settings.minio_public_endpoint:
+            self.signing_client = Minio(
+                settings.minio_public_endpoint,
+                access_key=settings.minio_access_key,
+                secret_key=settings.minio_secret_key,
+                secure=settings.minio_public_secure,
+                region=settings.minio_region,
+            )
 
-    async def upload_file(self, file: UploadFile) -> str:
-        """Upload file to MinIO"""
-        self._validate_file_upload(file)
+        self.part_size = settings.minio_part_size
+        self._limiter = asyncio.Semaphore(settings.minio_max_concurrency)
+        self._bucket_ready = False
 
-        # Generate unique filename
-        file_ext = file.filename.split(".")[-1] if file.filename and "." in file.filename else "jpg"
-        object_name = f"{uuid.uuid4()}.{file_ext}"
+    async def ensure_bucket(self) -> None:
+        """Create bucket if not exists"""
+        if self._bucket_ready:
+            return
 
         try:
-            # Read file content
-            contents = await file.read()
+            if not await self._run(self.client.bucket_exists, self.bucket):
+                await self._run(self.client.make_bucket, self.bucket)
+                print(f"✅ Created MinIO bucket: {self.bucket}")
+            self._bucket_ready = True
+        except S3Error as e:
+            print(f"⚠️  MinIO bucket check failed: {e}")
 
-            # upload to MinIO
-            self.client.put_object(
-                self.bucket,
-                object_name,
-                data=BytesIO(contents),
-                length=len(contents),
-                content_type=file.content_type or "application/octet-stream",
-            )
+    async def put_object(self, object_name: str, data: BinaryIO, content_type: str) -> None:
+        await self.ensure_bucket()
 
-            return f"minio://{self.bucket}/{object_name}"
+        # Unknown length: MinIO sends a single PUT when the data fits in one part and
+        # switches to multipart upload otherwise, holding at most one part in memory.
+        reader = _CountingReader(data)
+        try:
+            with STORAGE_OPERATION_DURATION.time(backend="minio", operation="put"):
+                await self._run(
+                    self.client.put_object,
+                    self.bucket,
+                    object_name,
+                    data=reader,
+                    length=-1,
+                    part_size=self.part_size,
+                    num_parallel_uploads=1,
+                    content_type=content_type,
+                )
         except S3Error as e:
-            raise HTTPException(status_code=500, detail=f"Failed to generate URL: {str(e)}")
+            raise StorageError(str(e)) from e
+        finally:
+            STORAGE_BYTES.inc(reader.bytes_read, backend="minio", direction="put")
+
+    async def get_object(self, object_name: str) -> bytes:
+        def _read() -> bytes:
+            response = self.client.get_object(self.bucket, object_name)
+            try:
+                return response.read()
+            finally:
+                response.close()
+                response.release_conn()
 
-    def _ensure_bucket(self):
-        """Create bucket if not exists"""
         try:
-            if not self.client.bucket_exists(self.bucket):
-                self.client.make_bucket(self.bucket)
-                print(f"✅ Created MinIO bucket: {self.bucket}")
+            with STORAGE_OPERATION_DURATION.time(backend="minio", operation="get"):
+                data = await self._run(_read)
         except S3Error as e:
-            print(f"⚠️  MinIO bucket check failed: {e}")
+            raise StorageError(str(e)) from e
+
+        STORAGE_BYTES.inc(len(data), backend="minio", direction="get")
+        return data
+
+    async def remove_object(self, object_name: str) -> None:
+        try:
+            await self._run(self.client.remove_object, self.bucket, object_name)
+        except S3Error as e:
+            raise StorageError(str(e)) from e
+
+    async def object_exists(self, object_name: str) -> bool:
+        return await self.stat_object(object_name) is not None
+
+    async def stat_object(self, object_name: str) -> Optional[ObjectInfo]:
+        try:
+            stat = await self._run(self.client.stat_object, self.bucket, object_name)
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                return None
+            raise StorageError(str(e)) from e
+
+        return ObjectInfo(size=stat.size, content_type=stat.content_type)
+
+    async def presigned_put_url(self, object_name: str, expires: timedelta) -> str:
+        # Signing is local computation, no need for a worker thread
+        return self.signing_client.presigned_put_object(self.bucket, object_name, expires=expires)
+
+    async def presigned_get_url(
+        self, object_name: str, expires: timedelta, cache_control: Optional[str] = None
+    ) -> str:
+        response_headers = {"response-cache-control": cache_control} if cache_control else None
+        return self.signing_client.presigned_get_object(
+            self.bucket, object_name, expires=expires, response_headers=response_headers
+        )
+
+    async def move_object(self, source_name: str, object_name: str) -> None:
+        # Server-side copy, the bytes never come back through the API
+        try:
+            await self._run(
+                self.client.copy_object,
+                self.bucket,
+                object_name,
+                CopySource(self.bucket, source_name),
+            )
+            await self._run(self.client.remove_object, self.bucket, source_name)
+        except S3Error as e:
+            raise StorageError(str(e)) from e
+
+    async def close(self) -> None:
+        self.http_client.clear()
 
-    def _validate_file_upload(self, file: UploadFile):
-        if not file.content_type or not file.content_type.startswith("image/"):
-            raise HTTPException(status_code=400, detail="Only image files are allowed ")
+    async def _run(self, func, *args, **kwargs):
+        """Run a blocking MinIO call in a worker thread, bounded by the concurrency limit"""
+        async with self._limiter:
+            return await asyncio.to_thread(func, *args, **kwargs)
@@ -0,0 +1,150 @@
+"""
+OCR engines.
+
+Engines run in the worker's process pool on the preprocessed grey array. An
+engine's `version` names the engine build and every setting that changes its
+output; with the image hash and PREPROCESS_VERSION it keys the stored OCR
+results (`OcrResultRepository`), so each image is recognized once per engine
+configuration.
+"""
+
+import shlex
+import subprocess
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app.config import settings
+from app.services.image_preprocessing import QualityMetrics, preprocess_image
+
+
+class OcrError(Exception):
+    """Raised when the OCR engine is missing or fails on an image"""
+
+
+@dataclass
+class OcrText:
+    text: str
+    # One entry per text line: {"text", "confidence" (0-100), "box": [left, top, width, height]}
+    lines: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class OcrEngine(ABC):
+    @property
+    @abstractmethod
+    def version(self) -> str:
+        """Engine build plus every setting that changes its output"""
+        pass
+
+    @abstractmethod
+    def recognize(self, gray: np.ndarray) -> OcrText:
+        """Read the text of a preprocessed grey image; CPU-bound, runs in the process pool"""
+        pass
+
+
+class TesseractOcrEngine(OcrEngine):
+    """Runs the `tesseract` command line tool, so no Python bindings are needed"""
+
+    def __init__(
+        self,
+        cmd: str = settings.tesseract_cmd,
+        language: str = settings.ocr_language,
+        config: str = settings.ocr_config,
+        timeout: int = settings.ocr_timeout,
+    ) -> None:
+        self.cmd = cmd
+        self.language = language
+        self.config = config
+        self.timeout = timeout
+        self._version: Optional[str] = None
+
+    @property
+    def version(self) -> str:
+        if self._version is None:
+            output = self._run(["--version"])
+            build = output.decode(errors="replace").splitlines()[0].strip()
+            self._version = " ".join(filter(None, [build, f"-l {self.language}", self.config]))
+
+        return self._version
+
+    def recognize(self, gray: np.ndarray) -> OcrText:
+        out = BytesIO()
+        Image.fromarray(gray).save(out, "PNG", compress_level=1)  # cheap to write, lossless
+        tsv = self._run(
+            ["stdin", "stdout", "-l", self.language, *shlex.split(self.config), "tsv"],
+            out.getvalue(),
+        )
+
+        return parse_tsv(tsv.decode(errors="replace"))
+
+    def _run(self, args: List[str], data: Optional[bytes] = None) -> bytes:
+        try:
+            result = subprocess.run(
+                [self.cmd, *args],
+                input=data,
+                capture_output=True,
+                timeout=self.timeout,
+                check=True,
+            )
+        except FileNotFoundError as e:
+            raise OcrError(
+                f"{self.cmd} not found; install tesseract-ocr or set OCR_ENGINE=none"
+            ) from e
+        except subprocess.TimeoutExpired as e:
+            raise OcrError(f"tesseract timed out after {self.timeout}s") from e
+        except subprocess.CalledProcessError as e:
+            raise OcrError(f"tesseract failed: {e.stderr.decode(errors='replace').strip()}") from e
+
+        return result.stdout
+
+
+def parse_tsv(tsv: str) -> OcrText:
+    """Group the words of tesseract's TSV output into lines"""
+    words: Dict[Tuple[str, str, str], List[Tuple[str, float, int, int, int, int]]] = {}
+    for row in tsv.splitlines()[1:]:
+        # level, page, block, paragraph, line, word, left, top, width, height, conf, text
+        columns = row.split("\t")
+        if len(columns) < 12 or columns[0] != "5" or not columns[11].strip():
+            continue
+
+        left, top, width, height = (int(value) for value in columns[6:10])
+        words.setdefault((columns[2], columns[3], columns[4]), []).append(
+            (columns[11].strip(), float(columns[10]), left, top, left + width, top + height)
+        )
+
+    lines = []
+    for line in words.values():
+        texts, confidences, lefts, tops, rights, bottoms = zip(*line)
+        left, top = min(lefts), min(tops)
+        lines.append(
+            {
+                "text": " ".join(texts),
+                "confidence": round(sum(confidences) / len(confidences), 2),
+                "box": [left, top, max(rights) - left, max(bottoms) - top],
+            }
+        )
+
+    return OcrText(text="\n".join(line["text"] for line in lines), lines=lines)
+
+
+def preprocess_and_recognize(
+    engine: Optional[OcrEngine], data: bytes
+) -> Tuple[QualityMetrics, Optional[OcrText]]:
+    """Process-pool task: preprocess the image, then OCR it unless OCR is disabled"""
+    preprocessed = preprocess_image(data)
+    text = engine.recognize(preprocessed.image) if engine is not None else None
+
+    return preprocessed.metrics, text
+
+
+def create_ocr_engine(engine: str = settings.ocr_engine) -> Optional[OcrEngine]:
+    if engine == "tesseract":
+        return TesseractOcrEngine()
+    if engine == "none":
+        return None
+
+    raise ValueError(f"Unknown OCR engine: {engine}")
@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.jobs import Job
+from app.models.receipts import Receipt
+from app.repository.job_repository import (
+    GENERATE_VARIANTS,
+    PROCESS_RECEIPT,
+    STORE_UPLOAD,
+    JobRepository,
+)
+from app.repository.ocr_result_repository import OcrKey, OcrResultRepository
+from app.repository.receipt_item_repository import ReceiptItemRepository
+from app.repository.receipt_repository import ReceiptRepository
+from app.services.image_preprocessing import PREPROCESS_VERSION
+from app.services.embedding_classifier import get_embedding_classifier
+from app.services.image_variant_service import store_variants
+from app.services.item_categorizer import CategoryMatch, get_item_categorizer
+from app.services.line_item_parser import parse_line_items
+from app.services.ocr_service import OcrEngine, OcrText, preprocess_and_recognize
+from app.services.storage_service import StorageService
+
+
+@dataclass
+class WorkerContext:
+    """Shared clients handed to every job handler"""
+
+    storage: StorageService
+    executor: Executor  # process pool for CPU-heavy steps
+    ocr: Optional[OcrEngine] = None  # None preprocesses without OCR
+
+
+JobHandler = Callable[[WorkerContext, AsyncSession, Job], Awaitable[None]]
+
+
+def ocr_key(engine: OcrEngine, content_hash: str) -> OcrKey:
+    return OcrKey(content_hash, PREPROCESS_VERSION, engine.version)
+
+
+def classify_with_embeddings(names: List[str]) -> Optional[List[CategoryMatch]]:
+    """Embedding classifier matches for `names`, None when it is disabled"""
+    classifier = get_embedding_classifier()  # loads the encoder model on first use
+    return classifier.classify(names) if classifier is not None else None
+
+
+async def categorize_items(names: List[str]) -> List[CategoryMatch]:
+    """Dictionary matches first; names it cannot place go to the embedding classifier"""
+    matches = get_item_categorizer().match_many(names)
+    missing = [i for i, match in enumerate(matches) if match.category_id is None]
+    if missing:
+        # One batch for the receipt; loading and running a model encoder are CPU-heavy,
+        # so both stay off the event loop
+        fallback = await asyncio.to_thread(classify_with_embeddings, [names[i] for i in missing])
+        for i, match in zip(missing, fallback or ()):
+            matches[i] = match
+
+    return matches
+
+
+async def apply_ocr(
+    repo: ReceiptRepository,
+    receipt_id: int,
+    quality_metrics: Dict[str, Any],
+    text: Optional[OcrText],
+) -> None:
+    """
+    Steps that consume preprocessing and OCR output, without committing. Runs
+    after OCR, and again from stored results when receipts are reparsed.
+    """
+    parse_confidence = None
+    if text is not None:
+        parsed = parse_line_items(text.text)
+        categories = await categorize_items([item.item_name for item in parsed.items])
+        await ReceiptItemRepository(repo.db).replace(receipt_id, parsed.items, categories)
+        parse_confidence = parsed.confidence
+
+    await repo.set_processing_results(
+        receipt_id, quality_metrics, parse_confidence=parse_confidence, commit=False
+    )
+
+
+async def fetch_image(ctx: WorkerContext, receipt: Receipt) -> bytes:
+    return await ctx.storage.get_object(ctx.storage.object_name_from_path(receipt.image_path))
+
+
+async def process_receipt(ctx: WorkerContext, db: AsyncSession, job: Job) -> None:
+    """Preprocess and OCR the receipt image off the event loop, reusing stored OCR output"""
+    repo = ReceiptRepository(db)
+    receipt = await repo.get_by_id(job.receipt_id)
+    if receipt is None:
+        return
+
+    ocr_results = OcrResultRepository(db)
+    data = None
+    content_hash = receipt.content_hash
+    if content_hash is None:  # receipts from before uploads were hashed
+        data = await fetch_image(ctx, receipt)
+        content_hash = await asyncio.to_thread(lambda: hashlib.sha256(data).hexdigest())
+        # Committed with the job, so the next run and duplicate checks find it
+        await repo.set_content_hash(receipt.id, content_hash, commit=False)
+
+    if ctx.ocr is not None:
+        stored = await ocr_results.get(ocr_key(ctx.ocr, content_hash))
+        if stored is not None:
+            text = OcrText(text=stored.text, lines=stored.lines)
+            await apply_ocr(repo, receipt.id, stored.quality_metrics, text)
+            return
+
+    if data is None:
+        data = await fetch_image(ctx, receipt)
+
+    loop = asyncio.get_running_loop()
+    # Raises PreprocessingError on corrupt images and OcrError when OCR fails, failing the job
+    metrics, text = await loop.run_in_executor(
+        ctx.executor, preprocess_and_recognize, ctx.ocr, data
+    )
+    quality_metrics = metrics.to_dict()
+    if text is not None:
+        await ocr_results.save(ocr_key(ctx.ocr, content_hash), text, quality_metrics)
+
+    # Committed together with the job's completion
+    await apply_ocr(repo, receipt.id, quality_metrics, text)
+
+
+async def generate_image_variants(ctx: WorkerContext, db: AsyncSession, job: Job) -> None:
+    """Write the thumbnail and web-size images of the receipt and record their paths"""
+    repo = ReceiptRepository(db)
+    receipt = await repo.get_by_id(job.receipt_id)
+    if receipt is None:
+        return
+
+    paths = await store_variants(ctx.storage, ctx.executor, receipt.image_path)
+    # Committed together with the job's completion
+    await repo.set_image_variants([receipt.id], paths["thumbnail"], paths["web"], commit=False)
+
+
+async def store_upload(ctx: WorkerContext, db: AsyncSession, job: Job) -> None:
+    """
+    Move a presigned upload to its content address, apply the job's `on_duplicate`
+    policy and queue the receipt's processing, so the API never reads the bytes.
+
+    The receipt is committed before the upload object is removed, so an attempt
+    that fails to commit is retried with the object still in place.
+    """
+    repo = ReceiptRepository(db)
+    receipt = await repo.get_by_id(job.receipt_id)
+    if receipt is None or receipt.content_hash is not None:  # handled by an earlier attempt
+        return
+
+    upload_name = ctx.storage.object_name_from_path(receipt.image_path)
+    stored = await ctx.storage.adopt_object(upload_name, receipt.content_type)
+    original = await repo.get_by_content_hash(receipt.user_id, stored.content_hash)
+
+    if original is None:
+        await repo.set_content_hash(receipt.id, stored.content_hash, stored.path, commit=False)
+        await JobRepository(db).enqueue_processing([receipt.id], commit=False)
+    elif (job.payload or {}).get("on_duplicate") == "reject":
+        await repo.set_content_hash(receipt.id, stored.content_hash, stored.path, commit=False)
+        await repo.set_status([receipt], "failed", commit=False)
+        print(f"⚠️  Receipt {receipt.id} rejected: duplicate of receipt {original.id}")
+    else:
+        # Linked: the user's existing receipt stands for this image
+        await repo.delete([receipt], commit=False)
+    await repo.commit()
+
+    await ctx.storage.remove_object(upload_name)
+
+
+HANDLERS: Dict[str, JobHandler] = {
+    PROCESS_RECEIPT: process_receipt,
+    GENERATE_VARIANTS: generate_image_variants,
+    STORE_UPLOAD: store_upload,
+}
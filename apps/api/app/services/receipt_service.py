@@ -1,54 +1,350 @@
-from datetime import date
-import sys
-from typing import List, Optional
-from fastapi import UploadFile
+import asyncio
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Literal, Optional, Tuple
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.repository.job_repository import STORE_UPLOAD, JobRepository
+from app.repository.pagination import Cursor, InvalidCursorError, Page
 from app.repository.receipt_repository import ReceiptRepository
-from app.services.minio_service import MinioService
+from app.services.storage_service import StorageService, StoredObject
 from app.models.receipts import Receipt, create_receipt
+from app.config import settings
+
+# What to do when a user uploads an image they already have a receipt for
+DuplicatePolicy = Literal["link", "reject"]
+
+
+@dataclass
+class FileUploadResult:
+    """Outcome of uploading one file in a bulk request"""
+
+    filename: Optional[str]
+    image_path: Optional[str] = None
+    receipt_id: Optional[int] = None
+    error: Optional[str] = None
+    duplicate: bool = False
+    stored: Optional[StoredObject] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class DirectUpload:
+    """A file the client will PUT straight to storage"""
+
+    filename: Optional[str]
+    content_type: str
+    size: int
+
+
+@dataclass
+class PresignedUpload:
+    receipt: Receipt
+    upload_url: str
+    expires_at: datetime
+
+
+@dataclass
+class FinalizeResult:
+    receipt_id: int
+    status: Optional[str] = None
+    error: Optional[str] = None
 
 
 class ReceiptService:
-    def __init__(self, db: AsyncSession, minio_service: Optional[MinioService] = None) -> None:
+    # storage_service is only used by the upload methods
+    def __init__(self, db: AsyncSession, storage_service: Optional[StorageService] = None) -> None:
         self.db = db
         self.receipt_repository = ReceiptRepository(db)
-        self.minio_service = minio_service or MinioService()
+        self.job_repository = JobRepository(db)
+        self.storage_service = storage_service
+
+    async def upload_receipt(
+        self,
+        file: UploadFile,
+        purchase_date: date,
+        user_id: int,
+        on_duplicate: DuplicatePolicy = "link",
+    ) -> Tuple[Receipt, bool]:
+        """
+        Upload new receipt, returning it and whether it is an existing duplicate.
+
+        Images are stored by content hash, so a duplicate never adds a new object;
+        `on_duplicate` decides whether the existing receipt is returned or rejected.
+        """
+        # Upload image to object storage
+        stored = await self.storage_service.upload_file(file)
 
-    async def upload_receipt(self, file: UploadFile, purchase_date: date, user_id: int) -> Receipt:
-        """Upload new receipt"""
-        # Upload image to MinIO
-        image_path = await self.minio_service.upload_file(file)
+        existing = await self.receipt_repository.get_by_content_hash(user_id, stored.content_hash)
+        if existing is not None:
+            if on_duplicate == "reject":
+                raise HTTPException(status_code=409, detail=f"Duplicate of receipt {existing.id}")
+            return existing, True
 
         receipt = create_receipt(
-            user_id=user_id, image_path=image_path, purchase_date=purchase_date
+            user_id=user_id,
+            image_path=stored.path,
+            purchase_date=purchase_date,
+            content_hash=stored.content_hash,
+            content_type=stored.content_type,
+            image_size=stored.size,
         )
 
-        return await self.receipt_repository.save(receipt)
+        try:
+            receipt = await self.receipt_repository.save(receipt, commit=False)
+            await self._schedule_processing([receipt])
+            await self.receipt_repository.commit()
+        except Exception:
+            await self.db.rollback()
+            if stored.created:
+                await self._remove_uploaded([stored.path])
+            raise
+
+        return receipt, False
 
     async def upload_receipts(
-        self, files: List[UploadFile], purchase_date: date, user_id: int
-    ) -> int:
-        """Upload new receipts"""
-        receipts = []
-
-        for file in files:
-            image_path = await self.minio_service.upload_file(file)
-            receipt = create_receipt(
-                user_id=user_id, image_path=image_path, purchase_date=purchase_date
+        self,
+        files: List[UploadFile],
+        purchase_date: date,
+        user_id: int,
+        on_duplicate: DuplicatePolicy = "link",
+    ) -> List[FileUploadResult]:
+        """Upload new receipts in parallel and insert them in one batch"""
+        limiter = asyncio.Semaphore(settings.bulk_upload_concurrency)
+
+        async def upload(file: UploadFile) -> FileUploadResult:
+            async with limiter:
+                try:
+                    stored = await self.storage_service.upload_file(file)
+                    return FileUploadResult(
+                        filename=file.filename, image_path=stored.path, stored=stored
+                    )
+                except HTTPException as e:
+                    return FileUploadResult(filename=file.filename, error=str(e.detail))
+                except Exception as e:
+                    return FileUploadResult(filename=file.filename, error=str(e))
+
+        results = await asyncio.gather(*(upload(file) for file in files))
+        uploaded = [result for result in results if result.success]
+
+        # Existing receipts and receipts created earlier in this batch, by image hash
+        receipts_by_hash: Dict[str, Receipt] = await self.receipt_repository.get_by_content_hashes(
+            user_id, (result.stored.content_hash for result in uploaded)
+        )
+        existing_hashes = set(receipts_by_hash)
+        new_receipts: List[Receipt] = []
+        linked: List[Tuple[FileUploadResult, Receipt]] = []
+
+        for result in uploaded:
+            content_hash = result.stored.content_hash
+            receipt = receipts_by_hash.get(content_hash)
+
+            if receipt is None:
+                receipt = create_receipt(
+                    user_id=user_id,
+                    image_path=result.image_path,
+                    purchase_date=purchase_date,
+                    content_hash=content_hash,
+                    content_type=result.stored.content_type,
+                    image_size=result.stored.size,
+                )
+                receipts_by_hash[content_hash] = receipt
+                new_receipts.append(receipt)
+            elif on_duplicate == "reject":
+                duplicate_of = receipt.id if content_hash in existing_hashes else "in this batch"
+                result.error = f"Duplicate of receipt {duplicate_of}"
+                continue
+            else:
+                result.duplicate = True
+
+            linked.append((result, receipt))
+
+        if new_receipts:
+            try:
+                await self.receipt_repository.save_many(new_receipts, commit=False)
+                await self._schedule_processing(new_receipts)
+                await self.receipt_repository.commit()
+            except Exception:
+                await self.db.rollback()
+                await self._remove_uploaded(
+                    [
+                        result.image_path
+                        for result, receipt in linked
+                        if result.stored.created and not result.duplicate
+                    ]
+                )
+                raise
+
+        for result, receipt in linked:
+            result.receipt_id = receipt.id
+
+        return list(results)
+
+    async def create_presigned_uploads(
+        self, uploads: List[DirectUpload], purchase_date: date, user_id: int
+    ) -> List[PresignedUpload]:
+        """
+        Create pending receipts and presigned PUT URLs for direct-to-storage uploads.
+
+        The image bytes never pass through the API; `finalize_uploads` verifies the
+        objects once the client has written them.
+        """
+        for upload in uploads:
+            if not upload.content_type.startswith("image/"):
+                raise HTTPException(status_code=400, detail="Only image files are allowed ")
+            if upload.size > settings.max_upload_size:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"File exceeds maximum size of {settings.max_upload_size} bytes",
+                )
+
+        object_names = [f"uploads/{uuid.uuid4()}.{_file_extension(u.filename)}" for u in uploads]
+        receipts = [
+            create_receipt(
+                user_id=user_id,
+                image_path=self.storage_service.build_path(object_name),
+                purchase_date=purchase_date,
+                content_type=upload.content_type,
+                image_size=upload.size,
+                status="pending",
             )
-            receipts.append(receipt)
+            for upload, object_name in zip(uploads, object_names)
+        ]
+        await self.receipt_repository.save_many(receipts)
+
+        expires = timedelta(seconds=settings.presigned_url_expiry)
+        expires_at = datetime.now(timezone.utc) + expires
+        urls = await asyncio.gather(
+            *(self.storage_service.presigned_put_url(name, expires) for name in object_names)
+        )
 
-        return await self.receipt_repository.save_many(receipts)
+        return [
+            PresignedUpload(receipt=receipt, upload_url=url, expires_at=expires_at)
+            for receipt, url in zip(receipts, urls)
+        ]
 
-    async def get_receipts(
-        self, user_id: int, last_id: int = sys.maxsize, limit: int = 5
-    ) -> List[Receipt]:
-        """Get user receipts"""
-        return await self.receipt_repository.get_all(
-            {"user_id": user_id, "last_id": last_id, "limit": limit}
+    async def finalize_uploads(
+        self, receipt_ids: List[int], user_id: int, on_duplicate: DuplicatePolicy = "link"
+    ) -> List[FinalizeResult]:
+        """
+        Verify directly uploaded objects and move their receipts to `uploaded`.
+
+        Only object metadata is checked here. A `STORE_UPLOAD` job then hashes
+        the object, moves it to its content address and applies `on_duplicate`
+        as `upload_receipt` does: `link` deletes the receipt in favour of the
+        existing one, `reject` marks it failed.
+        """
+        receipts = {r.id: r for r in await self.receipt_repository.get_by_ids(user_id, receipt_ids)}
+        limiter = asyncio.Semaphore(settings.bulk_upload_concurrency)
+
+        async def verify(receipt: Receipt) -> Tuple[str, Optional[str]]:
+            """Return the status the receipt should move to and the reason if not uploaded"""
+            async with limiter:
+                object_name = self.storage_service.object_name_from_path(receipt.image_path)
+                info = await self.storage_service.stat_object(object_name)
+
+            if info is None:
+                return "pending", "Object has not been uploaded yet"
+            if receipt.image_size is not None and info.size != receipt.image_size:
+                return "failed", f"Expected {receipt.image_size} bytes, got {info.size}"
+            if info.content_type and info.content_type != receipt.content_type:
+                return "failed", f"Expected {receipt.content_type}, got {info.content_type}"
+
+            return "uploaded", None
+
+        pending = [receipt for receipt in receipts.values() if receipt.status == "pending"]
+        outcomes = dict(zip((r.id for r in pending), await asyncio.gather(*map(verify, pending))))
+        verified = [r for r in pending if outcomes[r.id][0] == "uploaded"]
+        rejected = [r for r in pending if outcomes[r.id][0] == "failed"]
+
+        # Wrong size or type: drop the object, the client must start a new upload
+        await self._remove_uploaded([receipt.image_path for receipt in rejected])
+
+        await self.receipt_repository.set_status(verified, "uploaded", commit=False)
+        await self.receipt_repository.set_status(rejected, "failed", commit=False)
+        await self.job_repository.enqueue(
+            STORE_UPLOAD,
+            [receipt.id for receipt in verified],
+            payload={"on_duplicate": on_duplicate},
+            commit=False,
         )
+        await self.receipt_repository.commit()
+
+        results = []
+        for receipt_id in receipt_ids:
+            receipt = receipts.get(receipt_id)
+            if receipt is None:
+                results.append(FinalizeResult(receipt_id, error=f"Receipt {receipt_id} not found"))
+            else:
+                error = outcomes[receipt_id][1] if receipt_id in outcomes else None
+                results.append(FinalizeResult(receipt_id, status=receipt.status, error=error))
+
+        return results
+
+    async def get_receipts(
+        self,
+        user_id: int,
+        cursor: Optional[str] = None,
+        limit: int = 5,
+        status: Optional[str] = None,
+        purchase_date_from: Optional[date] = None,
+        purchase_date_to: Optional[date] = None,
+    ) -> Page[Row]:
+        """Get one page of user receipts, newest first, with the total across all pages"""
+        params = {
+            "user_id": user_id,
+            "limit": limit,
+            "status": status,
+            "purchase_date_from": purchase_date_from,
+            "purchase_date_to": purchase_date_to,
+        }
+        try:
+            page = await self.receipt_repository.get_rows(
+                {**params, "cursor": Cursor.decode(cursor) if cursor else None}
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        page.total = await self.receipt_repository.count(params)
+
+        return page
+
+    async def get_stats(self, user_id: int) -> Dict[str, int]:
+        """Get the user's receipt count per status"""
+        return await self.receipt_repository.counters.get(user_id)
 
     async def get(self, id: int) -> Receipt | None:
         """Get receipt by Id"""
         return await self.receipt_repository.get_by_id(id)
+
+    async def get_row(self, id: int) -> Row | None:
+        """Get the response columns of a receipt by Id, without loading the ORM object"""
+        return await self.receipt_repository.get_row_by_id(id)
+
+    async def _schedule_processing(self, receipts: List[Receipt]) -> None:
+        """Queue a variant and a processing job per receipt in the caller's transaction"""
+        await self.job_repository.enqueue_processing(
+            [receipt.id for receipt in receipts], commit=False
+        )
+
+    async def _remove_uploaded(self, image_paths: List[str]) -> None:
+        """Best-effort removal of objects whose receipts were never persisted"""
+
+        async def remove(image_path: str) -> None:
+            try:
+                object_name = self.storage_service.object_name_from_path(image_path)
+                await self.storage_service.remove_object(object_name)
+            except Exception as e:
+                print(f"⚠️  Failed to remove orphaned object {image_path}: {e}")
+
+        await asyncio.gather(*(remove(image_path) for image_path in image_paths))
+
+
+def _file_extension(filename: Optional[str]) -> str:
+    return filename.split(".")[-1] if filename and "." in filename else "jpg"
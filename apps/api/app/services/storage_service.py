@@ -0,0 +1,357 @@
+import asyncio
+import hashlib
+import mimetypes
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import timedelta
+from io import BytesIO
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional
+from fastapi import UploadFile, HTTPException
+from app.config import settings
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload stream exceeds the configured maximum size"""
+
+
+class StorageError(Exception):
+    """Raised when the storage backend fails to complete an operation"""
+
+
+class SizeLimitedReader:
+    """File-like wrapper that streams and hashes `stream`, failing past `max_size` bytes"""
+
+    def __init__(self, stream: BinaryIO, max_size: int) -> None:
+        self.stream = stream
+        self.max_size = max_size
+        self.bytes_read = 0
+        self._sha256 = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.bytes_read += len(data)
+
+        if self.bytes_read > self.max_size:
+            raise UploadTooLargeError(f"File exceeds maximum size of {self.max_size} bytes")
+
+        self._sha256.update(data)
+        return data
+
+    @property
+    def hexdigest(self) -> str:
+        return self._sha256.hexdigest()
+
+
+@dataclass
+class StoredObject:
+    """A content-addressed object written by `StorageService.upload_file`"""
+
+    path: str
+    content_hash: str
+    size: int
+    content_type: str
+    created: bool  # False when identical bytes were already stored
+
+
+@dataclass
+class ObjectInfo:
+    """Metadata of a stored object"""
+
+    size: int
+    content_type: Optional[str]
+
+
+class StorageService(ABC):
+    """Async object storage interface used by the receipt services"""
+
+    scheme: str = "minio"
+
+    def __init__(self, bucket: str, max_upload_size: int) -> None:
+        self.bucket = bucket
+        self.max_upload_size = max_upload_size
+
+    async def upload_file(self, file: UploadFile) -> StoredObject:
+        """
+        Stream an uploaded image into storage, keyed by its SHA-256.
+
+        The hash is computed while streaming to a staging object, which is then
+        promoted to its content address or dropped if those bytes already exist.
+        """
+        self._validate_file_upload(file)
+
+        staging_name = f"tmp/{uuid.uuid4()}"
+        content_type = file.content_type or "application/octet-stream"
+
+        try:
+            await file.seek(0)
+            reader = SizeLimitedReader(file.file, self.max_upload_size)
+            await self.put_object(staging_name, reader, content_type)
+
+            object_name = content_object_name(reader.hexdigest)
+            created = await self.promote_object(staging_name, object_name)
+
+            return StoredObject(
+                path=self.build_path(object_name),
+                content_hash=reader.hexdigest,
+                size=reader.bytes_read,
+                content_type=content_type,
+                created=created,
+            )
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except StorageError as e:
+            raise HTTPException(status_code=500, detail=f"Failed to store file: {str(e)}")
+
+    async def adopt_object(self, object_name: str, content_type: str) -> StoredObject:
+        """
+        Hash an object written outside `upload_file` (a presigned PUT) and copy it
+        to its content address unless those bytes are already stored.
+
+        `object_name` is left in place; remove it once nothing refers to it.
+        """
+        data = await self.get_object(object_name)
+        content_hash = await asyncio.to_thread(lambda: hashlib.sha256(data).hexdigest())
+        target_name = content_object_name(content_hash)
+
+        created = not await self.object_exists(target_name)
+        if created:
+            await self.put_object(target_name, BytesIO(data), content_type)
+
+        return StoredObject(
+            path=self.build_path(target_name),
+            content_hash=content_hash,
+            size=len(data),
+            content_type=content_type,
+            created=created,
+        )
+
+    async def promote_object(self, staging_name: str, object_name: str) -> bool:
+        """Move a staging object to `object_name` unless it exists; return True if moved"""
+        try:
+            if await self.object_exists(object_name):
+                return False
+
+            await self.move_object(staging_name, object_name)
+            return True
+        finally:
+            await self.remove_object(staging_name)
+
+    def build_path(self, object_name: str) -> str:
+        return f"{self.scheme}://{self.bucket}/{object_name}"
+
+    def object_name_from_path(self, path: str) -> str:
+        prefix = f"{self.scheme}://{self.bucket}/"
+        if not path.startswith(prefix):
+            raise ValueError(f"Path {path} does not belong to bucket {self.bucket}")
+
+        return path[len(prefix) :]
+
+    @abstractmethod
+    async def ensure_bucket(self) -> None:
+        """Create the bucket if it does not exist"""
+
+    @abstractmethod
+    async def put_object(self, object_name: str, data: BinaryIO, content_type: str) -> None:
+        """Stream `data` into `object_name`, reading it until exhausted"""
+
+    @abstractmethod
+    async def get_object(self, object_name: str) -> bytes:
+        """Return the full content of `object_name`"""
+
+    @abstractmethod
+    async def remove_object(self, object_name: str) -> None:
+        """Delete `object_name`, ignoring objects that do not exist"""
+
+    @abstractmethod
+    async def object_exists(self, object_name: str) -> bool:
+        """Return True if `object_name` is stored"""
+
+    @abstractmethod
+    async def stat_object(self, object_name: str) -> Optional[ObjectInfo]:
+        """Return size and content type of `object_name`, or None if it is not stored"""
+
+    @abstractmethod
+    async def presigned_put_url(self, object_name: str, expires: timedelta) -> str:
+        """Return a URL clients can PUT the object's bytes to directly"""
+
+    @abstractmethod
+    async def presigned_get_url(
+        self, object_name: str, expires: timedelta, cache_control: Optional[str] = None
+    ) -> str:
+        """Return a URL clients can GET the object from, optionally with a Cache-Control"""
+
+    @abstractmethod
+    async def move_object(self, source_name: str, object_name: str) -> None:
+        """Rename `source_name` to `object_name`, replacing any existing object"""
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Release pooled connections"""
+
+    def _validate_file_upload(self, file: UploadFile):
+        if not file.content_type or not file.content_type.startswith("image/"):
+            raise HTTPException(status_code=400, detail="Only image files are allowed ")
+
+        # Reject early when the multipart parser already knows the size
+        if file.size is not None and file.size > self.max_upload_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File exceeds maximum size of {self.max_upload_size} bytes",
+            )
+
+
+class InMemoryStorageService(StorageService):
+    """Dict-backed storage for tests and benchmarks"""
+
+    scheme = "memory"
+
+    def __init__(self, bucket: str = "receipts", max_upload_size: Optional[int] = None) -> None:
+        super().__init__(bucket, max_upload_size or settings.max_upload_size)
+        self.objects: Dict[str, bytes] = {}
+        self.content_types: Dict[str, str] = {}
+
+    async def ensure_bucket(self) -> None:
+        return None
+
+    async def put_object(self, object_name: str, data: BinaryIO, content_type: str) -> None:
+        chunks = []
+        while chunk := data.read(CHUNK_SIZE):
+            chunks.append(chunk)
+
+        self.objects[object_name] = b"".join(chunks)
+        self.content_types[object_name] = content_type
+
+    async def get_object(self, object_name: str) -> bytes:
+        try:
+            return self.objects[object_name]
+        except KeyError:
+            raise StorageError(f"Object {object_name} not found")
+
+    async def remove_object(self, object_name: str) -> None:
+        self.objects.pop(object_name, None)
+        self.content_types.pop(object_name, None)
+
+    async def object_exists(self, object_name: str) -> bool:
+        return object_name in self.objects
+
+    async def stat_object(self, object_name: str) -> Optional[ObjectInfo]:
+        if object_name not in self.objects:
+            return None
+
+        return ObjectInfo(
+            size=len(self.objects[object_name]), content_type=self.content_types[object_name]
+        )
+
+    async def presigned_put_url(self, object_name: str, expires: timedelta) -> str:
+        return f"{self.build_path(object_name)}?expires={int(expires.total_seconds())}"
+
+    async def presigned_get_url(
+        self, object_name: str, expires: timedelta, cache_control: Optional[str] = None
+    ) -> str:
+        return f"{self.build_path(object_name)}?expires={int(expires.total_seconds())}"
+
+    async def move_object(self, source_name: str, object_name: str) -> None:
+        try:
+            self.objects[object_name] = self.objects.pop(source_name)
+            self.content_types[object_name] = self.content_types.pop(source_name)
+        except KeyError:
+            raise StorageError(f"Object {source_name} not found")
+
+    async def close(self) -> None:
+        return None
+
+
+class LocalStorageService(StorageService):
+    """Local filesystem storage, one directory per bucket"""
+
+    scheme = "file"
+
+    def __init__(
+        self, root: str | Path, bucket: str = "receipts", max_upload_size: Optional[int] = None
+    ) -> None:
+        super().__init__(bucket, max_upload_size or settings.max_upload_size)
+        self.bucket_dir = Path(root) / bucket
+
+    async def ensure_bucket(self) -> None:
+        await asyncio.to_thread(self.bucket_dir.mkdir, parents=True, exist_ok=True)
+
+    async def put_object(self, object_name: str, data: BinaryIO, content_type: str) -> None:
+        await self.ensure_bucket()
+        await asyncio.to_thread(self._write, self.bucket_dir / object_name, data)
+
+    async def get_object(self, object_name: str) -> bytes:
+        try:
+            return await asyncio.to_thread((self.bucket_dir / object_name).read_bytes)
+        except FileNotFoundError:
+            raise StorageError(f"Object {object_name} not found")
+
+    async def remove_object(self, object_name: str) -> None:
+        await asyncio.to_thread((self.bucket_dir / object_name).unlink, missing_ok=True)
+
+    async def object_exists(self, object_name: str) -> bool:
+        return await asyncio.to_thread((self.bucket_dir / object_name).is_file)
+
+    async def stat_object(self, object_name: str) -> Optional[ObjectInfo]:
+        try:
+            stat = await asyncio.to_thread((self.bucket_dir / object_name).stat)
+        except FileNotFoundError:
+            return None
+
+        return ObjectInfo(size=stat.st_size, content_type=mimetypes.guess_type(object_name)[0])
+
+    async def presigned_put_url(self, object_name: str, expires: timedelta) -> str:
+        return (self.bucket_dir / object_name).resolve().as_uri()
+
+    async def presigned_get_url(
+        self, object_name: str, expires: timedelta, cache_control: Optional[str] = None
+    ) -> str:
+        return (self.bucket_dir / object_name).resolve().as_uri()
+
+    async def move_object(self, source_name: str, object_name: str) -> None:
+        try:
+            await asyncio.to_thread(
+                self._move, self.bucket_dir / source_name, self.bucket_dir / object_name
+            )
+        except FileNotFoundError:
+            raise StorageError(f"Object {source_name} not found")
+
+    async def close(self) -> None:
+        return None
+
+    @staticmethod
+    def _move(source: Path, target: Path) -> None:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        source.replace(target)
+
+    @staticmethod
+    def _write(path: Path, data: BinaryIO) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.part")
+        try:
+            with open(tmp_path, "wb") as out:
+                while chunk := data.read(CHUNK_SIZE):
+                    out.write(chunk)
+            tmp_path.replace(path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+
+def content_object_name(content_hash: str) -> str:
+    """Object key for content with the given SHA-256 hex digest"""
+    return f"sha256/{content_hash}"
+
+
+def create_storage_service() -> StorageService:
+    """Build the storage backend selected by `settings.storage_backend`"""
+    if settings.storage_backend == "memory":
+        return InMemoryStorageService(settings.minio_bucket)
+    if settings.storage_backend == "local":
+        return LocalStorageService(settings.local_storage_path, settings.minio_bucket)
+
+    from app.services.minio_service import MinioService
+
+    return MinioService()
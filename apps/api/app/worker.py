@@ -0,0 +1,220 @@
+"""
+Background worker: claims jobs from Postgres and runs their handlers.
+
+    python -m app.worker
+
+Run more processes (or containers) to scale throughput; jobs are claimed with
+FOR UPDATE SKIP LOCKED so workers never block on or double-process a job. A
+claim lasts `job_visibility_timeout` seconds and is extended every
+`job_heartbeat_interval` while the handler runs, so only a crashed worker's
+jobs are reclaimed.
+"""
+
+import asyncio
+import multiprocessing
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Set
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.cache import get_receipt_cache
+from app.config import settings
+from app.database import AsyncSessionLocal, engine
+from app.models.jobs import Job
+from app.partitions import run_maintenance
+from app.repository.job_repository import JobRepository
+from app.repository.ocr_result_repository import OcrResultRepository
+from app.schema import check_schema_version
+from app.services.embedding_classifier import (
+    EncoderError,
+    get_embedding_classifier,
+    reload_embedding_classifier,
+)
+from app.services.item_categorizer import get_item_categorizer, reload_item_categorizer
+from app.services.ocr_service import create_ocr_engine
+from app.services.receipt_processor import HANDLERS, JobHandler, WorkerContext
+from app.services.storage_service import create_storage_service
+
+
+class Worker:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        context: WorkerContext,
+        handlers: Optional[Dict[str, JobHandler]] = None,
+        concurrency: int = settings.worker_concurrency,
+        poll_interval: float = settings.worker_poll_interval,
+        heartbeat_interval: float = settings.job_heartbeat_interval,
+        hit_flush_interval: float = settings.ocr_hit_flush_interval,
+    ) -> None:
+        self.session_factory = session_factory
+        self.context = context
+        self.handlers = handlers if handlers is not None else HANDLERS
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.hit_flush_interval = hit_flush_interval
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Keep up to `concurrency` jobs in flight until `stop` is set"""
+        in_flight: Set[asyncio.Task] = set()
+        stopping = asyncio.create_task(stop.wait())
+        flushed_at = time.monotonic()
+
+        while not stop.is_set():
+            free = self.concurrency - len(in_flight)
+            try:
+                jobs = await self.claim(free) if free > 0 else []
+            except SQLAlchemyError as e:
+                # A failover or pool timeout must not end the worker; retry after a poll
+                print(f"⚠️  Claiming jobs failed: {e}")
+                await asyncio.wait({stopping}, timeout=self.poll_interval)
+                continue
+
+            for job in jobs:
+                task = asyncio.create_task(self.run_job(job))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+            if not jobs:
+                # Idle or saturated: wake on a finished job, shutdown, or the next poll
+                await asyncio.wait(
+                    in_flight | {stopping},
+                    timeout=self.poll_interval,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+
+            if time.monotonic() - flushed_at >= self.hit_flush_interval:
+                await self.flush_hits()
+                flushed_at = time.monotonic()
+
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        await self.flush_hits()
+
+    async def run_once(self) -> int:
+        """Claim one batch, run it to completion and return how many jobs ran"""
+        jobs = await self.claim(self.concurrency)
+        await asyncio.gather(*(self.run_job(job) for job in jobs))
+        await self.flush_hits()
+
+        return len(jobs)
+
+    async def claim(self, limit: int) -> list:
+        async with self.session_factory() as db:
+            return await JobRepository(db).claim(limit)
+
+    async def run_job(self, job: Job) -> None:
+        """Run a claimed job and record its outcome; never raises"""
+        async with self.session_factory() as db:
+            jobs = JobRepository(db)
+            error: Optional[Exception] = None
+            heartbeat = asyncio.create_task(self.heartbeat(job))
+            try:
+                handler = self.handlers.get(job.kind)
+                if handler is None:
+                    raise LookupError(f"No handler for job kind {job.kind}")
+
+                await handler(self.context, db, job)
+            except Exception as e:
+                error = e
+            finally:
+                heartbeat.cancel()
+
+            try:
+                if error is None:
+                    if not await jobs.complete(job):
+                        print(
+                            f"⚠️  Job {job.id} finished after its claim lapsed; left to the rerun"
+                        )
+                    return
+
+                await db.rollback()
+                dead = await jobs.fail(job, f"{type(error).__name__}: {error}")
+                print(
+                    f"⚠️  Job {job.id} attempt {job.attempts} failed: {error}"
+                    + (" (dead)" if dead else "")
+                )
+            except Exception as e:
+                # Closing the session rolls back; the claim lapses and the job runs again
+                print(f"⚠️  Job {job.id} outcome not recorded, retried once its claim expires: {e}")
+
+    async def flush_hits(self) -> None:
+        """Write the OCR store hits counted since the last flush; on failure they are dropped"""
+        try:
+            async with self.session_factory() as db:
+                if await OcrResultRepository(db).flush_hits():
+                    await db.commit()
+        except SQLAlchemyError as e:
+            print(f"⚠️  OCR store hits not recorded: {e}")
+
+    async def heartbeat(self, job: Job) -> None:
+        """Keep extending the claim of a running job so no other worker reclaims it"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                async with self.session_factory() as db:
+                    if not await JobRepository(db).extend_claim(job):
+                        return
+            except Exception as e:
+                print(f"⚠️  Job {job.id} claim not extended: {e}")
+
+
+def reload_categories() -> None:
+    """SIGHUP handler: pick up an edited item category dictionary without a restart"""
+    try:
+        categorizer = reload_item_categorizer()
+        reload_embedding_classifier()
+    except (OSError, ValueError, KeyError, EncoderError) as e:
+        print(f"⚠️  Item categories not reloaded: {e}")
+        return
+
+    print(f"🏷️  Item categories reloaded: {len(categorizer.categories)}")
+
+
+async def main() -> None:
+    await check_schema_version(engine)
+
+    # Resolving the version fails fast when the engine is not installed
+    ocr = create_ocr_engine()
+    print(f"🔤 OCR engine: {ocr.version if ocr else 'disabled'}")
+
+    categorizer = get_item_categorizer()
+    print(f"🏷️  Item categories: {len(categorizer.categories)} ({categorizer.aliases} aliases)")
+    # Load the encoder model before claiming jobs, so no job waits for it
+    classifier = get_embedding_classifier()
+    encoder = classifier.encoder.__class__.__name__ if classifier else "disabled"
+    print(f"🧭 Embedding fallback: {encoder}")
+
+    storage = create_storage_service()
+    executor = ProcessPoolExecutor(
+        max_workers=settings.worker_processes, mp_context=multiprocessing.get_context("spawn")
+    )
+    worker = Worker(AsyncSessionLocal, WorkerContext(storage=storage, executor=executor, ocr=ocr))
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    loop.add_signal_handler(signal.SIGHUP, reload_categories)
+
+    # Keeps receipts partitions created ahead of time and archives old ones
+    maintenance = asyncio.create_task(run_maintenance(engine, stop))
+
+    print(f"👷 Worker started (concurrency={worker.concurrency})")
+    try:
+        await worker.run(stop)
+    finally:
+        stop.set()
+        await maintenance
+        executor.shutdown(wait=True)
+        await storage.close()
+        await get_receipt_cache().close()
+        await engine.dispose()
+        print("🛑 Worker stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,443 @@
+"""
+Load and latency benchmark for POST /receipts, POST /receipts/bulk and GET /receipts.
+
+Drives the app in-process through httpx's ASGI transport, or over HTTP against
+a uvicorn process it starts itself (`--uvicorn`). Both run against a migrated
+temporary SQLite database (or `--database-url`) and the in-memory object store,
+so nothing leaves the machine. Each scenario reports throughput, p50/p95/p99
+latency, SQL statements per request (from the X-DB-Query-Count header) and peak
+RSS. Results can be written as JSON and compared with an earlier run; any
+metric worse than the baseline by more than `--threshold` fails the run.
+
+    python -m benchmarks.api_benchmark --output baseline.json
+    python -m benchmarks.api_benchmark --baseline baseline.json --threshold 0.10
+    python -m benchmarks.api_benchmark --uvicorn --concurrency 32 --requests 2000
+    python -m benchmarks.api_benchmark --scenarios list --database-url postgresql+asyncpg://...
+"""
+
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import logging
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from alembic import command
+from alembic.config import Config
+from PIL import Image
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.cache import Cache, InMemoryCacheBackend, set_receipt_cache
+from app.database import create_engine, get_db, get_read_db
+from app.main import app
+from app.models import Job, Receipt, ReceiptCounter, Users
+from app.repository.receipt_repository import ReceiptRepository
+from app.resources import get_image_url_service, get_storage_service
+from app.services.image_url_service import ImageUrlService
+from app.services.storage_service import InMemoryStorageService
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+# Metric path -> True when a larger value is worse
+COMPARED_METRICS = {
+    "throughput_rps": False,
+    "latency_ms.p50": True,
+    "latency_ms.p95": True,
+    "latency_ms.p99": True,
+    "queries_per_request": True,
+}
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    build: Callable[[], Dict[str, Any]]  # keyword arguments for one httpx request
+
+
+class Payloads:
+    """JPEG uploads of a fixed size, each with distinct bytes so none is a duplicate"""
+
+    def __init__(self, size_kb: int) -> None:
+        image = Image.new("RGB", (64, 64), (200, 180, 120))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG")
+        self.image = buffer.getvalue()  # decoders stop at the end marker, padding is ignored
+        self.padding = max(size_kb * 1024 - len(self.image), 16)
+        self.run = os.urandom(8)
+        self._next = itertools.count()
+
+    def next(self) -> bytes:
+        unique = self.run + next(self._next).to_bytes(8, "big")
+        return self.image + unique * (self.padding // len(unique) + 1)
+
+
+def build_scenarios(args: argparse.Namespace) -> Dict[str, Scenario]:
+    payloads = Payloads(args.payload_kb)
+    form = {"user_id": "1", "purchase_date": "2025-12-01"}
+
+    def upload() -> Dict[str, Any]:
+        return {"data": form, "files": {"file": ("receipt.jpg", payloads.next(), "image/jpeg")}}
+
+    def bulk() -> Dict[str, Any]:
+        files = [
+            ("files", (f"receipt-{i}.jpg", payloads.next(), "image/jpeg"))
+            for i in range(args.bulk_files)
+        ]
+        return {"data": form, "files": files}
+
+    def listing() -> Dict[str, Any]:
+        return {"params": {"user_id": 1, "limit": args.page_size}}
+
+    return {
+        "upload": Scenario("upload", "POST", "/receipts", upload),
+        "bulk": Scenario("bulk", "POST", "/receipts/bulk", bulk),
+        "list": Scenario("list", "GET", "/receipts", listing),
+    }
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Linear-interpolated percentile of an ascending list"""
+    if not ordered:
+        return 0.0
+
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int, warmup: int
+) -> Dict[str, Any]:
+    for _ in range(warmup):
+        await client.request(scenario.method, scenario.path, **scenario.build())
+
+    latencies: List[float] = []
+    queries: List[int] = []
+    db_times: List[float] = []
+    errors = 0
+    issued = itertools.count()
+
+    async def worker() -> None:
+        nonlocal errors
+        while next(issued) < requests:
+            kwargs = scenario.build()
+            start = time.perf_counter()
+            response = await client.request(scenario.method, scenario.path, **kwargs)
+            latencies.append(time.perf_counter() - start)
+
+            if response.status_code >= 400:
+                errors += 1
+            queries.append(int(response.headers.get("x-db-query-count", 0)))
+            db_times.append(float(response.headers.get("x-db-time-ms", 0)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    ordered = sorted(latency * 1000 for latency in latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": {
+            "p50": round(percentile(ordered, 0.50), 3),
+            "p95": round(percentile(ordered, 0.95), 3),
+            "p99": round(percentile(ordered, 0.99), 3),
+            "mean": round(sum(ordered) / len(ordered), 3),
+            "max": round(ordered[-1], 3),
+        },
+        "queries_per_request": round(sum(queries) / len(queries), 2),
+        "db_time_ms_per_request": round(sum(db_times) / len(db_times), 3),
+    }
+
+
+def migrate(database_url: str) -> None:
+    """Bring the database to the head revision; runs before the event loop starts"""
+    config = Config(str(API_DIR / "alembic.ini"))
+    config.set_main_option("sqlalchemy.url", database_url)
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
+
+
+async def seed(database_url: str, count: int) -> None:
+    """Reset receipts and insert `count` of them for user 1"""
+    engine = create_engine(database_url)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessionmaker() as session:
+        for model in (Job, Receipt, ReceiptCounter):
+            await session.execute(delete(model))
+        if await session.get(Users, 1) is None:
+            session.add(Users(id=1, email="bench@pantrypilot.com", name="Bench User"))
+        await session.commit()
+
+        rows = [
+            {
+                "user_id": 1,
+                "image_path": f"memory://receipts/sha256/{i:064x}",
+                "content_hash": f"{i:064x}",
+                "purchase_date": date(2025, 1, 1),
+                "status": "processed",
+            }
+            for i in range(count)
+        ]
+        if rows:
+            await ReceiptRepository(session).bulk_insert(rows)
+
+    await engine.dispose()
+
+
+@asynccontextmanager
+async def in_process_client(
+    database_url: str,
+) -> AsyncIterator[Tuple[httpx.AsyncClient, Optional[int]]]:
+    """Client calling the ASGI app directly, with the database and storage swapped in"""
+    engine = create_engine(database_url)  # instrumented, so X-DB-Query-Count is reported
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    storage = InMemoryStorageService()
+    image_urls = ImageUrlService(storage)
+
+    async def session():
+        async with sessionmaker() as db:
+            yield db
+
+    app.dependency_overrides.update(
+        {
+            get_db: session,
+            get_read_db: session,
+            get_storage_service: lambda: storage,
+            get_image_url_service: lambda: image_urls,
+        }
+    )
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            yield client, None
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+
+@asynccontextmanager
+async def uvicorn_client(
+    database_url: str, concurrency: int, cache: bool
+) -> AsyncIterator[Tuple[httpx.AsyncClient, Optional[int]]]:
+    """Client talking HTTP to a uvicorn process started for the run"""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "STORAGE_BACKEND": "memory",
+        "RECEIPT_CACHE_BACKEND": "memory" if cache else "none",
+        "SLOW_QUERY_MS": "60000",  # see the note on SQLite in main()
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)]
+        + ["--log-level", "warning"],
+        cwd=API_DIR,
+        env=env,
+    )
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60
+        ) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    await client.get("/health")
+                    break
+                except httpx.TransportError:
+                    if server.poll() is not None or time.monotonic() > deadline:
+                        raise RuntimeError("uvicorn did not start")
+                    await asyncio.sleep(0.2)
+
+            yield client, server.pid
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def peak_rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """Peak resident set size of this process, or of `pid` while it runs (Linux)"""
+    if pid is None:
+        kilobytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(kilobytes / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+async def run(args: argparse.Namespace, database_url: str) -> Dict[str, Any]:
+    await seed(database_url, args.seed_receipts)
+    # A fresh cache per run; a backend-less Cache reads straight through. The memory
+    # backend is safe here: no worker runs, so every write happens in this process
+    set_receipt_cache(Cache(None if args.no_cache else InMemoryCacheBackend(), name="receipts"))
+
+    scenarios = build_scenarios(args)
+    client_factory = (
+        uvicorn_client(database_url, args.concurrency, not args.no_cache)
+        if args.uvicorn
+        else in_process_client(database_url)
+    )
+
+    results: Dict[str, Any] = {}
+    async with client_factory as (client, server_pid):
+        for name in args.scenarios:
+            results[name] = await run_scenario(
+                client, scenarios[name], args.requests, args.concurrency, args.warmup
+            )
+            results[name]["peak_rss_mb"] = peak_rss_mb(server_pid)
+            print_scenario(name, results[name])
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            "mode": "uvicorn" if args.uvicorn else "in-process",
+            "database": database_url.split("://")[0],
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "payload_kb": args.payload_kb,
+            "bulk_files": args.bulk_files,
+            "page_size": args.page_size,
+            "seed_receipts": args.seed_receipts,
+            "cache": not args.no_cache,
+        },
+        "scenarios": results,
+        "client_peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=API_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metric(result: Dict[str, Any], path: str) -> float:
+    value: Any = result
+    for key in path.split("."):
+        value = value[key]
+    return value
+
+
+def compare(
+    current: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[Tuple[str, str, float, float, float, bool]]:
+    """(scenario, metric, baseline, current, relative change, regressed) per compared metric"""
+    rows = []
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+
+        for path, higher_is_worse in COMPARED_METRICS.items():
+            before, after = metric(base, path), metric(result, path)
+            change = (after - before) / before if before else (1.0 if after > before else 0.0)
+            regressed = change > threshold if higher_is_worse else change < -threshold
+            rows.append((name, path, before, after, change, regressed))
+
+    return rows
+
+
+def print_scenario(name: str, result: Dict[str, Any]) -> None:
+    latency = result["latency_ms"]
+    print(
+        f"{name:>8}  {result['throughput_rps']:>9.1f} req/s  "
+        f"p50 {latency['p50']:>8.2f}  p95 {latency['p95']:>8.2f}  p99 {latency['p99']:>8.2f} ms  "
+        f"{result['queries_per_request']:>5.1f} queries/req  "
+        f"errors {result['errors']}  peak RSS {result['peak_rss_mb']} MB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=["upload", "bulk", "list"],
+        default=["upload", "bulk", "list"],
+    )
+    parser.add_argument("--requests", type=int, default=500, help="per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests per scenario")
+    parser.add_argument("--payload-kb", type=int, default=200, help="size of each uploaded image")
+    parser.add_argument("--bulk-files", type=int, default=5, help="images per bulk request")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--seed-receipts", type=int, default=10_000)
+    parser.add_argument("--no-cache", action="store_true", help="disable the receipt cache")
+    parser.add_argument("--uvicorn", action="store_true", help="benchmark a local uvicorn process")
+    parser.add_argument(
+        "--database-url",
+        default=None,
+        help="defaults to a temporary SQLite file; its receipts and jobs are replaced",
+    )
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="JSON results to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=0.10, help="allowed relative regression, 0.10 = 10%%"
+    )
+    args = parser.parse_args()
+
+    # SQLite serialises writers, so under load nearly every insert would be logged as slow
+    logging.getLogger("app.sql").setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database_url = args.database_url or f"sqlite+aiosqlite:///{Path(tmp_dir) / 'bench.db'}"
+        migrate(database_url)
+        results = asyncio.run(run(args, database_url))
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        rows = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+        print(f"\n{'scenario':>8}  {'metric':<20} {'baseline':>10} {'current':>10} {'change':>8}")
+        for name, path, before, after, change, regressed in rows:
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{name:>8}  {path:<20} {before:>10.2f} {after:>10.2f} {change:>+7.1%}{flag}")
+
+        if any(row[-1] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
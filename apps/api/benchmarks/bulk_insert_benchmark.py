@@ -0,0 +1,100 @@
+"""
+Compare ReceiptRepository.save_many (ORM unit of work) with bulk_insert.
+
+    python -m benchmarks.bulk_insert_benchmark
+    python -m benchmarks.bulk_insert_benchmark --sizes 100 10000 --database-url postgresql+asyncpg://...
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.models import Receipt, Users
+from app.repository.receipt_repository import ReceiptRepository
+
+
+def make_rows(count: int) -> list:
+    return [
+        {
+            "user_id": 1,
+            "image_path": f"minio://receipts/backfill-{i}.jpg",
+            "purchase_date": date(2025, 1, 1),
+            "status": "uploaded",
+        }
+        for i in range(count)
+    ]
+
+
+async def time_orm(sessionmaker, rows: list) -> float:
+    async with sessionmaker() as session:
+        receipts = [Receipt(**row) for row in rows]
+        start = time.perf_counter()
+        await ReceiptRepository(session).save_many(receipts)
+        return time.perf_counter() - start
+
+
+async def time_bulk(sessionmaker, rows: list) -> float:
+    async with sessionmaker() as session:
+        start = time.perf_counter()
+        await ReceiptRepository(session).bulk_insert(rows)
+        return time.perf_counter() - start
+
+
+async def reset(sessionmaker) -> None:
+    async with sessionmaker() as session:
+        await session.execute(delete(Receipt))
+        await session.commit()
+
+
+async def run(database_url: str, sizes: list) -> None:
+    engine = create_async_engine(database_url, echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessionmaker() as session:
+        if await session.get(Users, 1) is None:
+            session.add(Users(id=1, email="bench@pantrypilot.com", name="Bench User"))
+            await session.commit()
+
+    print(
+        f"{'rows':>8} {'orm s':>9} {'bulk s':>9} "
+        f"{'orm rows/s':>12} {'bulk rows/s':>12} {'speedup':>8}"
+    )
+    for size in sizes:
+        rows = make_rows(size)
+
+        await reset(sessionmaker)
+        orm_seconds = await time_orm(sessionmaker, rows)
+        await reset(sessionmaker)
+        bulk_seconds = await time_bulk(sessionmaker, rows)
+
+        print(
+            f"{size:>8} {orm_seconds:>9.3f} {bulk_seconds:>9.3f} "
+            f"{size / orm_seconds:>12.0f} {size / bulk_seconds:>12.0f} "
+            f"{orm_seconds / bulk_seconds:>7.1f}x"
+        )
+
+    await reset(sessionmaker)
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database_url = args.database_url or f"sqlite+aiosqlite:///{Path(tmp_dir) / 'bench.db'}"
+        asyncio.run(run(database_url, args.sizes))
+
+
+if __name__ == "__main__":
+    main()
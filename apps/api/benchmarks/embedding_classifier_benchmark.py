@@ -0,0 +1,113 @@
+"""
+Items/sec of the embedding category classifier: one batch per receipt against
+the per-item loop sketched in docs/mcp-tools-design.md.
+
+The loop encodes each item on its own and compares it with each category in a
+Python `for` loop (a category scoring as its closest alias, as in the
+classifier). The classifier encodes a receipt's items in one batch and scores
+them with one matrix multiply and `argpartition`. The built-in dictionary is
+grown to `--categories` categories of made-up aliases to show how both scale.
+Both use the deterministic HashingEncoder on one core; pick another encoder
+with `--encoder` when its package is installed.
+
+    python -m benchmarks.embedding_classifier_benchmark
+    python -m benchmarks.embedding_classifier_benchmark --categories 8 1000 --receipts 200
+"""
+
+import argparse
+import random
+import string
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.services.embedding_classifier import EmbeddingClassifier, Encoder, create_encoder
+from app.services.item_categorizer import load_categories
+
+
+def grow(categories: List[Dict[str, Any]], count: int, rng: random.Random) -> list:
+    grown = list(categories)
+    for i in range(len(categories), count):
+        aliases = [
+            "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(25)
+        ]
+        grown.append({"id": 1000 + i, "name": f"Category {i}", "aliases": aliases})
+    return grown[:count]
+
+
+def make_receipts(
+    categories: List[Dict[str, Any]], receipts: int, items: int, rng: random.Random
+) -> List[List[str]]:
+    corpus = []
+    for _ in range(receipts):
+        names = []
+        for _ in range(items):
+            # Two aliases of a built-in category run together, which the dictionary misses
+            first, second = rng.sample(rng.choice(categories[:8])["aliases"], 2)
+            names.append(f"{first}{second}".upper())
+        corpus.append(names)
+    return corpus
+
+
+def per_item_loop(encoder: Encoder, blocks: List[np.ndarray], names: List[str]) -> List[int]:
+    best_indexes = []
+    for name in names:
+        vector = encoder.encode([name])[0]
+        vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        best_index, best_score = -1, -2.0
+        for index, block in enumerate(blocks):
+            score = float((block @ vector).max())
+            if score > best_score:
+                best_index, best_score = index, score
+        best_indexes.append(best_index)
+    return best_indexes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--receipts", type=int, default=100)
+    parser.add_argument("--items", type=int, default=30, help="items per receipt")
+    parser.add_argument("--categories", type=int, nargs="+", default=[8, 100, 1000])
+    parser.add_argument("--encoder", default="hashing")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    encoder = create_encoder(args.encoder)
+    builtin = load_categories()
+    corpus = make_receipts(builtin, args.receipts, args.items, rng)
+    items = args.receipts * args.items
+
+    print(
+        f"{'categories':>10} {'aliases':>8} {'loop items/s':>13} {'batch items/s':>14} "
+        f"{'speedup':>8} {'same top-1':>11}"
+    )
+    for count in args.categories:
+        classifier = EmbeddingClassifier(encoder, grow(builtin, count, rng))
+        ends = [*classifier.starts[1:], len(classifier.matrix)]
+        blocks = [classifier.matrix[start:end] for start, end in zip(classifier.starts, ends)]
+
+        start = time.perf_counter()
+        looped = [per_item_loop(encoder, blocks, names) for names in corpus]
+        loop = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = [classifier.top_k(names, k=3) for names in corpus]
+        batch = time.perf_counter() - start
+
+        categories = [category_id for category_id, _ in classifier.categories]
+        same = sum(
+            categories[index] == matches[0].category_id
+            for loop_receipt, batch_receipt in zip(looped, batched)
+            for index, matches in zip(loop_receipt, batch_receipt)
+        )
+        print(
+            f"{len(classifier.categories):>10} {len(classifier.matrix):>8} "
+            f"{items / loop:>13.0f} {items / batch:>14.0f} {loop / batch:>7.1f}x "
+            f"{same / items:>11.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Per-receipt latency of item categorization: the keyword loop sketched in
+docs/mcp-tools-design.md against the indexed CategoryMatcher.
+
+Receipts are drawn from the dictionary's aliases as receipt text: upper case,
+sizes and packaging words, plurals, a share with a typo and a share of names
+no category knows. The dictionary is the built-in one, grown with
+`--synonyms` made-up aliases per category to show how each approach scales
+with it. Both run on one core; the matcher is timed cold (fresh correction
+memo) and warm.
+
+    python -m benchmarks.item_categorizer_benchmark
+    python -m benchmarks.item_categorizer_benchmark --synonyms 0 200 2000 --items 40
+"""
+
+import argparse
+import random
+import string
+import time
+from typing import Any, Dict, List, Optional
+
+from app.services.item_categorizer import CategoryMatcher, load_categories
+
+SIZES = ["", "", " 2L", " 500G", " 12PK", " 1LB", " ORG", " LG"]
+
+
+def grow(categories: List[Dict[str, Any]], synonyms: int, rng: random.Random) -> list:
+    grown = []
+    for category in categories:
+        extra = [
+            "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 10)))
+            for _ in range(synonyms)
+        ]
+        grown.append({**category, "aliases": category["aliases"] + extra})
+    return grown
+
+
+def typo(word: str, rng: random.Random) -> str:
+    i = rng.randrange(1, len(word))
+    return word[:i] + word[i - 1] + word[i:]  # a doubled letter, a common OCR slip
+
+
+def make_receipts(
+    categories: List[Dict[str, Any]], receipts: int, items: int, rng: random.Random
+) -> List[List[str]]:
+    aliases = [alias for category in categories for alias in category["aliases"][:40]]
+    corpus = []
+    for _ in range(receipts):
+        names = []
+        for _ in range(items):
+            roll = rng.random()
+            if roll < 0.1:
+                names.append(f"ITEM {rng.randrange(10_000)}")  # unknown
+                continue
+            name = rng.choice(aliases)
+            if roll < 0.25:
+                name = typo(name, rng)
+            names.append(f"{name.upper()}{'S' if rng.random() < 0.3 else ''}{rng.choice(SIZES)}")
+        corpus.append(names)
+    return corpus
+
+
+def keyword_loop(keywords: Dict[int, List[str]], item_name: str) -> Optional[int]:
+    """The sketch from docs/mcp-tools-design.md, minus its per-hit database query"""
+    item_lower = item_name.lower()
+    for category_id, words in keywords.items():
+        for keyword in words:
+            if keyword in item_lower:
+                return category_id
+    return None
+
+
+def per_receipt_ms(seconds: float, receipts: int) -> float:
+    return seconds / receipts * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--receipts", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=30, help="items per receipt")
+    parser.add_argument("--synonyms", type=int, nargs="+", default=[0, 500, 2000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    builtin = load_categories()
+    corpus = make_receipts(builtin, args.receipts, args.items, rng)
+
+    print(
+        f"{'aliases':>8} {'build ms':>9} {'loop ms':>9} {'cold ms':>9} {'warm ms':>9} "
+        f"{'speedup':>8} {'matched':>8}   (ms per receipt of {args.items} items)"
+    )
+    for synonyms in args.synonyms:
+        categories = grow(builtin, synonyms, rng)
+        keywords = {category["id"]: category["aliases"] for category in categories}
+
+        start = time.perf_counter()
+        for names in corpus:
+            [keyword_loop(keywords, name) for name in names]
+        loop = time.perf_counter() - start
+
+        start = time.perf_counter()
+        matcher = CategoryMatcher(categories)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for names in corpus:
+            matcher.match_many(names)
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = [matcher.match_many(names) for names in corpus]
+        warm = time.perf_counter() - start
+
+        matched = sum(m.category_id is not None for names in results for m in names)
+        print(
+            f"{matcher.aliases:>8} {build * 1000:>9.1f} {per_receipt_ms(loop, len(corpus)):>9.3f} "
+            f"{per_receipt_ms(cold, len(corpus)):>9.3f} {per_receipt_ms(warm, len(corpus)):>9.3f} "
+            f"{loop / warm:>7.1f}x {matched / (len(corpus) * args.items):>8.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
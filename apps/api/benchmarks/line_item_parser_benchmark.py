@@ -0,0 +1,153 @@
+"""
+Throughput and accuracy of the line-item parser on synthetic OCR text.
+
+Receipts mix plain, quantity, weighed and two-line items with store headers,
+discounts, totals and payment lines; a share of them get OCR damage (a price
+dropped or garbled) so low-confidence receipts show up too. Parsing is timed
+on one core and reported as receipts/sec and lines/sec, with the share of
+receipts parsed exactly and the share at or above `--min-confidence`. The
+items of `--persist` receipts are then written with
+`ReceiptItemRepository.replace`, one multi-row INSERT per receipt.
+
+    python -m benchmarks.line_item_parser_benchmark
+    python -m benchmarks.line_item_parser_benchmark --receipts 50000 --damaged-share 0.2
+"""
+
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+from typing import List, Tuple
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.repository.receipt_item_repository import ReceiptItemRepository
+from app.services.line_item_parser import ParsedReceipt, parse_line_items
+
+NAMES = ["MILK 2L", "BREAD", "EGGS 12", "BUTTER", "YOGURT", "CHEESE", "RICE 1KG", "PASTA"]
+WEIGHED = ["BANANAS", "APPLES", "TOMATOES", "CHICKEN BREAST"]
+HEADER = "FRESH MART #{store}\nTEL 555-{phone:04d}\nDATE 12/01/2025 14:32\nCASHIER 7"
+
+Expected = List[Tuple[str, Decimal]]
+
+
+def cents(value: float) -> Decimal:
+    return Decimal(f"{value:.2f}")
+
+
+def make_receipt(rng: random.Random, damaged: bool) -> Tuple[str, Expected]:
+    lines = [HEADER.format(store=rng.randrange(1000), phone=rng.randrange(10_000))]
+    expected: Expected = []
+    for _ in range(rng.randint(5, 40)):
+        kind = rng.random()
+        if kind < 0.6:
+            name, total = rng.choice(NAMES), cents(rng.uniform(0.5, 30))
+            lines.append(f"{name:<24}{total:>8}")
+        elif kind < 0.75:
+            name, quantity, price = rng.choice(NAMES), rng.randint(2, 6), cents(rng.uniform(0.5, 9))
+            total = price * quantity
+            lines.append(f"{quantity} x {name:<20}{total:>8}")
+        elif kind < 0.9:
+            name, weight, price = rng.choice(WEIGHED), rng.uniform(0.2, 2.5), rng.uniform(0.9, 12)
+            total = cents(weight * price)
+            lines.append(f"{name}\n{weight:.3f} kg @ {price:.2f}/kg{total:>12}")
+        else:
+            name, quantity, price = rng.choice(NAMES), rng.randint(2, 4), cents(rng.uniform(0.5, 9))
+            total = price * quantity
+            lines.append(f"{name:<24}{total:>8}\n{quantity} @ {price}")
+        expected.append((name, total))
+
+    subtotal = sum((total for _, total in expected), Decimal(0))
+    if rng.random() < 0.2:
+        discount = cents(rng.uniform(0.1, 2))
+        lines.append(f"COUPON {rng.choice(NAMES):<17}{-discount:>8}")
+        subtotal -= discount
+
+    if damaged:  # OCR lost the name or mangled the price of one line
+        i = rng.randrange(1, len(lines))
+        lines[i] = lines[i].replace(".", ",", 1) if rng.random() < 0.5 else "?? " + lines[i][-8:]
+        expected = []  # no exact parse is expected
+
+    tax = cents(float(subtotal) * 0.05)
+    lines.append(f"SUBTOTAL{subtotal:>24}\nTAX{tax:>29}\nTOTAL{subtotal + tax:>27}")
+    lines.append(f"VISA{subtotal + tax:>28}\nTHANK YOU")
+    return "\n".join(lines), expected
+
+
+def exact(parsed: ParsedReceipt, expected: Expected) -> bool:
+    return bool(expected) and [(i.item_name, i.total_price) for i in parsed.items] == expected
+
+
+async def time_persist(database_url: str, parsed: List[ParsedReceipt]) -> float:
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    try:
+        async with async_sessionmaker(engine)() as db:
+            repo = ReceiptItemRepository(db)
+            start = time.perf_counter()
+            for receipt_id, result in enumerate(parsed, start=1):
+                await repo.replace(receipt_id, result.items)
+            await db.commit()
+            return time.perf_counter() - start
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--receipts", type=int, default=20_000)
+    parser.add_argument("--damaged-share", type=float, default=0.1, help="share with OCR damage")
+    parser.add_argument("--min-confidence", type=float, default=0.8)
+    parser.add_argument("--persist", type=int, default=2_000, help="receipts to write, 0 skips")
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [make_receipt(rng, rng.random() < args.damaged_share) for _ in range(args.receipts)]
+    texts = [text for text, _ in corpus]
+    lines = sum(text.count("\n") + 1 for text in texts)
+
+    start = time.perf_counter()
+    parsed = [parse_line_items(text) for text in texts]
+    seconds = time.perf_counter() - start
+
+    clean = [(result, expected) for result, (_, expected) in zip(parsed, corpus) if expected]
+    correct = sum(exact(result, expected) for result, expected in clean)
+    confident = sum(result.confidence >= args.min_confidence for result in parsed)
+    items = sum(len(result.items) for result in parsed)
+
+    print(f"{'receipts':>9} {'lines':>9} {'seconds':>9} {'receipts/s':>11} {'lines/s':>11}")
+    print(
+        f"{len(texts):>9} {lines:>9} {seconds:>9.3f} "
+        f"{len(texts) / seconds:>11.0f} {lines / seconds:>11.0f}"
+    )
+    print(
+        f"\nexact parses of undamaged receipts: {correct}/{len(clean)} ({correct / len(clean):.1%})"
+    )
+    print(
+        f"confidence >= {args.min_confidence}: {confident}/{len(parsed)} "
+        f"({confident / len(parsed):.1%}); the rest would go to a model-based extractor"
+    )
+
+    if args.persist:
+        sample = parsed[: args.persist]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            url = args.database_url or f"sqlite+aiosqlite:///{Path(tmp_dir) / 'bench.db'}"
+            persisted = asyncio.run(time_persist(url, sample))
+
+        written = sum(len(result.items) for result in sample)
+        print(
+            f"\npersisted {len(sample)} receipts ({written} of {items} items) in {persisted:.3f}s: "
+            f"{len(sample) / persisted:.0f} receipts/s, one DELETE + one INSERT each"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Throughput of receipt image preprocessing on a synthetic corpus.
+
+The corpus mixes clean flatbed scans (fast path) with phone photos of the same
+receipts: on a dark table, tilted, noisy and washed out. Images are timed on
+one core through `preprocess_batch`, then across a process pool of `--workers`
+processes through `preprocess_many`, and reported as images/sec and
+images/sec per core.
+
+    python -m benchmarks.preprocessing_benchmark
+    python -m benchmarks.preprocessing_benchmark --images 400 --photo-share 0.8 --workers 8
+"""
+
+import argparse
+import asyncio
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from app.services.image_preprocessing import (
+    PreprocessingError,
+    preprocess_batch,
+    preprocess_many,
+)
+
+
+def make_scan(rng: np.random.Generator, lines: int) -> Image.Image:
+    image = Image.new("L", (600, lines * 22 + 40), 250)
+    draw = ImageDraw.Draw(image)
+    for i in range(lines):
+        price = rng.uniform(0.5, 80)
+        draw.text((20, 20 + i * 22), f"ITEM {i:03d} GROCERY {rng.integers(1e6):06d}", fill=20)
+        draw.text((420, 20 + i * 22), f"{price:7.2f}", fill=20)
+    return image
+
+
+def make_photo(rng: np.random.Generator, scan: Image.Image) -> Image.Image:
+    low, high = int(rng.integers(70, 120)), int(rng.integers(150, 200))
+    page = scan.point(lambda v: low + v * (high - low) // 255)
+    page = page.rotate(float(rng.uniform(-8, 8)), expand=True, fillcolor=40)
+
+    side = max(page.size) + 400
+    table = Image.new("L", (side, side), int(rng.integers(20, 60)))
+    table.paste(page, (int(rng.integers(0, 400)), int(rng.integers(0, 400))))
+
+    pixels = np.asarray(table, dtype=np.float32)
+    pixels += rng.normal(0, rng.uniform(2, 12), pixels.shape).astype(np.float32)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+def make_corpus(count: int, photo_share: float, seed: int) -> List[bytes]:
+    rng = np.random.default_rng(seed)
+    corpus = []
+    for _ in range(count):
+        image = make_scan(rng, int(rng.integers(15, 50)))
+        if rng.random() < photo_share:
+            image = make_photo(rng, image)
+
+        out = io.BytesIO()
+        image.save(out, "JPEG", quality=90)
+        corpus.append(out.getvalue())
+
+    return corpus
+
+
+def report(label: str, images: int, seconds: float, cores: int) -> None:
+    rate = images / seconds
+    print(f"{label:<24} {images:>7} {seconds:>9.2f} {rate:>10.1f} {rate / cores:>12.1f}")
+
+
+async def time_pool(corpus: List[bytes], workers: int, batch_size: int) -> float:
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        await preprocess_many(executor, corpus[: workers * batch_size], batch_size)  # warm up
+
+        start = time.perf_counter()
+        await preprocess_many(executor, corpus, batch_size)
+        return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--photo-share", type=float, default=0.5, help="share of corpus as photos")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=8,
+        help="images per pool task",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"Building {args.images} images ({args.photo_share:.0%} photos)...")
+    corpus = make_corpus(args.images, args.photo_share, args.seed)
+    preprocess_batch(corpus[:2])  # warm up
+
+    start = time.perf_counter()
+    results = preprocess_batch(corpus)
+    single = time.perf_counter() - start
+
+    errors = sum(isinstance(result, PreprocessingError) for result in results)
+    metrics = [result.metrics for result in results if not isinstance(result, PreprocessingError)]
+    fast = sum(m.fast_path for m in metrics)
+    print(
+        f"fast path {fast}/{len(metrics)}, cropped {sum(m.cropped for m in metrics)}, "
+        f"deskewed {sum(m.deskewed for m in metrics)}, "
+        f"denoised {sum(m.denoised for m in metrics)}, "
+        f"stretched {sum(m.stretched for m in metrics)}, errors {errors}"
+    )
+
+    pooled = asyncio.run(time_pool(corpus, args.workers, args.batch_size))
+
+    print(f"\n{'run':<24} {'images':>7} {'seconds':>9} {'images/s':>10} {'images/s/core':>12}")
+    report("1 core", len(corpus), single, 1)
+    report(f"{args.workers} processes", len(corpus), pooled, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Compare the receipt listing read paths: ORM objects rebuilt into ReceiptResponse
+and validated by pydantic, against LIST_COLUMNS rows encoded straight to JSON
+bytes with orjson.
+
+    python -m benchmarks.receipt_listing_benchmark
+    python -m benchmarks.receipt_listing_benchmark --sizes 50 500 --database-url postgresql+asyncpg://...
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.models import Receipt, ReceiptCounter, Users
+from app.repository.receipt_repository import ReceiptRepository
+from app.routers.response.encoding import JSONBytesResponse
+from app.routers.response.receipt import ReceiptResponse, ReceiptsResponse, receipt_payload
+
+
+async def orm_page(sessionmaker, size: int) -> bytes:
+    """The listing as it was: full ORM rows, hand-built models, response_model validation"""
+    async with sessionmaker() as session:
+        page = await ReceiptRepository(session).get_all({"user_id": 1, "limit": size})
+        responses = [
+            ReceiptResponse(
+                id=receipt.id,
+                user_id=receipt.user_id,
+                image_path=receipt.image_path,
+                purchase_date=str(receipt.purchase_date),
+                status=receipt.status,
+                created_at=receipt.created_at.isoformat() if receipt.created_at else "",
+                content_hash=receipt.content_hash,
+                thumbnail_path=receipt.thumbnail_path,
+                web_image_path=receipt.web_image_path,
+            )
+            for receipt in page.items
+        ]
+        response = ReceiptsResponse(total=len(responses), receipts=responses)
+        # FastAPI validates the returned model again against response_model
+        return ReceiptsResponse.model_validate(response.model_dump()).model_dump_json().encode()
+
+
+async def row_page(sessionmaker, size: int) -> bytes:
+    async with sessionmaker() as session:
+        page = await ReceiptRepository(session).get_rows({"user_id": 1, "limit": size})
+        return JSONBytesResponse(
+            {
+                "total": len(page.items),
+                "receipts": [receipt_payload(receipt) for receipt in page.items],
+                "next_cursor": page.next_cursor,
+                "prev_cursor": page.prev_cursor,
+            }
+        ).body
+
+
+async def rows_per_second(render, sessionmaker, size: int, repeat: int) -> float:
+    await render(sessionmaker, size)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await render(sessionmaker, size)
+
+    return size * repeat / (time.perf_counter() - start)
+
+
+async def seed(sessionmaker, count: int) -> None:
+    async with sessionmaker() as session:
+        await session.execute(delete(Receipt))
+        await session.execute(delete(ReceiptCounter))
+        if await session.get(Users, 1) is None:
+            session.add(Users(id=1, email="bench@pantrypilot.com", name="Bench User"))
+        await session.commit()
+
+        await ReceiptRepository(session).bulk_insert(
+            [
+                {
+                    "user_id": 1,
+                    "image_path": f"minio://receipts/sha256/{i:064x}",
+                    "content_hash": f"{i:064x}",
+                    "purchase_date": date(2025, 1, 1),
+                    "status": "processed",
+                }
+                for i in range(count)
+            ]
+        )
+
+
+async def run(database_url: str, sizes: list, repeat: int) -> None:
+    engine = create_async_engine(database_url, echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    await seed(sessionmaker, max(sizes))
+
+    print(f"{'page':>8} {'orm rows/s':>12} {'row rows/s':>12} {'speedup':>8}")
+    for size in sizes:
+        orm = await rows_per_second(orm_page, sessionmaker, size, repeat)
+        rows = await rows_per_second(row_page, sessionmaker, size, repeat)
+        print(f"{size:>8} {orm:>12.0f} {rows:>12.0f} {rows / orm:>7.1f}x")
+
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database_url = args.database_url or f"sqlite+aiosqlite:///{Path(tmp_dir) / 'bench.db'}"
+        asyncio.run(run(database_url, args.sizes, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
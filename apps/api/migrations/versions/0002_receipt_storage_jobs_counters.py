@@ -0,0 +1,82 @@
+"""receipt storage columns, job queue and per-user counters
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 09:05:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable columns without defaults: a catalog-only change, no table rewrite
+    op.add_column("receipts", sa.Column("content_hash", sa.String(length=64), nullable=True))
+    op.add_column("receipts", sa.Column("content_type", sa.String(), nullable=True))
+    op.add_column("receipts", sa.Column("thumbnail_path", sa.String(), nullable=True))
+    op.add_column("receipts", sa.Column("web_image_path", sa.String(), nullable=True))
+    op.add_column("receipts", sa.Column("image_size", sa.BigInteger(), nullable=True))
+
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("receipt_id", sa.Integer(), nullable=True),
+        sa.Column("payload", sa.JSON(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column(
+            "run_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False
+        ),
+        sa.Column("locked_until", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False
+        ),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["receipt_id"], ["receipts.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # New, empty table: plain index builds hold no meaningful lock
+    op.create_index("ix_jobs_receipt_id", "jobs", ["receipt_id"])
+    op.create_index("ix_jobs_status_run_at", "jobs", ["status", "run_at"])
+
+    op.create_table(
+        "receipt_counters",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("count", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id", "status"),
+    )
+    op.execute(
+        "INSERT INTO receipt_counters (user_id, status, count) "
+        "SELECT user_id, status, COUNT(*) FROM receipts GROUP BY user_id, status"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("receipt_counters")
+    op.drop_index("ix_jobs_status_run_at", table_name="jobs")
+    op.drop_index("ix_jobs_receipt_id", table_name="jobs")
+    op.drop_table("jobs")
+    op.drop_column("receipts", "image_size")
+    op.drop_column("receipts", "web_image_path")
+    op.drop_column("receipts", "thumbnail_path")
+    op.drop_column("receipts", "content_type")
+    op.drop_column("receipts", "content_hash")
@@ -0,0 +1,78 @@
+"""receipt dedupe and keyset pagination indexes, built concurrently
+
+`receipts` can be large and is written on every upload, so its indexes are
+built with CREATE INDEX CONCURRENTLY outside a transaction: reads and writes
+continue while each index builds. A build that fails part-way leaves an
+INVALID index behind; rerunning the upgrade drops it and builds it again.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 09:10:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+RECEIPT_INDEXES = {
+    "ix_receipts_user_id_content_hash": ["user_id", "content_hash"],
+    "ix_receipts_user_id_id": ["user_id", "id"],
+    "ix_receipts_user_id_status_id": ["user_id", "status", "id"],
+    "ix_receipts_user_id_purchase_date_id": ["user_id", "purchase_date", "id"],
+    "ix_receipts_user_id_status_purchase_date_id": ["user_id", "status", "purchase_date", "id"],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, columns in RECEIPT_INDEXES.items():
+            _drop_if_invalid(name)
+            op.create_index(
+                name, "receipts", columns, postgresql_concurrently=True, if_not_exists=True
+            )
+
+        # Every composite index above leads with user_id
+        op.drop_index(
+            "ix_receipts_user_id",
+            table_name="receipts",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_receipts_user_id",
+            "receipts",
+            ["user_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        for name in reversed(RECEIPT_INDEXES):
+            op.drop_index(name, table_name="receipts", postgresql_concurrently=True, if_exists=True)
+
+
+def _drop_if_invalid(name: str) -> None:
+    if op.get_context().dialect.name != "postgresql" or op.get_context().as_sql:
+        return
+
+    invalid = op.get_bind().scalar(
+        sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": name},
+    )
+    if invalid:
+        op.drop_index(name, table_name="receipts", postgresql_concurrently=True)
@@ -0,0 +1,177 @@
+"""partition receipts by created_at month
+
+PostgreSQL only; other databases just lose the jobs -> receipts foreign key.
+
+The existing table becomes the `receipts_legacy` partition of a new
+range-partitioned `receipts` without copying rows:
+
+1. Outside a transaction, build a unique (id, created_at) index concurrently
+   and validate a CHECK constraint matching the legacy partition bound. Both
+   steps allow reads and writes while they run.
+2. In one short transaction, rename the table and its indexes, create the
+   partitioned parent with the same columns, indexes and keys, and attach
+   the legacy table. The attach reuses the existing indexes and the
+   validated CHECK, so it scans nothing. Then create monthly partitions from
+   next month on, plus a DEFAULT partition.
+
+Partitioned tables cannot be the target of a foreign key on `id` alone, so the
+`jobs.receipt_id` key is dropped. Downgrading copies every attached row back
+into a plain table; partitions already moved to the archive schema are not
+restored.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+RECEIPT_INDEXES = {
+    "ix_receipts_id": ["id"],
+    "ix_receipts_user_id_content_hash": ["user_id", "content_hash"],
+    "ix_receipts_user_id_id": ["user_id", "id"],
+    "ix_receipts_user_id_status_id": ["user_id", "status", "id"],
+    "ix_receipts_user_id_purchase_date_id": ["user_id", "purchase_date", "id"],
+    "ix_receipts_user_id_status_purchase_date_id": ["user_id", "status", "purchase_date", "id"],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_context().dialect.name != "postgresql":
+        _drop_jobs_receipt_fk_sqlite()
+        return
+
+    legacy_until = _add_months(datetime.now(timezone.utc).date().replace(day=1), 1)
+
+    with op.get_context().autocommit_block():
+        _drop_if_invalid("receipts_id_created_at_key")
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS receipts_id_created_at_key "
+            "ON receipts (id, created_at)"
+        )
+        op.execute(
+            "ALTER TABLE receipts DROP CONSTRAINT IF EXISTS receipts_legacy_range, "
+            "ADD CONSTRAINT receipts_legacy_range "
+            f"CHECK (created_at < {_bound(legacy_until)}) NOT VALID"
+        )
+        op.execute("ALTER TABLE receipts VALIDATE CONSTRAINT receipts_legacy_range")
+
+    op.execute("SET LOCAL lock_timeout = '10s'")
+    op.drop_constraint("jobs_receipt_id_fkey", "jobs", type_="foreignkey")
+
+    op.execute(
+        "ALTER TABLE receipts ADD CONSTRAINT receipts_id_created_at_key "
+        "UNIQUE USING INDEX receipts_id_created_at_key"
+    )
+    op.rename_table("receipts", "receipts_legacy")
+    op.execute("ALTER INDEX receipts_pkey RENAME TO receipts_legacy_pkey")
+    for name in RECEIPT_INDEXES:
+        op.execute(f"ALTER INDEX {name} RENAME TO {_legacy(name)}")
+
+    op.execute(
+        "CREATE TABLE receipts (LIKE receipts_legacy INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (created_at)"
+    )
+    op.execute("ALTER SEQUENCE receipts_id_seq OWNED BY receipts.id")
+    op.create_primary_key("receipts_pkey", "receipts", ["id", "created_at"])
+    op.create_foreign_key("receipts_user_id_fkey", "receipts", "users", ["user_id"], ["id"])
+    for name, columns in RECEIPT_INDEXES.items():
+        op.create_index(name, "receipts", columns)  # instant: the parent holds no rows
+
+    op.execute(
+        "ALTER TABLE receipts ATTACH PARTITION receipts_legacy "
+        f"FOR VALUES FROM (MINVALUE) TO ({_bound(legacy_until)})"
+    )
+    op.execute("ALTER TABLE receipts_legacy DROP CONSTRAINT receipts_legacy_range")
+
+    for offset in range(MONTHS_AHEAD + 1):
+        month = _add_months(legacy_until, offset)
+        op.execute(
+            f"CREATE TABLE receipts_{month:%Y_%m} PARTITION OF receipts "
+            f"FOR VALUES FROM ({_bound(month)}) TO ({_bound(_add_months(month, 1))})"
+        )
+    op.execute("CREATE TABLE receipts_default PARTITION OF receipts DEFAULT")
+
+    op.execute("CREATE SCHEMA IF NOT EXISTS archive")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_context().dialect.name != "postgresql":
+        _create_jobs_receipt_fk_sqlite()
+        return
+
+    op.rename_table("receipts", "receipts_partitioned")
+    op.execute(
+        "CREATE TABLE receipts (LIKE receipts_partitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    )
+    op.execute("INSERT INTO receipts SELECT * FROM receipts_partitioned")
+    op.execute("ALTER SEQUENCE receipts_id_seq OWNED BY receipts.id")
+    op.drop_table("receipts_partitioned")  # drops every attached partition with it
+
+    op.create_primary_key("receipts_pkey", "receipts", ["id"])
+    op.create_foreign_key("receipts_user_id_fkey", "receipts", "users", ["user_id"], ["id"])
+    for name, columns in RECEIPT_INDEXES.items():
+        op.create_index(name, "receipts", columns)
+
+    op.create_foreign_key(
+        "jobs_receipt_id_fkey", "jobs", "receipts", ["receipt_id"], ["id"], ondelete="CASCADE"
+    )
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _bound(month: date) -> str:
+    return f"'{month:%Y-%m-%d} 00:00:00+00'"
+
+
+def _legacy(index_name: str) -> str:
+    return index_name.replace("ix_receipts_", "ix_receipts_legacy_", 1)
+
+
+def _drop_if_invalid(name: str) -> None:
+    if op.get_context().as_sql:
+        return
+
+    invalid = op.get_bind().scalar(
+        sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": name},
+    )
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY {name}")
+
+
+# SQLite cannot drop constraints in place, and reflects the key without a name
+SQLITE_NAMING = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+
+def _drop_jobs_receipt_fk_sqlite() -> None:
+    with op.batch_alter_table("jobs", naming_convention=SQLITE_NAMING) as batch:
+        batch.drop_constraint("fk_jobs_receipt_id_receipts", type_="foreignkey")
+
+
+def _create_jobs_receipt_fk_sqlite() -> None:
+    with op.batch_alter_table("jobs") as batch:
+        batch.create_foreign_key(
+            "fk_jobs_receipt_id_receipts", "receipts", ["receipt_id"], ["id"], ondelete="CASCADE"
+        )
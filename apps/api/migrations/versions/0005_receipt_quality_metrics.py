@@ -0,0 +1,31 @@
+"""receipt image quality metrics
+
+Adding a nullable column without a default is a catalog-only change; on the
+partitioned table it applies to every partition.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16 23:10:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("receipts", sa.Column("quality_metrics", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("receipts", "quality_metrics")
@@ -0,0 +1,76 @@
+"""receipt line items and parse confidence
+
+receipt_items has no foreign key to the partitioned receipts table, like jobs.
+On PostgreSQL it is range-partitioned by `created_at` month like receipts
+(migration 0004): monthly partitions from this month on plus a DEFAULT
+partition, with primary key (id, created_at). `app.partitions` creates later
+months and archives old ones for both tables.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, Sequence[str], None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    partitioned = op.get_context().dialect.name == "postgresql"
+    op.create_table(
+        "receipt_items",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("receipt_id", sa.Integer(), nullable=False),
+        sa.Column("line_number", sa.Integer(), nullable=False),
+        sa.Column("item_name", sa.String(length=255), nullable=False),
+        sa.Column("quantity", sa.Numeric(precision=10, scale=3), nullable=True),
+        sa.Column("unit_price", sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column("unit", sa.String(length=8), nullable=True),
+        sa.Column("total_price", sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False
+        ),
+        sa.PrimaryKeyConstraint(*(("id", "created_at") if partitioned else ("id",))),
+        **({"postgresql_partition_by": "RANGE (created_at)"} if partitioned else {}),
+    )
+    op.create_index("ix_receipt_items_receipt_id", "receipt_items", ["receipt_id"])
+
+    if partitioned:
+        this_month = datetime.now(timezone.utc).date().replace(day=1)
+        for offset in range(MONTHS_AHEAD + 1):
+            month = _add_months(this_month, offset)
+            op.execute(
+                f"CREATE TABLE receipt_items_{month:%Y_%m} PARTITION OF receipt_items "
+                f"FOR VALUES FROM ({_bound(month)}) TO ({_bound(_add_months(month, 1))})"
+            )
+        op.execute("CREATE TABLE receipt_items_default PARTITION OF receipt_items DEFAULT")
+    op.add_column("receipts", sa.Column("parse_confidence", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("receipts", "parse_confidence")
+    op.drop_index("ix_receipt_items_receipt_id", table_name="receipt_items")
+    op.drop_table("receipt_items")
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _bound(month: date) -> str:
+    return f"'{month:%Y-%m-%d} 00:00:00+00'"
@@ -0,0 +1,36 @@
+"""receipt item categories
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, Sequence[str], None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("receipt_items", sa.Column("category_id", sa.Integer(), nullable=True))
+    op.add_column(
+        "receipt_items", sa.Column("category_method", sa.String(length=16), nullable=True)
+    )
+    op.add_column("receipt_items", sa.Column("category_score", sa.Float(), nullable=True))
+    op.create_index("ix_receipt_items_category_id", "receipt_items", ["category_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_receipt_items_category_id", table_name="receipt_items")
+    op.drop_column("receipt_items", "category_score")
+    op.drop_column("receipt_items", "category_method")
+    op.drop_column("receipt_items", "category_id")
@@ -0,0 +1,176 @@
+# tests/test_cache.py
+import asyncio
+import time
+import pytest
+from datetime import date
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.cache import Cache, InMemoryCacheBackend, RedisCacheBackend, read_reply
+from app.models.receipts import Receipt
+from app.repository.receipt_repository import ReceiptRepository
+
+
+class RespStandIn:
+    """Tiny in-process server speaking enough RESP for GET, SET [NX] [PX] and DEL"""
+
+    def __init__(self) -> None:
+        self.data = {}
+        self.server = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"redis://{host}:{port}/0"
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _serve(self, reader, writer) -> None:
+        try:
+            while True:
+                command = [part.decode() for part in await read_reply(reader)]
+                writer.write(self._handle(command))
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            writer.close()
+
+    def _handle(self, command) -> bytes:
+        name, args = command[0].upper(), command[1:]
+        now = time.monotonic()
+        if name == "GET":
+            value = self.data.get(args[0])
+            if value is None or value[1] <= now:
+                return b"$-1\r\n"
+            return b"$%d\r\n%s\r\n" % (len(value[0]), value[0].encode())
+        if name == "SET":
+            key, value, options = args[0], args[1], [a.upper() for a in args[2:]]
+            if "NX" in options and key in self.data and self.data[key][1] > now:
+                return b"$-1\r\n"
+            ttl = int(args[2 + options.index("PX") + 1]) / 1000 if "PX" in options else 1e9
+            self.data[key] = (value, now + ttl)
+            return b"+OK\r\n"
+        if name == "DEL":
+            removed = sum(self.data.pop(key, None) is not None for key in args)
+            return b":%d\r\n" % removed
+        return b"-ERR unknown command\r\n"
+
+
+@pytest.fixture
+async def resp_server():
+    server = RespStandIn()
+    url = await server.start()
+    yield server, url
+    await server.stop()
+
+
+def counting_loader(value):
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return value
+
+    return load, calls
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_evicts_least_recently_used_and_expired():
+    """Test the memory backend stays bounded and drops entries past their TTL"""
+    backend = InMemoryCacheBackend(max_entries=2)
+    await backend.set("a", b"1", ttl=60)
+    await backend.set("b", b"2", ttl=60)
+    await backend.get("a")
+    await backend.set("c", b"3", ttl=60)
+
+    assert await backend.get("a") == b"1"
+    assert await backend.get("b") is None
+
+    await backend.set("d", b"4", ttl=-1)
+    assert await backend.get("d") is None
+
+
+@pytest.mark.asyncio
+async def test_invalidate_forces_a_reload():
+    """Test hits are served from the cache until the scope is invalidated"""
+    cache = Cache(InMemoryCacheBackend(), name="test", ttl=60)
+    load, calls = counting_loader(b"v1")
+
+    for _ in range(3):
+        assert await cache.get_or_load("user:1", "page", load, bytes, bytes) == b"v1"
+    await cache.invalidate(["user:1"])
+    await cache.get_or_load("user:1", "page", load, bytes, bytes)
+
+    assert len(calls) == 2
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+@pytest.mark.asyncio
+async def test_read_racing_a_write_cannot_leave_a_stale_entry():
+    """Test a value loaded before a write is never served after the write's invalidation"""
+    cache = Cache(InMemoryCacheBackend(), name="test", ttl=60)
+
+    async def load_then_write_lands():
+        await cache.invalidate(["receipt:1"])  # the write commits while this read is in flight
+        return b"old"
+
+    await cache.get_or_load("receipt:1", "row", load_then_write_lands, bytes, bytes)
+    load, calls = counting_loader(b"new")
+
+    assert await cache.get_or_load("receipt:1", "row", load, bytes, bytes) == b"new"
+    assert calls == [1]
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_against_stand_in(resp_server):
+    """Test the RESP backend stores, expires and invalidates through a real socket"""
+    _, url = resp_server
+    backend = RedisCacheBackend(url, pool_size=2)
+    cache = Cache(backend, name="test", ttl=60)
+    load, calls = counting_loader(b"row")
+
+    await cache.get_or_load("receipt:1", "row", load, bytes, bytes)
+    await cache.get_or_load("receipt:1", "row", load, bytes, bytes)
+    await cache.invalidate(["receipt:1"])
+    await cache.get_or_load("receipt:1", "row", load, bytes, bytes)
+
+    assert len(calls) == 2
+    assert cache.hits == 1
+    assert await backend.add("k", b"1", ttl=60) is True
+    assert await backend.add("k", b"2", ttl=60) is False
+    await backend.delete("k")
+    assert await backend.get("k") is None
+    await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_unreachable_redis_reads_through(resp_server):
+    """Test reads fall back to the source when the cache server is down"""
+    server, url = resp_server
+    await server.stop()
+    cache = Cache(RedisCacheBackend(url), name="test", ttl=60)
+    load, calls = counting_loader(b"row")
+
+    assert await cache.get_or_load("receipt:1", "row", load, bytes, bytes) == b"row"
+    assert calls == [1]
+
+
+@pytest.mark.asyncio
+async def test_repository_reads_are_cached_and_writes_invalidate(db: AsyncSession, receipt_cache):
+    """Test receipt rows and first pages refresh after saves and status changes"""
+    repo = ReceiptRepository(db)
+    receipt = await repo.save(
+        Receipt(user_id=1, image_path="a.jpg", purchase_date=date(2025, 12, 1))
+    )
+
+    first = await repo.get_row_by_id(receipt.id)
+    cached = await repo.get_row_by_id(receipt.id)
+    page = await repo.get_rows({"user_id": 1, "limit": 10})
+    assert cached == tuple(first)
+    assert receipt_cache.hits == 1
+
+    await repo.update_status([receipt.id], "processed")
+    assert (await repo.get_row_by_id(receipt.id)).status == "processed"
+    assert (await repo.get_rows({"user_id": 1, "limit": 10})).items[0].status == "processed"
+
+    await repo.save(Receipt(user_id=1, image_path="b.jpg", purchase_date=date(2025, 12, 2)))
+    assert len((await repo.get_rows({"user_id": 1, "limit": 10})).items) == len(page.items) + 1
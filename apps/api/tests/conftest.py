@@ -1,7 +1,9 @@
 import sys
 from pathlib import Path
+import pytest
 import pytest_asyncio
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.cache import Cache, InMemoryCacheBackend, set_receipt_cache
 from app.database import Base
 
 # Add the app directory to Python path
@@ -24,3 +26,14 @@ async def db():
         yield session
 
     await engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def receipt_cache():
+    """Give every test its own in-process receipt cache"""
+    cache = Cache(InMemoryCacheBackend(), name="receipts")
+    set_receipt_cache(cache)
+
+    yield cache
+
+    set_receipt_cache(None)
@@ -0,0 +1,140 @@
+# tests/test_database.py
+import pytest
+from datetime import date
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.cache import Cache, InMemoryCacheBackend
+from app.database import Base, ReplicaSet, RoutingSession
+from app.models.receipts import Receipt
+from app.models.users import Users
+from app.repository.receipt_repository import ReceiptRepository
+
+
+async def seeded_engine(path, image_path: str):
+    """SQLite database holding user 1 and one receipt whose image_path names the database"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_sessionmaker(engine)() as session:
+        session.add(Users(id=1, email="demo@example.com", name="Demo"))
+        session.add(
+            Receipt(id=1, user_id=1, image_path=image_path, purchase_date=date(2025, 12, 1))
+        )
+        await session.commit()
+
+    return engine
+
+
+@pytest.fixture
+async def databases(tmp_path):
+    primary = await seeded_engine(tmp_path / "primary.db", "primary.jpg")
+    replica_a = await seeded_engine(tmp_path / "replica_a.db", "replica_a.jpg")
+    replica_b = await seeded_engine(tmp_path / "replica_b.db", "replica_b.jpg")
+
+    yield primary, replica_a, replica_b
+
+    for engine in (primary, replica_a, replica_b):
+        await engine.dispose()
+
+
+def session_factory(primary, replicas):
+    return async_sessionmaker(
+        primary, expire_on_commit=False, sync_session_class=RoutingSession, replicas=replicas
+    )
+
+
+async def read_source(session) -> str:
+    receipt = await ReceiptRepository(session).get_by_id(1)
+    return receipt.image_path
+
+
+@pytest.mark.asyncio
+async def test_reads_use_a_replica_until_the_session_writes(databases):
+    """Test reads go to the replica, writes to the primary, and reads after a write stay there"""
+    primary, replica_a, _ = databases
+    Session = session_factory(primary, ReplicaSet([replica_a]))
+
+    async with Session() as session:
+        repo = ReceiptRepository(session)
+        assert await read_source(session) == "replica_a.jpg"
+
+        await repo.save(Receipt(user_id=1, image_path="new.jpg", purchase_date=date(2025, 12, 2)))
+        session.expunge_all()
+
+        assert await read_source(session) == "primary.jpg"
+        assert [r.image_path for r in (await repo.get_all({"user_id": 1})).items] == [
+            "new.jpg",
+            "primary.jpg",
+        ]
+
+
+@pytest.mark.asyncio
+async def test_replicas_are_used_round_robin_and_sticky_per_session(databases):
+    """Test each session sticks to one replica and sessions rotate through them"""
+    primary, replica_a, replica_b = databases
+    Session = session_factory(primary, ReplicaSet([replica_a, replica_b]))
+
+    sources = []
+    for _ in range(4):
+        async with Session() as session:
+            first = await read_source(session)
+            session.expunge_all()
+            assert await read_source(session) == first
+            sources.append(first)
+
+    assert sources == ["replica_a.jpg", "replica_b.jpg"] * 2
+
+
+@pytest.mark.asyncio
+async def test_failing_replica_is_ejected_then_retried(databases, tmp_path):
+    """Test a replica that cannot connect is skipped until its retry interval passes"""
+    primary, replica_a, _ = databases
+    broken = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/missing/replica.db")
+    replicas = ReplicaSet([broken, replica_a], retry_interval=60)
+    Session = session_factory(primary, replicas)
+
+    with pytest.raises(OperationalError, match="unable to open database file"):
+        async with Session() as session:
+            await read_source(session)
+
+    for _ in range(3):
+        async with Session() as session:
+            assert await read_source(session) == "replica_a.jpg"
+
+    replicas.retry_interval = 0
+    replicas.eject(broken)
+    assert replicas.pick() is broken
+    await broken.dispose()
+
+
+@pytest.mark.asyncio
+async def test_all_replicas_down_or_none_configured_reads_the_primary(databases):
+    """Test reads fall back to the primary without a healthy replica"""
+    primary, replica_a, _ = databases
+    replicas = ReplicaSet([replica_a], retry_interval=60)
+    replicas.eject(replica_a)
+
+    for configured in (replicas, ReplicaSet([]), None):
+        async with session_factory(primary, configured)() as session:
+            assert await read_source(session) == "primary.jpg"
+
+
+@pytest.mark.asyncio
+async def test_cache_refills_after_a_write_read_the_primary(databases):
+    """Test a lagging replica cannot put the pre-write row back under the new cache version"""
+    primary, replica_a, _ = databases
+    Session = session_factory(primary, ReplicaSet([replica_a]))
+    cache = Cache(InMemoryCacheBackend(), name="test", ttl=60, primary_window=60)
+
+    async with Session() as session:
+        row = await ReceiptRepository(session, cache).get_row_by_id(1)
+        assert row.image_path == "replica_a.jpg"  # never written: replicas may fill
+
+    await cache.invalidate(["receipt:1"])
+    for _ in range(2):
+        async with Session() as session:
+            row = await ReceiptRepository(session, cache).get_row_by_id(1)
+            assert row.image_path == "primary.jpg"
+
+    assert cache.hits == 1
@@ -0,0 +1,53 @@
+# tests/test_metrics.py
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app.main import app
+from app.metrics import Gauge, Histogram, Registry
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test the text format has cumulative buckets, sum and count per label set"""
+    registry = Registry()
+    latency = registry.register(Histogram("op_seconds", "Op latency", ("op",), buckets=(0.1, 1)))
+
+    latency.observe(0.05, op="put")
+    latency.observe(0.5, op="put")
+    latency.observe(3, op="put")
+
+    assert registry.render().splitlines() == [
+        "# HELP op_seconds Op latency",
+        "# TYPE op_seconds histogram",
+        'op_seconds_bucket{op="put",le="0.1"} 1',
+        'op_seconds_bucket{op="put",le="1.0"} 2',
+        'op_seconds_bucket{op="put",le="+Inf"} 3',
+        'op_seconds_sum{op="put"} 3.55',
+        'op_seconds_count{op="put"} 3',
+    ]
+
+
+def test_failing_gauge_callback_is_logged_and_skipped(caplog):
+    """Test a gauge callback that raises is logged and the other samples still render"""
+    registry = Registry()
+    pool = registry.register(Gauge("pool_size", "Pool size", ("pool",)))
+    pool.set_function(lambda: 4, pool="db")
+    pool.set_function(lambda: 1 / 0, pool="cache")
+
+    assert registry.render().splitlines()[2:] == ['pool_size{pool="db"} 4']
+    assert "Gauge pool_size callback failed" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_requests_by_route_template():
+    """Test requests are labelled by route template and exposed at /metrics"""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        await client.get("/health")
+        response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/health",status="200"}'
+        in response.text
+    )
+    assert 'http_requests_in_flight{method="GET"} 0' in response.text
+    assert "db_pool_checkout_wait_seconds" in response.text
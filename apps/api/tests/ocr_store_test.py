@@ -0,0 +1,64 @@
+# tests/test_ocr_store.py
+import pytest
+from datetime import date
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.models.jobs import Job
+from app.models.receipts import Receipt
+from app.ocr_store import reparse_receipts
+from app.repository.ocr_result_repository import OcrKey, OcrResultRepository
+from app.repository.receipt_item_repository import ReceiptItemRepository
+from app.repository.receipt_repository import ReceiptRepository
+from app.services.image_preprocessing import PREPROCESS_VERSION
+from app.services.ocr_service import OcrText
+
+ENGINE = "tesseract 5.3.0 -l eng --psm 6"
+
+
+def receipt(status: str, content_hash: str | None, user_id: int = 1) -> Receipt:
+    return Receipt(
+        user_id=user_id,
+        image_path=f"memory://receipts/{content_hash}",
+        purchase_date=date(2025, 12, 1),
+        status=status,
+        content_hash=content_hash,
+    )
+
+
+@pytest.mark.asyncio
+async def test_reparse_uses_stored_ocr_and_queues_the_rest(db: AsyncSession):
+    """Test receipts with stored OCR are reparsed in place and the others queued for OCR"""
+    repo = ReceiptRepository(db)
+    failed = await repo.save(receipt("failed", "a"))
+    processed = await repo.save(receipt("processed", "b"))
+    stale = await repo.save(receipt("processed", "c"))  # OCR stored for an older preprocessing
+    unhashed = await repo.save(receipt("failed", None))
+    pending = await repo.save(receipt("pending", "a"))
+    other_user = await repo.save(receipt("failed", "a", user_id=2))
+
+    results = OcrResultRepository(db)
+    for content_hash, version in (("a", PREPROCESS_VERSION), ("b", PREPROCESS_VERSION), ("c", 0)):
+        metrics = {"version": version, "content": content_hash}
+        text = OcrText(text=f"ITEM {content_hash.upper()}  1.25\nTOTAL  1.25")
+        await results.save(OcrKey(content_hash, version, ENGINE), text, metrics)
+    await db.commit()
+
+    result = await reparse_receipts(
+        async_sessionmaker(db.bind, expire_on_commit=False), ENGINE, user_id=1, batch_size=2
+    )
+
+    assert (result.reparsed, result.queued) == (2, 2)
+    for saved in (failed, processed, stale, unhashed, pending, other_user):
+        await db.refresh(saved)
+    assert (failed.status, failed.quality_metrics["content"]) == ("processed", "a")
+    assert processed.quality_metrics["content"] == "b"
+    assert processed.parse_confidence == 1.0
+    items = await ReceiptItemRepository(db).get_for_receipt(processed.id)
+    assert [item.item_name for item in items] == ["ITEM B"]
+    assert stale.quality_metrics is None
+    assert pending.status == "pending"
+    assert other_user.status == "failed"
+
+    queued = (await db.execute(select(Job.receipt_id).order_by(Job.receipt_id))).scalars().all()
+    assert queued == [stale.id, unhashed.id]
+    assert await repo.counters.get(1) == {"processed": 3, "failed": 1, "pending": 1}
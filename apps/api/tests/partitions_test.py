@@ -0,0 +1,59 @@
+# tests/test_partitions.py
+import asyncio
+import pytest
+from datetime import date
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.partitions import (
+    add_months,
+    archive_partitions,
+    create_partition_sql,
+    ensure_partitions,
+    in_month_sql,
+    run_maintenance,
+    upper_bound,
+)
+
+
+def test_month_arithmetic_crosses_years():
+    """Test month offsets wrap around year boundaries in both directions"""
+    assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert add_months(date(2026, 1, 1), -24) == date(2024, 1, 1)
+
+
+def test_partition_ddl_and_bounds_round_trip():
+    """Test generated partitions cover one UTC month and their bounds parse back"""
+    assert create_partition_sql("receipts", date(2026, 12, 1)) == (
+        "CREATE TABLE IF NOT EXISTS receipts_2026_12 PARTITION OF receipts "
+        "FOR VALUES FROM ('2026-12-01 00:00:00+00') TO ('2027-01-01 00:00:00+00')"
+    )
+    assert upper_bound(
+        "FOR VALUES FROM ('2026-12-01 00:00:00+00') TO ('2027-01-01 00:00:00+00')"
+    ) == date(2027, 1, 1)
+    assert upper_bound("FOR VALUES FROM (MINVALUE) TO ('2026-11-01 00:00:00+00')") == date(
+        2026, 11, 1
+    )
+    assert upper_bound("DEFAULT") is None
+
+
+def test_rows_moved_out_of_default_match_the_partition_bounds():
+    """Test the rows taken from DEFAULT for a month are exactly the new partition's range"""
+    assert in_month_sql(date(2026, 12, 1)) == (
+        "created_at >= '2026-12-01 00:00:00+00' AND created_at < '2027-01-01 00:00:00+00'"
+    )
+
+
+@pytest.mark.asyncio
+async def test_maintenance_is_a_no_op_without_postgres():
+    """Test SQLite databases, which are not partitioned, are left alone"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+
+    assert await ensure_partitions(engine) == []
+    assert await archive_partitions(engine, retention_months=1) == []
+
+    stop = asyncio.Event()
+    maintenance = asyncio.create_task(run_maintenance(engine, stop, interval=3600))
+    await asyncio.sleep(0)
+    stop.set()
+    await asyncio.wait_for(maintenance, timeout=1)
+    await engine.dispose()
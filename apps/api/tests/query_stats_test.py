@@ -0,0 +1,70 @@
+# tests/test_query_stats.py
+import logging
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.query_stats import QueryStatsMiddleware, instrument_engine, track_queries
+
+
+@pytest.mark.asyncio
+async def test_track_queries_counts_statements():
+    """Test statements inside track_queries are counted and timed"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    instrument_engine(engine)
+
+    with track_queries() as stats:
+        async with engine.connect() as conn:
+            for _ in range(3):
+                await conn.execute(text("SELECT 1"))
+
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 2"))  # outside: not counted
+
+    assert stats.count == 3
+    assert stats.total_time > 0
+    assert stats.repeated(3) == [("SELECT 1", 3)]
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_slow_queries_are_logged_without_parameter_values(caplog):
+    """Test the slow-query log keeps the statement but not the bound values"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    instrument_engine(engine, slow_query_ms=0)
+
+    with caplog.at_level(logging.WARNING, logger="app.sql.slow"):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT :email"), {"email": "secret@example.com"})
+
+    assert "SELECT ?" in caplog.text
+    assert "secret@example.com" not in caplog.text
+    assert "str" in caplog.text
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_middleware_reports_headers_and_flags_n_plus_one(caplog):
+    """Test per-request totals come back as headers and repeated statements are flagged"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    instrument_engine(engine)
+
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware, n_plus_one_threshold=5)
+
+    @app.get("/items")
+    async def items():
+        async with engine.connect() as conn:
+            for i in range(5):
+                await conn.execute(text("SELECT :id"), {"id": i})
+        return {"ok": True}
+
+    with caplog.at_level(logging.WARNING, logger="app.sql.n_plus_one"):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/items")
+
+    assert response.headers["x-db-query-count"] == "5"
+    assert float(response.headers["x-db-time-ms"]) > 0
+    assert "Possible N+1 in GET /items" in caplog.text
+    await engine.dispose()
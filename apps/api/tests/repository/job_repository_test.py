@@ -0,0 +1,123 @@
+# tests/repository/test_job_repository.py
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.jobs import Job
+from app.models.receipts import Receipt
+from app.repository.job_repository import PROCESS_RECEIPT, JobRepository, retry_delay
+from app.repository.receipt_repository import ReceiptRepository
+
+
+async def queued_receipt(db: AsyncSession, max_attempts: int = 3) -> Receipt:
+    receipt = await ReceiptRepository(db).save(
+        Receipt(user_id=1, image_path="test.jpg", purchase_date=date(2025, 12, 1))
+    )
+    await JobRepository(db).enqueue(PROCESS_RECEIPT, [receipt.id], max_attempts=max_attempts)
+
+    return receipt
+
+
+@pytest.mark.asyncio
+async def test_claim_marks_job_running_and_receipt_processing(db: AsyncSession):
+    """Test a claimed job is locked and its receipt moves to processing"""
+    receipt = await queued_receipt(db)
+    repo = JobRepository(db)
+
+    jobs = await repo.claim(10)
+
+    assert len(jobs) == 1
+    assert jobs[0].status == "running"
+    assert jobs[0].attempts == 1
+    assert jobs[0].locked_until is not None
+    assert await repo.claim(10) == []
+
+    await db.refresh(receipt)
+    assert receipt.status == "processing"
+
+
+@pytest.mark.asyncio
+async def test_complete_marks_receipt_processed(db: AsyncSession):
+    """Test completing a job finishes its receipt"""
+    receipt = await queued_receipt(db)
+    repo = JobRepository(db)
+
+    [job] = await repo.claim(10)
+    await repo.complete(job)
+
+    await db.refresh(job)
+    await db.refresh(receipt)
+    assert job.status == "done"
+    assert receipt.status == "processed"
+
+
+@pytest.mark.asyncio
+async def test_fail_retries_with_backoff_then_dead_letters(db: AsyncSession):
+    """Test failures requeue the job later until attempts run out"""
+    receipt = await queued_receipt(db, max_attempts=2)
+    repo = JobRepository(db)
+
+    [job] = await repo.claim(10)
+    assert await repo.fail(job, "boom") is False
+
+    await db.refresh(job)
+    await db.refresh(receipt)
+    assert job.status == "queued"
+    assert job.last_error == "boom"
+    assert receipt.status == "uploaded"
+    assert await repo.claim(10) == []  # backing off
+
+    await db.execute(update(Job).where(Job.id == job.id).values(run_at=datetime(2000, 1, 1)))
+    await db.commit()
+
+    [job] = await repo.claim(10)
+    assert job.attempts == 2
+    assert await repo.fail(job, "boom again") is True
+
+    await db.refresh(job)
+    await db.refresh(receipt)
+    assert job.status == "dead"
+    assert receipt.status == "failed"
+
+
+@pytest.mark.asyncio
+async def test_expired_claim_can_be_reclaimed(db: AsyncSession):
+    """Test a job held by a crashed worker is picked up once its visibility timeout lapses"""
+    await queued_receipt(db)
+    repo = JobRepository(db)
+
+    [job] = await repo.claim(10)
+    past = datetime.now(timezone.utc) - timedelta(seconds=1)
+    await db.execute(update(Job).where(Job.id == job.id).values(locked_until=past))
+    await db.commit()
+
+    [reclaimed] = await repo.claim(10)
+
+    assert reclaimed.id == job.id
+    assert reclaimed.attempts == 2
+
+
+@pytest.mark.asyncio
+async def test_complete_after_the_claim_lapsed_changes_nothing(db: AsyncSession):
+    """Test a worker whose job was reclaimed cannot complete it under the rerun"""
+    receipt = await queued_receipt(db)
+    repo = JobRepository(db)
+
+    [job] = await repo.claim(10)
+    first_claim = Job(id=job.id, kind=job.kind, receipt_id=job.receipt_id, attempts=job.attempts)
+    past = datetime.now(timezone.utc) - timedelta(seconds=1)
+    await db.execute(update(Job).where(Job.id == job.id).values(locked_until=past))
+    await db.commit()
+    [reclaimed] = await repo.claim(10)
+
+    assert await repo.complete(first_claim) is False
+
+    await db.refresh(reclaimed)
+    await db.refresh(receipt)
+    assert (reclaimed.status, receipt.status) == ("running", "processing")
+    assert await repo.complete(reclaimed) is True
+
+
+def test_retry_delay_is_exponential_and_capped():
+    assert retry_delay(1) < retry_delay(2) < retry_delay(3)
+    assert retry_delay(100) == retry_delay(200)
@@ -0,0 +1,63 @@
+# tests/repository/test_ocr_result_repository.py
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.repository.ocr_result_repository import OcrHits, OcrKey, OcrResultRepository
+from app.services.ocr_service import OcrText
+
+KEY = OcrKey("a" * 64, 1, "tesseract 5.3.0 -l eng --psm 6")
+METRICS = {"width": 600, "height": 900, "version": 1, "fast_path": True}
+
+
+@pytest.mark.asyncio
+async def test_get_counts_hits(db: AsyncSession):
+    """Test a stored result is returned and lookup hits are written in one batch on flush"""
+    repo = OcrResultRepository(db, OcrHits())
+    assert await repo.get(KEY) is None
+
+    await repo.save(KEY, OcrText(text="MILK 2.49", lines=[{"text": "MILK 2.49"}]), METRICS)
+    await db.commit()
+
+    first = await repo.get(KEY)
+    await repo.get(KEY)
+    assert first.text == "MILK 2.49"
+    assert first.quality_metrics == METRICS
+    assert first.hits == 0  # the lookup is a plain SELECT
+
+    assert await repo.flush_hits() == 1
+    await db.commit()
+    await db.refresh(first)
+    assert first.hits == 2
+    assert first.last_hit_at is not None
+    assert await repo.flush_hits() == 0
+    assert await repo.get(KEY._replace(preprocess_version=2)) is None
+
+
+@pytest.mark.asyncio
+async def test_save_keeps_the_first_result(db: AsyncSession):
+    """Test a concurrent second save of the same key is ignored"""
+    repo = OcrResultRepository(db)
+    await repo.save(KEY, OcrText(text="first"), METRICS)
+    await repo.save(KEY, OcrText(text="second"), METRICS)
+    await db.commit()
+
+    assert (await repo.get_many([KEY]))[KEY].text == "first"
+
+
+@pytest.mark.asyncio
+async def test_stats_per_version(db: AsyncSession):
+    """Test results, hits and hit rate are reported per preprocessing and engine version"""
+    repo = OcrResultRepository(db, OcrHits())
+    other = KEY._replace(content_hash="b" * 64)
+    old = KEY._replace(preprocess_version=0)
+    for key in (KEY, other, old):
+        await repo.save(key, OcrText(text=""), METRICS)
+    for _ in range(6):
+        await repo.get(KEY)
+    await repo.flush_hits()
+    await db.commit()
+
+    old_stats, current = await repo.stats()
+
+    assert (old_stats.preprocess_version, old_stats.results, old_stats.hits) == (0, 1, 0)
+    assert (current.results, current.hits) == (2, 6)
+    assert current.hit_rate == 0.75
@@ -0,0 +1,63 @@
+# tests/repository/test_receipt_counter_repository.py
+import pytest
+from datetime import date
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.receipts import Receipt
+from app.repository.job_repository import PROCESS_RECEIPT, JobRepository
+from app.repository.receipt_counter_repository import ReceiptCounterRepository
+from app.repository.receipt_repository import ReceiptRepository
+
+
+def receipt(user_id: int = 1, status: str = "uploaded") -> Receipt:
+    return Receipt(
+        user_id=user_id, image_path="image.jpg", purchase_date=date(2025, 12, 1), status=status
+    )
+
+
+@pytest.mark.asyncio
+async def test_inserts_increment_counters(db: AsyncSession):
+    """Test save, save_many and bulk_insert all count new receipts"""
+    repo = ReceiptRepository(db)
+
+    await repo.save(receipt())
+    await repo.save_many([receipt(), receipt(status="pending"), receipt(user_id=2)])
+    await repo.bulk_insert(
+        [{"user_id": 1, "image_path": "a.jpg", "purchase_date": date(2025, 12, 1)}] * 3
+    )
+
+    assert await repo.counters.get(1) == {"uploaded": 5, "pending": 1}
+    assert await repo.counters.get(2) == {"uploaded": 1}
+    assert await repo.counters.total(1) == 6
+
+
+@pytest.mark.asyncio
+async def test_status_transitions_move_counts(db: AsyncSession):
+    """Test counts follow receipts through the job lifecycle"""
+    repo = ReceiptRepository(db)
+    saved = [await repo.save(receipt()) for _ in range(3)]
+    jobs = JobRepository(db)
+
+    await jobs.enqueue(PROCESS_RECEIPT, [r.id for r in saved], max_attempts=1)
+    claimed = await jobs.claim(10)
+    assert await repo.counters.get(1) == {"processing": 3}
+
+    await jobs.complete(claimed[0])
+    await jobs.fail(claimed[1], "boom")
+
+    assert await repo.counters.get(1) == {"processing": 1, "processed": 1, "failed": 1}
+
+    # Moving to the current status changes nothing
+    await repo.update_status([saved[0].id], "processed")
+    assert await repo.counters.get(1) == {"processing": 1, "processed": 1, "failed": 1}
+
+
+@pytest.mark.asyncio
+async def test_rebuild_recomputes_counters(db: AsyncSession):
+    """Test rebuild matches a full count of the receipts table"""
+    repo = ReceiptRepository(db)
+    await repo.save_many([receipt(), receipt(status="failed")])
+    await repo.counters.apply({(1, "uploaded"): 40})
+
+    await ReceiptCounterRepository(db).rebuild()
+
+    assert await repo.counters.get(1) == {"uploaded": 1, "failed": 1}
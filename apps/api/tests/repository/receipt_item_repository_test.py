@@ -0,0 +1,47 @@
+# tests/repository/test_receipt_item_repository.py
+import pytest
+from decimal import Decimal
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.repository.receipt_item_repository import ReceiptItemRepository
+from app.services.item_categorizer import UNCATEGORIZED, CategoryMatch
+from app.services.line_item_parser import LineItem
+
+
+@pytest.mark.asyncio
+async def test_replace_swaps_a_receipts_items(db: AsyncSession):
+    """Test replacing items removes the receipt's old items and leaves other receipts alone"""
+    repo = ReceiptItemRepository(db)
+    await repo.replace(1, [LineItem("OLD", Decimal("1.00"), line_number=1)])
+    await repo.replace(2, [LineItem("OTHER", Decimal("9.99"), line_number=1)])
+    await repo.replace(
+        1,
+        [
+            LineItem("BANANAS", Decimal("1.46"), 3, Decimal("0.734"), Decimal("1.99"), "kg"),
+            LineItem("MILK 2L", Decimal("3.99"), line_number=2),
+        ],
+        [CategoryMatch(6, "Fruits", 1.0, "exact"), UNCATEGORIZED],
+    )
+    await db.commit()
+
+    items = await repo.get_for_receipt(1)
+    assert [(item.item_name, item.line_number) for item in items] == [
+        ("MILK 2L", 2),
+        ("BANANAS", 3),
+    ]
+    assert (items[1].quantity, items[1].unit_price, items[1].unit, items[1].total_price) == (
+        Decimal("0.734"),
+        Decimal("1.99"),
+        "kg",
+        Decimal("1.46"),
+    )
+    assert (items[1].category_id, items[1].category_method, items[1].category_score) == (
+        6,
+        "exact",
+        1.0,
+    )
+    assert (items[0].category_id, items[0].category_method) == (None, "default")
+    assert [item.item_name for item in await repo.get_for_receipt(2)] == ["OTHER"]
+
+    await repo.replace(1, [])
+    await db.commit()
+    assert await repo.get_for_receipt(1) == []
@@ -1,8 +1,10 @@
 # tests/repository/test_receipt_repository.py
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import date
+from datetime import date, datetime, timezone
+from app.config import settings
 from app.models.receipts import Receipt
+from app.repository.pagination import Cursor
 from app.repository.receipt_repository import ReceiptRepository
 
 
@@ -51,9 +53,9 @@ async def test_get_all_by_user(db: AsyncSession):
         receipt = Receipt(user_id=1, image_path=f"image{i}.jpg", purchase_date=date.today())
         await repo.save(receipt)
 
-    receipts = await repo.get_all({"user_id": 1, "last_id": -1, "limit": 3})
+    page = await repo.get_all({"user_id": 1, "limit": 3})
 
-    assert len(receipts) >= 3
+    assert len(page.items) >= 3
 
 
 @pytest.mark.asyncio
@@ -89,5 +91,139 @@ async def test_save_many_receipts(db: AsyncSession):
     assert count == 5
 
     # Verify they were saved
-    all_receipts = await repo.get_all({"user_id": 1, "limit": 10})
-    assert len(all_receipts) >= 5
+    page = await repo.get_all({"user_id": 1, "limit": 10})
+    assert len(page.items) >= 5
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_returns_ids_in_order(db: AsyncSession):
+    """Test bulk insert returns generated ids and timestamps for every row"""
+    repo = ReceiptRepository(db)
+
+    rows = [
+        {
+            "user_id": 1,
+            "image_path": f"minio://bucket/image{i}.jpg",
+            "purchase_date": date(2025, 12, 1),
+        }
+        for i in range(7)
+    ]
+
+    inserted = await repo.bulk_insert(rows, chunk_size=3)
+
+    assert len(inserted) == 7
+    assert [row.id for row in inserted] == sorted(row.id for row in inserted)
+    assert all(row.created_at is not None for row in inserted)
+
+    found = await repo.get_by_id(inserted[4].id)
+    assert found.image_path == "minio://bucket/image4.jpg"
+    assert found.status == "uploaded"
+
+
+@pytest.mark.asyncio
+async def test_get_by_content_hashes_returns_earliest_per_user(db: AsyncSession):
+    """Test duplicate lookup maps each hash to the user's first receipt"""
+    repo = ReceiptRepository(db)
+
+    first = await repo.save(
+        Receipt(user_id=1, image_path="a.jpg", purchase_date=date.today(), content_hash="abc")
+    )
+    await repo.save(
+        Receipt(user_id=1, image_path="a.jpg", purchase_date=date.today(), content_hash="abc")
+    )
+    await repo.save(
+        Receipt(user_id=2, image_path="b.jpg", purchase_date=date.today(), content_hash="def")
+    )
+
+    found = await repo.get_by_content_hashes(1, ["abc", "def"])
+
+    assert list(found) == ["abc"]
+    assert found["abc"].id == first.id
+
+
+@pytest.mark.asyncio
+async def test_get_all_pages_newest_first_in_both_directions(db: AsyncSession):
+    """Test next and previous cursors walk the same pages without overlap"""
+    repo = ReceiptRepository(db)
+    await repo.save_many(
+        [
+            Receipt(user_id=1, image_path=f"{i}.jpg", purchase_date=date(2025, 12, 1))
+            for i in range(7)
+        ]
+        + [Receipt(user_id=2, image_path="other.jpg", purchase_date=date(2025, 12, 1))]
+    )
+
+    first = await repo.get_all({"user_id": 1, "limit": 3})
+    second = await repo.get_all(
+        {"user_id": 1, "limit": 3, "cursor": Cursor.decode(first.next_cursor)}
+    )
+    third = await repo.get_all(
+        {"user_id": 1, "limit": 3, "cursor": Cursor.decode(second.next_cursor)}
+    )
+    back = await repo.get_all(
+        {"user_id": 1, "limit": 3, "cursor": Cursor.decode(third.prev_cursor)}
+    )
+
+    assert [r.id for r in first.items] == [7, 6, 5]
+    assert [r.id for r in second.items] == [4, 3, 2]
+    assert [r.id for r in third.items] == [1]
+    assert first.prev_cursor is None
+    assert third.next_cursor is None
+    assert [r.id for r in back.items] == [4, 3, 2]
+    assert back.next_cursor is not None
+
+
+@pytest.mark.asyncio
+async def test_get_all_filters_by_status_and_purchase_date(db: AsyncSession):
+    """Test filters combine and a date range orders pages by purchase date"""
+    repo = ReceiptRepository(db)
+    await repo.save_many(
+        [
+            Receipt(user_id=1, image_path="a.jpg", purchase_date=date(2025, 12, 3)),
+            Receipt(user_id=1, image_path="b.jpg", purchase_date=date(2025, 12, 1)),
+            Receipt(user_id=1, image_path="c.jpg", purchase_date=date(2025, 12, 2)),
+            Receipt(user_id=1, image_path="d.jpg", purchase_date=date(2025, 11, 1)),
+            Receipt(
+                user_id=1, image_path="e.jpg", purchase_date=date(2025, 12, 2), status="failed"
+            ),
+        ]
+    )
+    params = {
+        "user_id": 1,
+        "status": "uploaded",
+        "purchase_date_from": date(2025, 12, 1),
+        "purchase_date_to": date(2025, 12, 31),
+        "limit": 2,
+    }
+
+    first = await repo.get_all(params)
+    second = await repo.get_all({**params, "cursor": Cursor.decode(first.next_cursor)})
+
+    assert [r.image_path for r in first.items] == ["a.jpg", "c.jpg"]
+    assert [r.image_path for r in second.items] == ["b.jpg"]
+
+
+@pytest.mark.asyncio
+async def test_reads_skip_receipts_older_than_the_retention_period(db: AsyncSession, monkeypatch):
+    """Test lookups and listings stop at the retention cutoff on created_at"""
+    monkeypatch.setattr(settings, "partition_retention_months", 24)
+    repo = ReceiptRepository(db)
+    old, recent = await repo.bulk_insert(
+        [
+            {
+                "user_id": 1,
+                "image_path": "old.jpg",
+                "purchase_date": date(2020, 1, 1),
+                "created_at": datetime(2020, 1, 2, tzinfo=timezone.utc),
+                "content_hash": "a" * 64,
+            },
+            {"user_id": 1, "image_path": "recent.jpg", "purchase_date": date.today()},
+        ]
+    )
+
+    assert await repo.get_by_id(old.id) is None
+    assert await repo.get_by_content_hash(1, "a" * 64) is None
+    assert [r.id for r in (await repo.get_all({"user_id": 1})).items] == [recent.id]
+
+    monkeypatch.setattr(settings, "partition_retention_months", 0)
+    assert (await repo.get_by_id(old.id)).id == old.id
@@ -0,0 +1,46 @@
+# tests/test_resources.py
+import pytest
+from httpx import AsyncClient, ASGITransport
+from qdrant_client import AsyncQdrantClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.main import app
+from app.resources import close_resources, open_resources
+from app.services.storage_service import InMemoryStorageService
+
+
+@pytest.fixture
+def local_clients(mocker):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    storage = InMemoryStorageService()
+    qdrant = AsyncQdrantClient(location=":memory:")
+
+    mocker.patch("app.resources.engine", engine)
+    mocker.patch("app.resources.create_storage_service", return_value=storage)
+    mocker.patch("app.resources.create_qdrant_client", return_value=qdrant)
+
+    return engine, storage, qdrant
+
+
+@pytest.mark.asyncio
+async def test_open_and_close_resources(local_clients):
+    """Test shared clients are created once, warmed and disposed"""
+    engine, storage, qdrant = local_clients
+
+    resources = await open_resources()
+
+    assert resources.engine is engine
+    assert resources.storage is storage
+    assert resources.qdrant is qdrant
+
+    await close_resources(resources)
+
+
+@pytest.mark.asyncio
+async def test_dependencies_require_initialized_resources():
+    """Test requests fail fast when the lifespan has not created shared clients"""
+    app.state.resources = None
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/receipts/1")
+
+    assert response.status_code == 503
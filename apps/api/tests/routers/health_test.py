@@ -2,15 +2,15 @@ import pytest
 from httpx import AsyncClient, ASGITransport
 from unittest.mock import MagicMock
 from app.main import app
-from app.routers.receipts import get_minio_service
+from app.routers.receipts import get_storage_service
 
 
 @pytest.mark.asyncio
 async def test_health_check():
     """Test health endpoint"""
-    # Mock MinioService to prevent connection attempts during import
+    # Mock StorageService to prevent connection attempts during import
     mock_minio = MagicMock()
-    app.dependency_overrides[get_minio_service] = lambda: mock_minio
+    app.dependency_overrides[get_storage_service] = lambda: mock_minio
 
     try:
         async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
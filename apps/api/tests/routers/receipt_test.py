@@ -1,19 +1,30 @@
 # tests/routers/test_receipts_router.py
+import orjson
 import pytest
 from httpx import AsyncClient, ASGITransport
 from unittest.mock import AsyncMock, MagicMock
 from datetime import date, datetime, timezone
 from app.main import app
 from app.models.receipts import Receipt
-from app.routers.receipts import get_minio_service
+from app.repository.pagination import Page
+from app.repository.receipt_repository import ReceiptRepository
+from app.routers.response.encoding import JSONBytesResponse
+from app.routers.response.receipt import ReceiptResponse, receipt_payload
+from app.routers.receipts import (
+    get_image_url_service,
+    get_storage_service,
+)
+from app.services.image_url_service import ImageUrlService
+from app.services.storage_service import InMemoryStorageService
+from app.services.receipt_service import FileUploadResult, FinalizeResult, PresignedUpload
 
 
 @pytest.mark.asyncio
 async def test_upload_receipt_endpoint(mocker):
     """Test POST /receipts endpoint"""
-    # Mock MinioService
+    # Mock StorageService
     mock_minio = MagicMock()
-    app.dependency_overrides[get_minio_service] = lambda: mock_minio
+    app.dependency_overrides[get_storage_service] = lambda: mock_minio
 
     # Mock service
     mock_service = AsyncMock()
@@ -25,7 +36,7 @@ async def test_upload_receipt_endpoint(mocker):
         status="uploaded",
         created_at=datetime.now(timezone.utc),
     )
-    mock_service.upload_receipt.return_value = mock_receipt
+    mock_service.upload_receipt.return_value = (mock_receipt, False)
 
     mocker.patch("app.routers.receipts.ReceiptService", return_value=mock_service)
 
@@ -48,29 +59,35 @@ async def test_upload_receipt_endpoint(mocker):
 @pytest.mark.asyncio
 async def test_list_receipts_endpoint(mocker):
     """Test GET /receipts endpoint"""
-    # Mock MinioService
+    # Mock StorageService
     mock_minio = MagicMock()
-    app.dependency_overrides[get_minio_service] = lambda: mock_minio
+    app.dependency_overrides[get_storage_service] = lambda: mock_minio
+    image_urls = ImageUrlService(InMemoryStorageService())
+    app.dependency_overrides[get_image_url_service] = lambda: image_urls
 
     mock_service = AsyncMock()
-    mock_service.get_receipts.return_value = [
-        Receipt(
-            id=1,
-            user_id=1,
-            image_path="img1.jpg",
-            purchase_date=date.today(),
-            status="uploaded",
-            created_at=datetime.now(timezone.utc),
-        ),
-        Receipt(
-            id=2,
-            user_id=1,
-            image_path="img2.jpg",
-            purchase_date=date.today(),
-            status="uploaded",
-            created_at=datetime.now(timezone.utc),
-        ),
-    ]
+    mock_service.get_receipts.return_value = Page(
+        items=[
+            Receipt(
+                id=1,
+                user_id=1,
+                image_path="img1.jpg",
+                purchase_date=date.today(),
+                status="uploaded",
+                created_at=datetime.now(timezone.utc),
+            ),
+            Receipt(
+                id=2,
+                user_id=1,
+                image_path="img2.jpg",
+                purchase_date=date.today(),
+                status="uploaded",
+                created_at=datetime.now(timezone.utc),
+            ),
+        ],
+        next_cursor="next",
+        total=12,
+    )
 
     mocker.patch("app.routers.receipts.ReceiptService", return_value=mock_service)
 
@@ -80,8 +97,10 @@ async def test_list_receipts_endpoint(mocker):
 
             assert response.status_code == 200
             data = response.json()
-            assert data["total"] >= 2
+            assert data["total"] == 12
             assert len(data["receipts"]) >= 2
+            assert data["next_cursor"] == "next"
+            assert data["prev_cursor"] is None
     finally:
         app.dependency_overrides.clear()
 
@@ -89,12 +108,16 @@ async def test_list_receipts_endpoint(mocker):
 @pytest.mark.asyncio
 async def test_upload_multiple_receipts_endpoint(mocker):
     """Test POST /receipts/bulk endpoint"""
-    # Mock MinioService
+    # Mock StorageService
     mock_minio = MagicMock()
-    app.dependency_overrides[get_minio_service] = lambda: mock_minio
+    app.dependency_overrides[get_storage_service] = lambda: mock_minio
 
     mock_service = AsyncMock()
-    mock_service.upload_receipts.return_value = 3
+    mock_service.upload_receipts.return_value = [
+        FileUploadResult(filename="test1.jpg", image_path="minio://bucket/1.jpg", receipt_id=1),
+        FileUploadResult(filename="test2.jpg", image_path="minio://bucket/2.jpg", receipt_id=2),
+        FileUploadResult(filename="test3.jpg", error="Only image files are allowed "),
+    ]
 
     mocker.patch("app.routers.receipts.ReceiptService", return_value=mock_service)
 
@@ -114,6 +137,146 @@ async def test_upload_multiple_receipts_endpoint(mocker):
             assert response.status_code == 201
             data = response.json()
             assert data["total"] == 3
+            assert data["succeeded"] == 2
+            assert data["failed"] == 1
+            assert [result["id"] for result in data["results"]] == [1, 2, None]
             mock_service.upload_receipts.assert_called_once()
     finally:
         app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_presigned_upload_endpoints(mocker):
+    """Test POST /receipts/uploads and /receipts/uploads/finalize"""
+    mock_minio = MagicMock()
+    app.dependency_overrides[get_storage_service] = lambda: mock_minio
+
+    mock_service = AsyncMock()
+    pending = Receipt(
+        id=5,
+        user_id=1,
+        image_path="minio://bucket/uploads/a.jpg",
+        purchase_date=date(2025, 12, 1),
+        status="pending",
+    )
+    mock_service.create_presigned_uploads.return_value = [
+        PresignedUpload(
+            receipt=pending,
+            upload_url="http://minio/bucket/uploads/a.jpg?X-Amz-Signature=abc",
+            expires_at=datetime.now(timezone.utc),
+        )
+    ]
+    mock_service.finalize_uploads.return_value = [FinalizeResult(receipt_id=5, status="uploaded")]
+
+    mocker.patch("app.routers.receipts.ReceiptService", return_value=mock_service)
+
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.post(
+                "/receipts/uploads",
+                json={
+                    "user_id": 1,
+                    "purchase_date": "2025-12-01",
+                    "files": [{"filename": "a.jpg", "content_type": "image/jpeg", "size": 4}],
+                },
+            )
+
+            assert response.status_code == 201
+            upload = response.json()["uploads"][0]
+            assert upload["receipt_id"] == 5
+            assert upload["upload_url"].startswith("http://minio/")
+
+            response = await client.post(
+                "/receipts/uploads/finalize", json={"user_id": 1, "receipt_ids": [5]}
+            )
+
+            assert response.status_code == 200
+            assert response.json()["results"][0]["success"] is True
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_get_receipt_returns_cached_image_url(mocker):
+    """Test GET /receipts/{id} signs image URLs once and reuses them"""
+    storage = InMemoryStorageService()
+    image_urls = ImageUrlService(storage)
+    app.dependency_overrides[get_storage_service] = lambda: storage
+    app.dependency_overrides[get_image_url_service] = lambda: image_urls
+
+    mock_service = AsyncMock()
+    mock_service.get_row.return_value = Receipt(
+        id=1,
+        user_id=1,
+        image_path="memory://receipts/sha256/abc",
+        web_image_path="memory://receipts/variants/sha256/abc/web.jpg",
+        thumbnail_path="memory://receipts/variants/sha256/abc/thumbnail.jpg",
+        purchase_date=date.today(),
+        status="uploaded",
+        created_at=datetime.now(timezone.utc),
+    )
+
+    mocker.patch("app.routers.receipts.ReceiptService", return_value=mock_service)
+
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            first = (await client.get("/receipts/1")).json()
+            second = (await client.get("/receipts/1")).json()
+
+            assert first["image_url"].startswith("memory://receipts/variants/sha256/abc/web.jpg")
+            assert first["thumbnail_url"] is not None
+            assert second["image_url"] == first["image_url"]
+            assert image_urls.misses == 2
+            assert image_urls.hits == 2
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_receipt_stats_endpoint(mocker):
+    """Test GET /receipts/stats is not captured by the /{id} route and needs no storage"""
+    mock_service = AsyncMock()
+    mock_service.get_stats.return_value = {"uploaded": 3, "processed": 4}
+    mocker.patch("app.routers.receipts.ReceiptService", return_value=mock_service)
+
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/receipts/stats?user_id=1")
+
+            assert response.status_code == 200
+            assert response.json() == {
+                "user_id": 1,
+                "total": 7,
+                "by_status": {"uploaded": 3, "processed": 4},
+            }
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_receipt_payload_matches_response_model(db):
+    """Test the orjson read path encodes rows exactly like ReceiptResponse"""
+    saved = await ReceiptRepository(db).save(
+        Receipt(
+            user_id=1,
+            image_path="memory://receipts/sha256/abc",
+            content_hash="abc",
+            purchase_date=date(2025, 12, 1),
+            created_at=datetime(2025, 12, 1, 10, 30, 15, 123456, tzinfo=timezone.utc),
+        )
+    )
+    row = await ReceiptRepository(db).get_row_by_id(saved.id)
+
+    body = JSONBytesResponse(receipt_payload(row, thumbnail_url="https://img/t.jpg")).body
+    expected = ReceiptResponse(
+        id=saved.id,
+        user_id=1,
+        image_path=saved.image_path,
+        purchase_date=str(saved.purchase_date),
+        status=saved.status,
+        created_at=row.created_at.isoformat(),
+        content_hash="abc",
+        thumbnail_url="https://img/t.jpg",
+    )
+
+    assert orjson.loads(body) == expected.model_dump()
@@ -0,0 +1,82 @@
+# tests/test_schema.py
+import asyncio
+from pathlib import Path
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.database import Base
+from app.schema import SchemaVersionError, check_schema_version, head_revision
+
+API_DIR = Path(__file__).parent.parent
+
+
+def alembic_config(path: Path) -> Config:
+    config = Config(str(API_DIR / "alembic.ini"))
+    config.set_main_option("sqlalchemy.url", f"sqlite+aiosqlite:///{path}")
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def check(path: Path) -> str:
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        try:
+            return await check_schema_version(engine)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(run())
+
+
+def test_migrations_build_the_model_schema(tmp_path):
+    """Test upgrading an empty database to head matches the models exactly"""
+    path = tmp_path / "schema.db"
+    command.upgrade(alembic_config(path), "head")
+
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.connect() as conn:
+        diff = compare_metadata(MigrationContext.configure(conn), Base.metadata)
+    engine.dispose()
+
+    assert diff == []
+    assert check(path) == head_revision()
+
+
+def test_migrations_upgrade_a_create_all_baseline(tmp_path):
+    """Test a pre-migration database adopted at 0001 keeps its rows and gets counters"""
+    path = tmp_path / "schema.db"
+    config = alembic_config(path)
+    command.upgrade(config, "0001")
+
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO users (id, email, name) VALUES (1, 'a@b.c', 'A')")
+        conn.exec_driver_sql(
+            "INSERT INTO receipts (user_id, image_path, purchase_date, status) VALUES "
+            "(1, 'a.jpg', '2025-12-01', 'uploaded'), (1, 'b.jpg', '2025-12-02', 'uploaded')"
+        )
+
+    command.upgrade(config, "head")
+
+    with engine.connect() as conn:
+        counters = conn.exec_driver_sql("SELECT user_id, status, count FROM receipt_counters").all()
+    engine.dispose()
+
+    assert counters == [(1, "uploaded", 2)]
+
+    command.downgrade(config, "base")
+
+
+def test_startup_check_rejects_an_unmigrated_database(tmp_path):
+    """Test the startup check fails on a missing or outdated schema"""
+    path = tmp_path / "schema.db"
+    with pytest.raises(SchemaVersionError, match="<none>"):
+        check(path)
+
+    command.upgrade(alembic_config(path), "0002")
+    with pytest.raises(SchemaVersionError, match="revision 0002"):
+        check(path)
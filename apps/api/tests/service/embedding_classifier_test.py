@@ -0,0 +1,138 @@
+# tests/services/test_embedding_classifier.py
+import threading
+import numpy as np
+import pytest
+from typing import Sequence
+from app.services import embedding_classifier
+from app.services.embedding_classifier import (
+    EmbeddingClassifier,
+    Encoder,
+    EncoderError,
+    HashingEncoder,
+    create_encoder,
+)
+from app.services.item_categorizer import UNCATEGORIZED, CategoryMatch
+from app.services.receipt_processor import categorize_items
+
+CATEGORIES = [
+    {"id": 2, "name": "Meat", "aliases": ["chicken", "beef", "turkey", "sausage"]},
+    {"id": 3, "name": "Dairy", "aliases": ["milk", "cheese", "mozzarella", "yogurt"]},
+    {"id": 6, "name": "Fruits", "aliases": ["banana", "blueberry", "mango"]},
+    {"id": 8, "name": "Beverages", "aliases": ["lemonade", "juice", "water"]},
+]
+
+
+class AxisEncoder(Encoder):
+    """One axis per known word, so similarities are easy to predict"""
+
+    words = ["meat", "dairy", "fruit", "beverage", "milk", "tea"]
+
+    @property
+    def dimension(self) -> int:
+        return len(self.words)
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for column, word in enumerate(self.words):
+                vectors[row, column] = text.lower().count(word)
+        return vectors
+
+
+def test_hashing_encoder_is_deterministic():
+    """Test the same names always encode to the same vectors, batched or not"""
+    encoder = HashingEncoder(dimension=256)
+    batch = encoder.encode(["Chicken Thighs", "MOZARELLA", "12 / 500G"])
+
+    assert batch.shape == (3, 256) and batch.dtype == np.float32
+    assert np.array_equal(batch[1], HashingEncoder(dimension=256).encode(["MOZARELLA"])[0])
+    assert np.array_equal(encoder.encode(["chicken thigh 2LB"])[0], batch[0])
+    assert not batch[2].any()  # nothing but sizes
+
+
+def test_top_k_matches_a_per_item_loop():
+    """Test batched top-k agrees with scoring each name against each category in a loop"""
+    encoder = HashingEncoder(dimension=512)
+    classifier = EmbeddingClassifier(encoder, CATEGORIES)
+    names = ["Chickn thighs", "Bannanas", "Mozarella", "Sparkling Lemonade", "GRND TURKEY"]
+
+    top = classifier.top_k(names, k=2)
+
+    for name, matches in zip(names, top):
+        vector = encoder.encode([name])[0]
+        expected = []
+        for category in CATEGORIES:
+            aliases = encoder.encode([category["name"], *category["aliases"]])
+            cosines = aliases @ vector / (np.linalg.norm(aliases, axis=1) * np.linalg.norm(vector))
+            expected.append((round(float(cosines.max()), 3), category["name"]))
+        expected.sort(reverse=True)
+        assert [m.match_score for m in matches] == [score for score, _ in expected[:2]]
+        assert matches[0].category_name == expected[0][1]
+
+    assert [matches[0].category_name for matches in top] == [
+        "Meat",
+        "Fruits",
+        "Dairy",
+        "Beverages",
+        "Meat",
+    ]
+    assert all(len(matches) == 4 for matches in classifier.top_k(names, k=10))
+    assert classifier.top_k([]) == []
+
+
+def test_classify_with_a_pluggable_encoder():
+    """Test any Encoder works and scores below min_score stay uncategorized"""
+    classifier = EmbeddingClassifier(AxisEncoder(), CATEGORIES, min_score=0.5)
+
+    assert classifier.classify(["Oat milk", "Green tea", "Fruit & Meat"]) == [
+        CategoryMatch(3, "Dairy", 1.0, "embedding"),
+        UNCATEGORIZED,
+        CategoryMatch(2, "Meat", 0.707, "embedding"),  # ties go to the first category
+    ]
+
+
+def test_create_encoder():
+    """Test encoders are created by name and unknown names are rejected"""
+    assert isinstance(create_encoder("hashing"), HashingEncoder)
+    assert create_encoder("none") is None
+    with pytest.raises(EncoderError):
+        create_encoder("word2vec")
+
+
+@pytest.mark.asyncio
+async def test_categorize_items_falls_back_to_embeddings(monkeypatch):
+    """Test only names the dictionary cannot place are sent to the classifier"""
+    classifier = EmbeddingClassifier(HashingEncoder(), CATEGORIES)
+    monkeypatch.setattr(embedding_classifier, "_embedding_classifier", classifier)
+    monkeypatch.setattr(embedding_classifier, "_loaded", True)
+
+    # Run-together OCR words defeat the dictionary's token lookups, not the trigrams
+    matches = await categorize_items(["MILK 2L", "Yogurtdrink", "ITEM 4411"])
+
+    assert [(m.category_name, m.match_method) for m in matches] == [
+        ("Dairy", "exact"),
+        ("Dairy", "embedding"),
+        ("Uncategorized", "default"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_categorize_items_loads_the_classifier_off_the_event_loop(monkeypatch):
+    """Test a classifier not preloaded is built in a thread, not on the event loop"""
+    classifier = EmbeddingClassifier(HashingEncoder(), CATEGORIES)
+    loaded_in = []
+
+    def load():
+        loaded_in.append(threading.get_ident())
+        embedding_classifier._embedding_classifier = classifier
+        embedding_classifier._loaded = True
+        return classifier
+
+    monkeypatch.setattr(embedding_classifier, "_embedding_classifier", None)
+    monkeypatch.setattr(embedding_classifier, "_loaded", False)
+    monkeypatch.setattr(embedding_classifier, "reload_embedding_classifier", load)
+
+    matches = await categorize_items(["Yogurtdrink"])
+
+    assert loaded_in and loaded_in[0] != threading.get_ident()
+    assert matches[0].match_method == "embedding"
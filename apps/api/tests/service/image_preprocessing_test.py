@@ -0,0 +1,80 @@
+# tests/services/test_image_preprocessing.py
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from PIL import Image, ImageDraw
+from app.services.image_preprocessing import (
+    PREPROCESS_VERSION,
+    PreprocessingError,
+    preprocess_batch,
+    preprocess_image,
+    preprocess_many,
+)
+
+
+def make_receipt(lines: int = 30) -> Image.Image:
+    image = Image.new("L", (500, lines * 22 + 40), 250)
+    draw = ImageDraw.Draw(image)
+    for i in range(lines):
+        draw.text((20, 20 + i * 22), f"ITEM {i:03d} ORGANIC MILK 2L  {i * 1.37:7.2f}", fill=20)
+    return image
+
+
+def make_photo(angle: float) -> Image.Image:
+    """The receipt photographed: dim, rotated, noisy, on a dark table"""
+    page = make_receipt().point(lambda v: 90 + v * 80 // 255)
+    table = Image.new("L", (1100, 1100), 40)
+    table.paste(page.rotate(angle, expand=True, fillcolor=40), (250, 150))
+
+    pixels = np.asarray(table, dtype=np.int16)
+    pixels = pixels + np.random.default_rng(0).normal(0, 12, pixels.shape).astype(np.int16)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+def encode(image: Image.Image) -> bytes:
+    out = BytesIO()
+    image.save(out, "PNG")
+    return out.getvalue()
+
+
+def test_clean_scan_takes_the_fast_path():
+    """Test an upright, clean, high-contrast scan passes through unchanged"""
+    image = make_receipt()
+    result = preprocess_image(encode(image))
+
+    assert result.metrics.fast_path
+    assert result.metrics.version == PREPROCESS_VERSION
+    assert result.image.dtype == np.uint8
+    assert np.array_equal(result.image, np.asarray(image))
+
+
+def test_photo_is_cropped_deskewed_denoised_and_stretched():
+    """Test a skewed, noisy, low-contrast photo gets every correction"""
+    result = preprocess_image(encode(make_photo(angle=5)))
+    metrics = result.metrics
+
+    assert metrics.cropped and metrics.deskewed and metrics.denoised and metrics.stretched
+    assert metrics.skew == pytest.approx(5, abs=0.5)
+    assert metrics.noise == pytest.approx(12, rel=0.25)
+    assert metrics.width < 1100 and metrics.height < 1100
+    assert metrics.to_dict()["fast_path"] is False
+
+
+def test_batch_returns_errors_in_place():
+    """Test a corrupt image in a batch yields an error without losing the others"""
+    results = preprocess_batch([encode(make_receipt()), b"not an image"])
+
+    assert results[0].metrics.fast_path
+    assert isinstance(results[1], PreprocessingError)
+
+
+@pytest.mark.asyncio
+async def test_preprocess_many_keeps_input_order():
+    """Test results come back in input order across executor batches"""
+    images = [encode(make_receipt(lines)) for lines in (5, 10, 15, 20, 25)]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = await preprocess_many(executor, images, batch_size=2)
+
+    assert [result.metrics.height for result in results] == [150, 260, 370, 480, 590]
@@ -0,0 +1,55 @@
+# tests/services/test_image_url_service.py
+import pytest
+from unittest.mock import AsyncMock
+from app.services.image_url_service import IMAGE_CACHE_CONTROL, ImageUrlService
+from app.services.storage_service import InMemoryStorageService
+
+
+@pytest.fixture
+def storage():
+    storage = InMemoryStorageService()
+    storage.presigned_get_url = AsyncMock(side_effect=lambda name, *_, **__: f"https://s/{name}")
+    return storage
+
+
+@pytest.mark.asyncio
+async def test_get_urls_signs_each_path_once(storage):
+    """Test a page of receipts only signs URLs that are not already cached"""
+    service = ImageUrlService(storage, expiry=3600, refresh_margin=300)
+    paths = [f"memory://receipts/sha256/{i}" for i in range(50)]
+
+    first = await service.get_urls(paths)
+    second = await service.get_urls(paths + [None])
+
+    assert first == second
+    assert storage.presigned_get_url.call_count == 50
+    assert storage.presigned_get_url.call_args.kwargs["cache_control"] == IMAGE_CACHE_CONTROL
+
+
+@pytest.mark.asyncio
+async def test_get_url_resigns_before_expiry(storage, mocker):
+    """Test cached URLs are replaced once they enter the refresh margin"""
+    clock = mocker.patch("app.services.image_url_service.time.monotonic", return_value=1000.0)
+    service = ImageUrlService(storage, expiry=3600, refresh_margin=300)
+
+    await service.get_url("memory://receipts/sha256/abc")
+    clock.return_value = 1000.0 + 3299
+    await service.get_url("memory://receipts/sha256/abc")
+    clock.return_value = 1000.0 + 3301
+    await service.get_url("memory://receipts/sha256/abc")
+
+    assert storage.presigned_get_url.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_is_bounded(storage):
+    """Test least recently used URLs are evicted past max_entries"""
+    service = ImageUrlService(storage, max_entries=2)
+
+    for name in ["a", "b", "a", "c"]:
+        await service.get_url(f"memory://receipts/{name}")
+
+    await service.get_url("memory://receipts/a")
+
+    assert service.hits == 2
+    assert storage.presigned_get_url.call_count == 3
@@ -0,0 +1,63 @@
+# tests/services/test_image_variant_service.py
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from io import BytesIO
+from PIL import Image
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.models.receipts import Receipt
+from app.repository.job_repository import GENERATE_VARIANTS, JobRepository
+from app.repository.receipt_repository import ReceiptRepository
+from app.services.image_variant_service import generate_variants
+from app.services.receipt_processor import WorkerContext
+from app.services.storage_service import InMemoryStorageService
+from app.worker import Worker
+
+
+def make_jpeg(width: int, height: int) -> bytes:
+    out = BytesIO()
+    Image.new("RGB", (width, height), color=(240, 240, 230)).save(out, "JPEG")
+    return out.getvalue()
+
+
+def test_generate_variants_downscales_to_bounds():
+    """Test each variant fits its bounding box and keeps the aspect ratio"""
+    variants = generate_variants(make_jpeg(3000, 4000))
+
+    thumbnail = Image.open(BytesIO(variants["thumbnail"]))
+    web = Image.open(BytesIO(variants["web"]))
+
+    assert thumbnail.size == (192, 256)
+    assert web.size == (960, 1280)
+    assert len(variants["thumbnail"]) < len(variants["web"])
+
+
+@pytest.mark.asyncio
+async def test_variant_jobs_store_and_record_variants(db: AsyncSession):
+    """Test the worker writes variants next to the original and leaves the status alone"""
+    storage = InMemoryStorageService()
+    await storage.put_object("sha256/abc", BytesIO(make_jpeg(1600, 2400)), "image/jpeg")
+
+    receipt = await ReceiptRepository(db).save(
+        Receipt(
+            user_id=1,
+            image_path=storage.build_path("sha256/abc"),
+            purchase_date=date(2025, 12, 1),
+        )
+    )
+    await JobRepository(db).enqueue(GENERATE_VARIANTS, [receipt.id])
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        worker = Worker(
+            async_sessionmaker(db.bind, expire_on_commit=False),
+            WorkerContext(storage=storage, executor=executor),
+        )
+        assert await worker.run_once() == 1
+
+    assert "variants/sha256/abc/thumbnail.jpg" in storage.objects
+    assert "variants/sha256/abc/web.jpg" in storage.objects
+
+    await db.refresh(receipt)
+    assert receipt.status == "uploaded"
+    assert receipt.thumbnail_path == "memory://receipts/variants/sha256/abc/thumbnail.jpg"
+    assert receipt.web_image_path == "memory://receipts/variants/sha256/abc/web.jpg"
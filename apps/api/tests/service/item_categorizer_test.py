@@ -0,0 +1,80 @@
+# tests/services/test_item_categorizer.py
+import json
+import pytest
+from app.config import settings
+from app.services import item_categorizer
+from app.services.item_categorizer import (
+    CategoryMatch,
+    CategoryMatcher,
+    get_item_categorizer,
+    load_categories,
+    normalize_item_name,
+    reload_item_categorizer,
+)
+
+CATEGORIES = [
+    {"id": 2, "name": "Meat", "aliases": ["chicken", "chicken breast", "beef", "ground beef"]},
+    {"id": 3, "name": "Dairy", "aliases": ["milk", "butter", "crème fraîche"]},
+    {"id": 6, "name": "Fruits", "aliases": ["banana", "strawberry"]},
+    {"id": 7, "name": "Condiments", "aliases": ["peanut butter", "butter"]},
+]
+
+
+def test_normalize_item_name():
+    """Test accents, case, sizes, packaging words and plurals are normalized away"""
+    assert normalize_item_name("ORG Bananas 2LB") == ["banana"]
+    assert normalize_item_name("Crème Fraîche 200ml") == ["creme", "fraiche"]
+    assert normalize_item_name("Strawberries 12PK") == ["strawberry"]
+    assert normalize_item_name("2% MILK 4L") == ["milk"]
+    assert normalize_item_name("12 / 500G") == []
+
+
+def test_match_methods_and_scores():
+    """Test exact, alias, fuzzy and default matches with their scores"""
+    matcher = CategoryMatcher(CATEGORIES)
+
+    assert matcher.match_many(
+        ["Chicken Breast", "CREME FRAICHE", "CHOC MILK", "PEANUT BUTTER", "Bannana", "XYZ 12"]
+    ) == [
+        CategoryMatch(2, "Meat", 1.0, "exact"),
+        CategoryMatch(3, "Dairy", 1.0, "exact"),
+        CategoryMatch(3, "Dairy", 0.875, "alias"),
+        CategoryMatch(7, "Condiments", 1.0, "exact"),  # the longest alias wins
+        CategoryMatch(6, "Fruits", 0.833, "fuzzy"),
+        CategoryMatch(None, "Uncategorized", 0.0, "default"),
+    ]
+    assert matcher.match("butter").category_id == 3  # the first category listing an alias
+    assert matcher.match("GRND BEEF").match_method == "alias"
+    assert CategoryMatcher(CATEGORIES, fuzzy_min_score=0.9).match("Bannana").category_id is None
+
+
+def test_reload_swaps_the_matcher(tmp_path, monkeypatch):
+    """Test reloading rebuilds from the configured file and a broken file keeps the old one"""
+    path = tmp_path / "categories.json"
+    path.write_text(json.dumps(CATEGORIES[:1]))
+    monkeypatch.setattr(item_categorizer, "_item_categorizer", None)
+    monkeypatch.setattr(settings, "item_categories_path", str(path))
+
+    assert get_item_categorizer().match("milk").category_id is None
+
+    path.write_text(json.dumps(CATEGORIES))
+    reloaded = reload_item_categorizer()
+    assert get_item_categorizer() is reloaded
+    assert reloaded.match("milk").category_id == 3
+
+    path.write_text("[")
+    with pytest.raises(ValueError):
+        reload_item_categorizer()
+    assert get_item_categorizer() is reloaded
+
+
+def test_builtin_dictionary():
+    """Test the bundled dictionary loads and covers common receipt items"""
+    matcher = CategoryMatcher(load_categories())
+
+    assert [
+        match.category_name
+        for match in matcher.match_many(
+            ["MILK 2L", "Organic Bananas", "Jalapeño", "OLIVE OIL", "ORANGE JUICE", "SALMON FILLET"]
+        )
+    ] == ["Dairy", "Fruits", "Vegetables", "Condiments", "Beverages", "Seafood"]
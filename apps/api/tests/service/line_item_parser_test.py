@@ -0,0 +1,105 @@
+# tests/services/test_line_item_parser.py
+from decimal import Decimal
+from app.services.line_item_parser import parse_line_items
+
+RECEIPT = """FRESH MART #112
+TEL 555-0100
+DATE 12/01/2025 14:32
+MILK 2L                 3.99
+BREAD WHOLE WHEAT       2.50 F
+2 x YOGURT              5.98
+APPLES 3 @ 0.50         1.50
+BANANAS
+0.734 kg @ 1.99/kg      1.46
+EGGS 12                 4.50
+2 @ 2.25
+COUPON EGGS            -0.50
+SUBTOTAL               19.43
+TAX                     0.97
+TOTAL                  20.40
+VISA                   20.40
+THANK YOU"""
+
+
+def summary(text: str):
+    return [
+        (item.item_name, item.quantity, item.unit_price, item.unit, item.total_price)
+        for item in parse_line_items(text).items
+    ]
+
+
+def test_parses_item_formats():
+    """Test inline, leading and detail-line quantities, weights and non-item lines"""
+    assert summary(RECEIPT) == [
+        ("MILK 2L", None, None, None, Decimal("3.99")),
+        ("BREAD WHOLE WHEAT", None, None, None, Decimal("2.50")),
+        ("YOGURT", Decimal("2"), None, None, Decimal("5.98")),
+        ("APPLES", Decimal("3"), Decimal("0.50"), None, Decimal("1.50")),
+        ("BANANAS", Decimal("0.734"), Decimal("1.99"), "kg", Decimal("1.46")),
+        ("EGGS 12", Decimal("2"), Decimal("2.25"), None, Decimal("4.50")),
+    ]
+
+
+def test_totals_and_confidence():
+    """Test totals and discounts are read and confirm the items"""
+    parsed = parse_line_items(RECEIPT)
+
+    assert (parsed.subtotal, parsed.total, parsed.discounts) == (
+        Decimal("19.43"),
+        Decimal("20.40"),
+        Decimal("-0.50"),
+    )
+    assert [item.line_number for item in parsed.items] == [4, 5, 6, 7, 8, 10]
+    assert parsed.confidence == 1.0
+
+
+def test_confidence_drops_on_unparsed_lines_and_mismatches():
+    """Test unreadable priced lines and totals that do not add up lower the confidence"""
+    garbled = parse_line_items("MILK 2.49\nEGGS 3.01\n???? 1.00\nTOTAL 5.94")
+    mismatch = parse_line_items("MILK 2.49\nEGGS 3.01\nTOTAL 9.50")
+    untotalled = parse_line_items("MILK 2.49\nEGGS 3.01")
+
+    assert garbled.confidence == 0.667
+    assert mismatch.confidence == 0.5
+    assert untotalled.confidence == 0.8
+    assert parse_line_items("").confidence == 0.0
+    assert parse_line_items("THANK YOU\nTOTAL 0.00").items == []
+
+
+def test_store_detail_keywords_only_skip_lines_without_a_price():
+    """Test names starting with a store-detail keyword still parse when the line has a price"""
+    assert summary("STORE 112\nSTORE BRAND MILK  2.49\nDATE NUT BREAD  3.10 F\nTAX  0.25") == [
+        ("STORE BRAND MILK", None, None, None, Decimal("2.49")),
+        ("DATE NUT BREAD", None, None, None, Decimal("3.10")),
+    ]
+
+
+def test_amounts_with_thousands_separators():
+    """Test grouped amounts parse as one value in both separator conventions"""
+    parsed = parse_line_items("TV 55IN  1,234.56\nSOFA  1.049,00\nSUBTOTAL  2,283.56")
+
+    assert [item.total_price for item in parsed.items] == [Decimal("1234.56"), Decimal("1049.00")]
+    assert parsed.subtotal == Decimal("2283.56")
+    assert parsed.confidence == 1.0
+
+
+def test_crlf_line_endings():
+    """Test receipts with Windows or old Mac line endings parse like `\\n` ones"""
+    for newline in ("\r\n", "\r"):
+        parsed = parse_line_items(RECEIPT.replace("\n", newline))
+
+        assert summary(RECEIPT.replace("\n", newline)) == summary(RECEIPT)
+        assert [item.line_number for item in parsed.items] == [4, 5, 6, 7, 8, 10]
+        assert parsed.total == Decimal("20.40")
+
+
+def test_savings_summaries_are_not_totals_or_discounts():
+    """Test savings summary lines neither replace the total nor count the discounts twice"""
+    parsed = parse_line_items(
+        "MILK  2.49\nCOUPON MILK  -0.50\nTOTAL SAVINGS  0.50\nYOU SAVED  0.50\n"
+        "YOUR SAVINGS  0.50\nTOTAL  1.99"
+    )
+
+    assert summary("MILK  2.49\nYOU SAVED  0.50") == [("MILK", None, None, None, Decimal("2.49"))]
+    assert (parsed.total, parsed.discounts) == (Decimal("1.99"), Decimal("-0.50"))
+    assert parsed.confidence == 1.0
@@ -0,0 +1,72 @@
+# tests/services/test_minio_service.py
+import pytest
+from io import BytesIO
+from unittest.mock import MagicMock
+from minio.error import S3Error
+from app.metrics import STORAGE_BYTES, STORAGE_OPERATION_DURATION
+from app.services.minio_service import MinioService
+from app.services.storage_service import StorageError
+
+
+@pytest.fixture
+def minio_service(mocker):
+    mock_client = MagicMock()
+    mocker.patch("app.services.minio_service.Minio", return_value=mock_client)
+
+    service = MinioService()
+    service.part_size = 8
+
+    return service
+
+
+@pytest.mark.asyncio
+async def test_put_object_streams_with_unknown_length(minio_service):
+    """Test put_object hands MinIO the stream instead of a buffered copy"""
+    data = BytesIO(b"fake_image_data")
+
+    await minio_service.put_object("receipt.jpg", data, "image/jpeg")
+
+    kwargs = minio_service.client.put_object.call_args.kwargs
+    assert kwargs["length"] == -1
+    assert kwargs["part_size"] == 8
+    assert kwargs["data"].stream is data
+
+
+@pytest.mark.asyncio
+async def test_put_and_get_record_latency_and_bytes(minio_service):
+    """Test storage calls feed the latency histogram and byte counters"""
+    minio_service.client.put_object.side_effect = lambda *args, **kwargs: kwargs["data"].read()
+    minio_service.client.get_object.return_value.read.return_value = b"abc"
+    puts = STORAGE_OPERATION_DURATION.count(backend="minio", operation="put")
+    put_bytes = STORAGE_BYTES.value(backend="minio", direction="put")
+    get_bytes = STORAGE_BYTES.value(backend="minio", direction="get")
+
+    await minio_service.put_object("receipt.jpg", BytesIO(b"fake_image_data"), "image/jpeg")
+    await minio_service.get_object("receipt.jpg")
+
+    assert STORAGE_OPERATION_DURATION.count(backend="minio", operation="put") == puts + 1
+    assert STORAGE_BYTES.value(backend="minio", direction="put") == put_bytes + 15
+    assert STORAGE_BYTES.value(backend="minio", direction="get") == get_bytes + 3
+
+
+@pytest.mark.asyncio
+async def test_ensure_bucket_checks_only_once(minio_service):
+    """Test the bucket check is cached after the first successful call"""
+    minio_service.client.bucket_exists.return_value = True
+
+    await minio_service.put_object("a.jpg", BytesIO(b"a"), "image/jpeg")
+    await minio_service.put_object("b.jpg", BytesIO(b"b"), "image/jpeg")
+
+    minio_service.client.bucket_exists.assert_called_once_with(minio_service.bucket)
+    minio_service.client.make_bucket.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_put_object_wraps_s3_errors(minio_service):
+    """Test S3 errors surface as StorageError"""
+    minio_service.client.put_object.side_effect = S3Error(
+        MagicMock(), "InternalError", "boom", "receipt.jpg", "req", "host"
+    )
+
+    with pytest.raises(StorageError):
+        await minio_service.put_object("receipt.jpg", BytesIO(b"x"), "image/jpeg")
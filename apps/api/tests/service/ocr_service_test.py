@@ -0,0 +1,78 @@
+# tests/services/test_ocr_service.py
+import numpy as np
+import pytest
+from io import BytesIO
+from PIL import Image
+from app.services.ocr_service import (
+    OcrEngine,
+    OcrError,
+    OcrText,
+    TesseractOcrEngine,
+    create_ocr_engine,
+    parse_tsv,
+    preprocess_and_recognize,
+)
+
+TSV_HEADER = (
+    "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext"
+)
+
+
+def tsv_row(level: int, line: int, word: int, box: tuple, conf: float, text: str) -> str:
+    left, top, width, height = box
+    return f"{level}\t1\t1\t1\t{line}\t{word}\t{left}\t{top}\t{width}\t{height}\t{conf}\t{text}"
+
+
+class ShapeEngine(OcrEngine):
+    version = "shape 1"
+
+    def recognize(self, gray: np.ndarray) -> OcrText:
+        return OcrText(text=f"{gray.shape[1]}x{gray.shape[0]}")
+
+
+def test_parse_tsv_groups_words_into_lines():
+    """Test words are joined per line with a mean confidence and a bounding box"""
+    tsv = "\n".join(
+        [
+            TSV_HEADER,
+            tsv_row(4, 1, 0, (10, 10, 200, 20), -1, ""),
+            tsv_row(5, 1, 1, (10, 12, 60, 16), 90, "MILK"),
+            tsv_row(5, 1, 2, (150, 10, 50, 20), 80, "2.49"),
+            tsv_row(5, 2, 1, (10, 40, 40, 18), 70, "EGGS"),
+            tsv_row(5, 2, 2, (60, 40, 10, 18), 95, " "),
+        ]
+    )
+
+    result = parse_tsv(tsv)
+
+    assert result.text == "MILK 2.49\nEGGS"
+    assert result.lines[0] == {"text": "MILK 2.49", "confidence": 85.0, "box": [10, 10, 190, 20]}
+    assert result.lines[1]["box"] == [10, 40, 40, 18]
+
+
+def test_preprocess_and_recognize_runs_engine_on_preprocessed_image():
+    """Test the engine reads the preprocessed array, and is skipped when OCR is disabled"""
+    out = BytesIO()
+    Image.new("RGB", (120, 80), color=(240, 240, 230)).save(out, "PNG")
+
+    metrics, text = preprocess_and_recognize(ShapeEngine(), out.getvalue())
+    assert text.text == "120x80"
+    assert metrics.fast_path
+
+    assert preprocess_and_recognize(None, out.getvalue())[1] is None
+
+
+def test_missing_tesseract_raises_ocr_error():
+    """Test a missing tesseract binary is reported as an OcrError"""
+    engine = TesseractOcrEngine(cmd="/nonexistent/tesseract")
+
+    with pytest.raises(OcrError, match="not found"):
+        _ = engine.version
+
+
+def test_create_ocr_engine():
+    """Test engine selection by name"""
+    assert isinstance(create_ocr_engine("tesseract"), TesseractOcrEngine)
+    assert create_ocr_engine("none") is None
+    with pytest.raises(ValueError):
+        create_ocr_engine("abbyy")
@@ -1,10 +1,40 @@
 # tests/services/test_receipt_service.py
+import hashlib
 import pytest
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 from unittest.mock import AsyncMock
 from datetime import date
 from fastapi import UploadFile
-from app.services.receipt_service import ReceiptService
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.models.jobs import Job
+from app.repository.job_repository import GENERATE_VARIANTS, PROCESS_RECEIPT, STORE_UPLOAD
+from app.repository.pagination import Page
+from app.services.receipt_processor import WorkerContext
+from app.services.receipt_service import DirectUpload, ReceiptService
+from app.services.storage_service import (
+    InMemoryStorageService,
+    StoredObject,
+    content_object_name,
+)
 from app.models.receipts import Receipt
+from app.worker import Worker
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def stored(path: str, content_hash: str | None = None, created: bool = True) -> StoredObject:
+    return StoredObject(
+        path=path,
+        content_hash=content_hash or path,
+        size=1024,
+        content_type="image/jpeg",
+        created=created,
+    )
 
 
 @pytest.mark.asyncio
@@ -17,9 +47,9 @@ async def test_upload_receipt(mocker):
 
     # Mock the repository
     mocker.patch("app.services.receipt_service.ReceiptRepository", return_value=mock_repo)
-    mocker.patch("app.services.receipt_service.MinioService", return_value=mock_minio)
 
-    mock_minio.upload_file.return_value = "minio://bucket/image.jpg"
+    mock_minio.upload_file.return_value = stored("minio://bucket/image.jpg")
+    mock_repo.get_by_content_hash.return_value = None
 
     receipt = Receipt(
         id=1,
@@ -31,14 +61,14 @@ async def test_upload_receipt(mocker):
     mock_repo.save.return_value = receipt
 
     # Create service
-    service = ReceiptService(mock_db)
+    service = ReceiptService(mock_db, mock_minio)
     service.receipt_repository = mock_repo
-    service.minio_service = mock_minio
 
     # Test
     mock_file = AsyncMock(spec=UploadFile)
-    result = await service.upload_receipt(mock_file, date(2025, 12, 1), user_id=1)
+    result, duplicate = await service.upload_receipt(mock_file, date(2025, 12, 1), user_id=1)
 
+    assert duplicate is False
     assert result.id == 1
     assert result.status == "uploaded"
     mock_minio.upload_file.assert_called_once()
@@ -56,7 +86,8 @@ async def test_get_receipts(mocker):
         Receipt(id=1, user_id=1, image_path="img1.jpg", purchase_date=date.today()),
         Receipt(id=2, user_id=1, image_path="img2.jpg", purchase_date=date.today()),
     ]
-    mock_repo.get_all.return_value = receipts
+    mock_repo.get_rows.return_value = Page(items=receipts)
+    mock_repo.count.return_value = 12
 
     mocker.patch("app.services.receipt_service.ReceiptRepository", return_value=mock_repo)
 
@@ -65,7 +96,19 @@ async def test_get_receipts(mocker):
 
     result = await service.get_receipts(1)
 
-    assert len(result) == 2
+    assert len(result.items) == 2
+    assert result.total == 12
+
+
+@pytest.mark.asyncio
+async def test_get_receipts_rejects_invalid_cursor(mocker):
+    """Test a tampered cursor is a 400, not a server error"""
+    service = ReceiptService(AsyncMock(), AsyncMock())
+
+    with pytest.raises(HTTPException) as exc_info:
+        await service.get_receipts(1, cursor="not-a-cursor")
+
+    assert exc_info.value.status_code == 400
 
 
 @pytest.mark.asyncio
@@ -118,34 +161,288 @@ async def test_upload_multiple_receipts(mocker):
     mock_db = AsyncMock()
     mock_repo = AsyncMock()
     mock_minio = AsyncMock()
+    mock_repo.get_by_content_hashes.return_value = {}
 
     mocker.patch("app.services.receipt_service.ReceiptRepository", return_value=mock_repo)
-    mocker.patch("app.services.receipt_service.MinioService", return_value=mock_minio)
 
     # Mock MinIO to return different paths for each file
     mock_minio.upload_file.side_effect = [
-        "minio://bucket/image1.jpg",
-        "minio://bucket/image2.jpg",
-        "minio://bucket/image3.jpg",
+        stored("minio://bucket/image1.jpg"),
+        stored("minio://bucket/image2.jpg"),
+        stored("minio://bucket/image3.jpg"),
     ]
 
     # Mock save_many to return count
     mock_repo.save_many.return_value = 3
 
-    service = ReceiptService(mock_db)
+    service = ReceiptService(mock_db, mock_minio)
     service.receipt_repository = mock_repo
-    service.minio_service = mock_minio
 
     # Create mock files
-    mock_files = [AsyncMock(spec=UploadFile) for _ in range(3)]
+    mock_files = [AsyncMock(spec=UploadFile, filename=f"test{i}.jpg") for i in range(3)]
 
     # Test
-    count = await service.upload_receipts(mock_files, date(2025, 12, 1), user_id=1)
+    results = await service.upload_receipts(mock_files, date(2025, 12, 1), user_id=1)
 
-    assert count == 3
+    assert len(results) == 3
+    assert all(result.success for result in results)
     assert mock_minio.upload_file.call_count == 3
     mock_repo.save_many.assert_called_once()
 
     # Verify receipts list passed to save_many
     receipts_arg = mock_repo.save_many.call_args[0][0]
     assert len(receipts_arg) == 3
+
+
+@pytest.mark.asyncio
+async def test_upload_multiple_receipts_reports_failed_files(mocker):
+    """Test a failing file is reported and does not block the rest of the batch"""
+    mock_db = AsyncMock()
+    mock_repo = AsyncMock()
+    mock_minio = AsyncMock()
+    mock_repo.get_by_content_hashes.return_value = {}
+
+    mock_minio.upload_file.side_effect = [
+        stored("minio://bucket/image1.jpg"),
+        HTTPException(status_code=400, detail="Only image files are allowed "),
+        stored("minio://bucket/image3.jpg"),
+    ]
+
+    service = ReceiptService(mock_db, mock_minio)
+    service.receipt_repository = mock_repo
+
+    mock_files = [AsyncMock(spec=UploadFile, filename=f"test{i}.jpg") for i in range(3)]
+
+    results = await service.upload_receipts(mock_files, date(2025, 12, 1), user_id=1)
+
+    assert [result.success for result in results] == [True, False, True]
+    assert results[1].error == "Only image files are allowed "
+    receipts_arg = mock_repo.save_many.call_args[0][0]
+    assert [receipt.image_path for receipt in receipts_arg] == [
+        "minio://bucket/image1.jpg",
+        "minio://bucket/image3.jpg",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_upload_multiple_receipts_cleans_up_on_save_failure(mocker):
+    """Test uploaded objects are removed when the batch insert fails"""
+    mock_db = AsyncMock()
+    mock_repo = AsyncMock()
+    mock_minio = AsyncMock()
+
+    mock_minio.upload_file.side_effect = [
+        stored("minio://bucket/image1.jpg"),
+        stored("minio://bucket/image2.jpg"),
+    ]
+    mock_minio.object_name_from_path = lambda path: path.rsplit("/", 1)[-1]
+    mock_repo.get_by_content_hashes.return_value = {}
+    mock_repo.save_many.side_effect = RuntimeError("db down")
+
+    service = ReceiptService(mock_db, mock_minio)
+    service.receipt_repository = mock_repo
+
+    mock_files = [AsyncMock(spec=UploadFile, filename=f"test{i}.jpg") for i in range(2)]
+
+    with pytest.raises(RuntimeError):
+        await service.upload_receipts(mock_files, date(2025, 12, 1), user_id=1)
+
+    removed = {call.args[0] for call in mock_minio.remove_object.call_args_list}
+    assert removed == {"image1.jpg", "image2.jpg"}
+    mock_db.rollback.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_upload_receipt_links_duplicate(mocker):
+    """Test a duplicate upload returns the existing receipt without saving"""
+    mock_db = AsyncMock()
+    mock_repo = AsyncMock()
+    mock_minio = AsyncMock()
+
+    existing = Receipt(id=7, user_id=1, image_path="minio://bucket/sha256/abc", content_hash="abc")
+    mock_minio.upload_file.return_value = stored("minio://bucket/sha256/abc", "abc", created=False)
+    mock_repo.get_by_content_hash.return_value = existing
+
+    service = ReceiptService(mock_db, mock_minio)
+    service.receipt_repository = mock_repo
+
+    result, duplicate = await service.upload_receipt(
+        AsyncMock(spec=UploadFile), date(2025, 12, 1), user_id=1
+    )
+
+    assert duplicate is True
+    assert result is existing
+    mock_repo.save.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_upload_receipt_rejects_duplicate(mocker):
+    """Test the reject policy refuses a duplicate upload with 409"""
+    mock_db = AsyncMock()
+    mock_repo = AsyncMock()
+    mock_minio = AsyncMock()
+
+    existing = Receipt(id=7, user_id=1, image_path="minio://bucket/sha256/abc", content_hash="abc")
+    mock_minio.upload_file.return_value = stored("minio://bucket/sha256/abc", "abc", created=False)
+    mock_repo.get_by_content_hash.return_value = existing
+
+    service = ReceiptService(mock_db, mock_minio)
+    service.receipt_repository = mock_repo
+
+    with pytest.raises(HTTPException) as exc_info:
+        await service.upload_receipt(
+            AsyncMock(spec=UploadFile), date(2025, 12, 1), user_id=1, on_duplicate="reject"
+        )
+
+    assert exc_info.value.status_code == 409
+    mock_repo.save.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_upload_multiple_receipts_deduplicates_within_batch(mocker):
+    """Test identical files in one batch create a single receipt"""
+    mock_db = AsyncMock()
+    mock_repo = AsyncMock()
+    mock_minio = AsyncMock()
+
+    mock_minio.upload_file.side_effect = [
+        stored("minio://bucket/sha256/abc", "abc"),
+        stored("minio://bucket/sha256/abc", "abc", created=False),
+        stored("minio://bucket/sha256/def", "def"),
+    ]
+    mock_repo.get_by_content_hashes.return_value = {}
+
+    service = ReceiptService(mock_db, mock_minio)
+    service.receipt_repository = mock_repo
+
+    mock_files = [AsyncMock(spec=UploadFile, filename=f"test{i}.jpg") for i in range(3)]
+
+    results = await service.upload_receipts(mock_files, date(2025, 12, 1), user_id=1)
+
+    assert [result.duplicate for result in results] == [False, True, False]
+    receipts_arg = mock_repo.save_many.call_args[0][0]
+    assert [receipt.content_hash for receipt in receipts_arg] == ["abc", "def"]
+
+
+@pytest.mark.asyncio
+async def test_presigned_upload_flow(db):
+    """Test pending receipts move to uploaded once their objects are verified"""
+    storage = InMemoryStorageService()
+    service = ReceiptService(db, storage)
+
+    uploads = await service.create_presigned_uploads(
+        [
+            DirectUpload("a.jpg", "image/jpeg", 4),
+            DirectUpload("b.png", "image/png", 4),
+            DirectUpload("c.jpg", "image/jpeg", 4),
+        ],
+        date(2025, 12, 1),
+        user_id=1,
+    )
+
+    assert [upload.receipt.status for upload in uploads] == ["pending"] * 3
+    assert all(upload.upload_url for upload in uploads)
+
+    # Simulate the client PUTs: a correct one, a wrong size, and one never sent
+    names = [storage.object_name_from_path(upload.receipt.image_path) for upload in uploads]
+    await storage.put_object(names[0], BytesIO(b"abcd"), "image/jpeg")
+    await storage.put_object(names[1], BytesIO(b"abcdef"), "image/png")
+
+    ids = [upload.receipt.id for upload in uploads]
+    results = await service.finalize_uploads(ids + [999], user_id=1)
+
+    assert [result.status for result in results] == ["uploaded", "failed", "pending", None]
+    assert results[2].error == "Object has not been uploaded yet"
+    assert results[3].error == "Receipt 999 not found"
+    assert names[1] not in storage.objects
+    # The object is stored by hash in the worker, never read by the API
+    assert uploads[0].receipt.content_hash is None
+    jobs = (await db.execute(select(Job.kind, Job.receipt_id, Job.payload))).all()
+    assert jobs == [(STORE_UPLOAD, ids[0], {"on_duplicate": "link"})]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("on_duplicate", ["link", "reject"])
+async def test_presigned_upload_applies_duplicate_policy(db, on_duplicate):
+    """Test the worker stores direct uploads by hash and follows `on_duplicate`"""
+    storage = InMemoryStorageService()
+    service = ReceiptService(db, storage)
+
+    uploads = await service.create_presigned_uploads(
+        [DirectUpload("a.jpg", "image/jpeg", 4), DirectUpload("b.jpg", "image/jpeg", 4)],
+        date(2025, 12, 1),
+        user_id=1,
+    )
+    for upload in uploads:
+        object_name = storage.object_name_from_path(upload.receipt.image_path)
+        await storage.put_object(object_name, BytesIO(b"abcd"), "image/jpeg")
+
+    ids = [upload.receipt.id for upload in uploads]
+    await service.finalize_uploads(ids[:1], user_id=1, on_duplicate=on_duplicate)
+    await service.finalize_uploads(ids[1:], user_id=1, on_duplicate=on_duplicate)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        worker = Worker(
+            async_sessionmaker(db.bind, expire_on_commit=False),
+            WorkerContext(storage=storage, executor=executor),
+            concurrency=1,
+        )
+        assert await worker.run_once() == 1
+        assert await worker.run_once() == 1
+
+    first = await service.get(ids[0])
+    await db.refresh(first)
+    content_name = content_object_name(sha256(b"abcd"))
+    assert (first.image_path, first.content_hash) == (
+        storage.build_path(content_name),
+        sha256(b"abcd"),
+    )
+    assert list(storage.objects) == [content_name]
+
+    if on_duplicate == "link":
+        assert await service.get(ids[1]) is None
+        assert await service.get_stats(1) == {"uploaded": 1}
+    else:
+        second = await service.get(ids[1])
+        await db.refresh(second)
+        assert (second.status, second.image_path) == ("failed", first.image_path)
+        assert await service.get_stats(1) == {"uploaded": 1, "failed": 1}
+
+    queued = (
+        await db.execute(select(Job.kind, Job.receipt_id).where(Job.status == "queued"))
+    ).all()
+    assert sorted(queued) == [(GENERATE_VARIANTS, ids[0]), (PROCESS_RECEIPT, ids[0])]
+
+
+@pytest.mark.asyncio
+async def test_receipts_are_committed_with_their_jobs(db, mocker):
+    """Test a receipt whose jobs cannot be queued is rolled back with them"""
+    storage = InMemoryStorageService()
+    service = ReceiptService(db, storage)
+    uploads = await service.create_presigned_uploads(
+        [DirectUpload("a.jpg", "image/jpeg", 4)], date(2025, 12, 1), user_id=1
+    )
+    receipt_id = uploads[0].receipt.id
+    object_name = storage.object_name_from_path(uploads[0].receipt.image_path)
+    await storage.put_object(object_name, BytesIO(b"abcd"), "image/jpeg")
+
+    mocker.patch.object(service.job_repository, "enqueue", side_effect=RuntimeError("db down"))
+    with pytest.raises(RuntimeError):
+        await service.finalize_uploads([receipt_id], user_id=1)
+
+    await db.rollback()
+    assert (await service.get(receipt_id)).status == "pending"
+    assert await service.get_stats(1) == {"pending": 1}
+
+
+@pytest.mark.asyncio
+async def test_presigned_upload_rejects_oversized_files(db):
+    """Test announced sizes over the limit are refused before any receipt is created"""
+    service = ReceiptService(db, InMemoryStorageService())
+
+    with pytest.raises(HTTPException) as exc_info:
+        await service.create_presigned_uploads(
+            [DirectUpload("a.jpg", "image/jpeg", 10**12)], date(2025, 12, 1), user_id=1
+        )
+
+    assert exc_info.value.status_code == 413
@@ -0,0 +1,111 @@
+# tests/services/test_storage_service.py
+import hashlib
+import pytest
+from io import BytesIO
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+from app.services.storage_service import (
+    InMemoryStorageService,
+    LocalStorageService,
+    SizeLimitedReader,
+    StorageError,
+    UploadTooLargeError,
+)
+
+
+def make_upload_file(data: bytes, content_type: str = "image/jpeg", size=None) -> UploadFile:
+    return UploadFile(
+        file=BytesIO(data),
+        filename="receipt.jpg",
+        size=size,
+        headers=Headers({"content-type": content_type}),
+    )
+
+
+def test_size_limited_reader_streams_until_limit():
+    """Test reader passes data through and fails once the limit is crossed"""
+    reader = SizeLimitedReader(BytesIO(b"x" * 10), max_size=8)
+
+    assert reader.read(4) == b"xxxx"
+    assert reader.read(4) == b"xxxx"
+
+    with pytest.raises(UploadTooLargeError):
+        reader.read(4)
+
+
+@pytest.mark.asyncio
+async def test_in_memory_upload_file_round_trip():
+    """Test uploaded bytes can be read back through the returned path"""
+    storage = InMemoryStorageService()
+
+    stored = await storage.upload_file(make_upload_file(b"fake_image_data"))
+    object_name = storage.object_name_from_path(stored.path)
+
+    assert stored.path.startswith("memory://receipts/")
+    assert await storage.get_object(object_name) == b"fake_image_data"
+
+
+@pytest.mark.asyncio
+async def test_upload_file_stores_identical_bytes_once():
+    """Test objects are keyed by content hash so duplicates share one object"""
+    storage = InMemoryStorageService()
+
+    first = await storage.upload_file(make_upload_file(b"fake_image_data"))
+    second = await storage.upload_file(make_upload_file(b"fake_image_data"))
+
+    assert first.path == second.path
+    assert first.content_hash == hashlib.sha256(b"fake_image_data").hexdigest()
+    assert first.created is True
+    assert second.created is False
+    assert list(storage.objects) == [f"sha256/{first.content_hash}"]
+
+
+@pytest.mark.asyncio
+async def test_upload_file_rejects_oversized_stream():
+    """Test max size is enforced while the backend consumes the stream"""
+    storage = InMemoryStorageService(max_upload_size=32)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await storage.upload_file(make_upload_file(b"x" * 64))
+
+    assert exc_info.value.status_code == 413
+    assert storage.objects == {}
+
+
+@pytest.mark.asyncio
+async def test_upload_file_rejects_known_oversized_file():
+    """Test files with a known size are rejected before any upload starts"""
+    storage = InMemoryStorageService(max_upload_size=32)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await storage.upload_file(make_upload_file(b"x" * 64, size=64))
+
+    assert exc_info.value.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_upload_file_rejects_non_images():
+    """Test only image content types are accepted"""
+    storage = InMemoryStorageService()
+
+    with pytest.raises(HTTPException) as exc_info:
+        await storage.upload_file(make_upload_file(b"%PDF", content_type="application/pdf"))
+
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_local_storage_round_trip(tmp_path):
+    """Test local storage writes, reads and removes objects on disk"""
+    storage = LocalStorageService(tmp_path)
+
+    stored = await storage.upload_file(make_upload_file(b"fake_image_data"))
+    object_name = storage.object_name_from_path(stored.path)
+
+    assert (tmp_path / "receipts" / object_name).read_bytes() == b"fake_image_data"
+    assert await storage.get_object(object_name) == b"fake_image_data"
+
+    await storage.remove_object(object_name)
+
+    with pytest.raises(StorageError):
+        await storage.get_object(object_name)
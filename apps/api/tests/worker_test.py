@@ -0,0 +1,227 @@
+# tests/test_worker.py
+import asyncio
+import hashlib
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+from io import BytesIO
+from PIL import Image
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.models.jobs import Job
+from app.models.ocr_results import OcrResult
+from app.models.receipts import Receipt
+from app.repository.job_repository import PROCESS_RECEIPT, JobRepository
+from app.repository.receipt_item_repository import ReceiptItemRepository
+from app.repository.receipt_repository import ReceiptRepository
+from app.services.image_preprocessing import PREPROCESS_VERSION
+from app.services.ocr_service import OcrEngine, OcrText
+from app.services.receipt_processor import WorkerContext
+from app.services.storage_service import InMemoryStorageService
+from app.worker import Worker
+
+
+def make_jpeg() -> bytes:
+    out = BytesIO()
+    Image.new("RGB", (64, 64), color=(240, 240, 230)).save(out, "JPEG")
+    return out.getvalue()
+
+
+class CountingEngine(OcrEngine):
+    version = "counting 1"
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def recognize(self, gray) -> OcrText:
+        self.calls += 1
+        return OcrText(text="MILK 2.49", lines=[{"text": "MILK 2.49", "confidence": 90.0}])
+
+
+async def enqueue_receipt(
+    db: AsyncSession, storage, object_name: str, data: bytes, content_hash: str | None = None
+) -> Receipt:
+    await storage.put_object(object_name, BytesIO(data), "image/jpeg")
+    receipt = await ReceiptRepository(db).save(
+        Receipt(
+            user_id=1,
+            image_path=storage.build_path(object_name),
+            purchase_date=date(2025, 12, 1),
+            content_hash=content_hash,
+        )
+    )
+    await JobRepository(db).enqueue(PROCESS_RECEIPT, [receipt.id], max_attempts=1)
+
+    return receipt
+
+
+@pytest.mark.asyncio
+async def test_worker_processes_queued_receipts(db: AsyncSession):
+    """Test the worker moves good receipts to processed and dead-letters broken images"""
+    storage = InMemoryStorageService()
+    good = await enqueue_receipt(db, storage, "sha256/good", make_jpeg())
+    bad = await enqueue_receipt(db, storage, "sha256/bad", b"not an image")
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        worker = Worker(
+            async_sessionmaker(db.bind, expire_on_commit=False),
+            WorkerContext(storage=storage, executor=executor),
+            concurrency=4,
+        )
+        assert await worker.run_once() == 2
+        assert await worker.run_once() == 0
+
+    await db.refresh(good)
+    await db.refresh(bad)
+    assert good.status == "processed"
+    assert bad.status == "failed"
+
+
+@pytest.mark.asyncio
+async def test_worker_records_quality_metrics(db: AsyncSession):
+    """Test preprocessing metrics are stored on the receipt with its status"""
+    storage = InMemoryStorageService()
+    receipt = await enqueue_receipt(db, storage, "sha256/good", make_jpeg())
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        worker = Worker(
+            async_sessionmaker(db.bind, expire_on_commit=False),
+            WorkerContext(storage=storage, executor=executor),
+        )
+        assert await worker.run_once() == 1
+
+    await db.refresh(receipt)
+    assert receipt.status == "processed"
+    assert receipt.quality_metrics["version"] == PREPROCESS_VERSION
+    assert receipt.quality_metrics["fast_path"] is True
+
+
+@pytest.mark.asyncio
+async def test_worker_records_the_hash_of_unhashed_receipts(db: AsyncSession):
+    """Test a receipt stored before uploads were hashed gets its image hash with the job"""
+    storage = InMemoryStorageService()
+    data = make_jpeg()
+    receipt = await enqueue_receipt(db, storage, "receipts/legacy.jpg", data)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        worker = Worker(
+            async_sessionmaker(db.bind, expire_on_commit=False),
+            WorkerContext(storage=storage, executor=executor),
+        )
+        assert await worker.run_once() == 1
+
+    await db.refresh(receipt)
+    assert receipt.status == "processed"
+    assert receipt.content_hash == hashlib.sha256(data).hexdigest()
+
+
+@pytest.mark.asyncio
+async def test_worker_reuses_stored_ocr_results(db: AsyncSession):
+    """Test OCR runs once per image: a second receipt of the same image hits the store"""
+    storage = InMemoryStorageService()
+    first = await enqueue_receipt(db, storage, "sha256/abc", make_jpeg(), content_hash="abc")
+    second = await enqueue_receipt(db, storage, "sha256/abc", make_jpeg(), content_hash="abc")
+    engine = CountingEngine()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        worker = Worker(
+            async_sessionmaker(db.bind, expire_on_commit=False),
+            WorkerContext(storage=storage, executor=executor, ocr=engine),
+            concurrency=1,
+        )
+        assert await worker.run_once() == 1
+        del storage.objects["sha256/abc"]  # a hit never fetches the image
+        assert await worker.run_once() == 1
+
+    await db.refresh(first)
+    await db.refresh(second)
+    stored = (await db.execute(select(OcrResult))).scalar_one()
+
+    assert engine.calls == 1
+    assert (first.status, second.status) == ("processed", "processed")
+    assert second.quality_metrics == first.quality_metrics
+    assert (stored.content_hash, stored.engine_version, stored.hits) == ("abc", "counting 1", 1)
+
+    items = await ReceiptItemRepository(db).get_for_receipt(second.id)
+    assert [(item.item_name, item.total_price) for item in items] == [("MILK", Decimal("2.49"))]
+    assert (items[0].category_id, items[0].category_method) == (3, "exact")  # Dairy
+    assert second.parse_confidence == 0.8  # no printed total to confirm the items
+
+
+@pytest.mark.asyncio
+async def test_worker_extends_the_claim_of_long_jobs(db: AsyncSession):
+    """Test a job running past its heartbeat keeps its claim ahead of the visibility timeout"""
+    session_factory = async_sessionmaker(db.bind, expire_on_commit=False)
+    await JobRepository(db).enqueue("slow", [1])
+    claims = []
+
+    async def slow(ctx, session, job):
+        for _ in range(2):
+            await asyncio.sleep(0.05)
+            async with session_factory() as reader:
+                claims.append(await reader.scalar(select(Job.locked_until)))
+
+    worker = Worker(
+        session_factory,
+        WorkerContext(storage=InMemoryStorageService(), executor=None),
+        handlers={"slow": slow},
+        heartbeat_interval=0.02,
+    )
+    [job] = await worker.claim(1)
+    await worker.run_job(job)
+
+    assert job.locked_until.replace(tzinfo=None) < claims[0] < claims[1]
+    assert await db.scalar(select(Job.status)) == "done"
+
+
+@pytest.mark.asyncio
+async def test_worker_survives_failures_recording_the_outcome(db: AsyncSession, mocker):
+    """Test a database error while completing a job is logged and leaves it to be reclaimed"""
+    await JobRepository(db).enqueue("noop", [1])
+
+    async def noop(ctx, session, job):
+        pass
+
+    mocker.patch.object(JobRepository, "complete", side_effect=RuntimeError("db down"))
+    worker = Worker(
+        async_sessionmaker(db.bind, expire_on_commit=False),
+        WorkerContext(storage=InMemoryStorageService(), executor=None),
+        handlers={"noop": noop},
+    )
+
+    assert await worker.run_once() == 1
+
+    job = await db.scalar(select(Job))
+    assert job.status == "running"
+
+
+@pytest.mark.asyncio
+async def test_worker_keeps_running_when_claiming_fails(db: AsyncSession):
+    """Test a database error while claiming is logged and the next poll claims again"""
+    await JobRepository(db).enqueue("noop", [1])
+    stop = asyncio.Event()
+    ran = []
+
+    async def noop(ctx, session, job):
+        ran.append(job.id)
+        stop.set()
+
+    worker = Worker(
+        async_sessionmaker(db.bind, expire_on_commit=False),
+        WorkerContext(storage=InMemoryStorageService(), executor=None),
+        handlers={"noop": noop},
+        poll_interval=0.01,
+    )
+    claim, failures = worker.claim, [OperationalError("SELECT", {}, Exception("failover"))]
+
+    async def flaky_claim(limit: int) -> list:
+        if failures:
+            raise failures.pop()
+        return await claim(limit)
+
+    worker.claim = flaky_claim
+    await asyncio.wait_for(worker.run(stop), timeout=5)
+
+    assert ran == [1]
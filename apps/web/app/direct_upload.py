@@ -0,0 +1,37 @@
+import requests
+from config import API_URL
+
+
+def upload_direct(files, purchase_date, user_id=1):
+    """
+    Upload Streamlit files straight to object storage via presigned URLs.
+
+    Returns the finalize results, one per file, in the same order.
+    """
+    payload = {
+        "user_id": user_id,
+        "purchase_date": str(purchase_date),
+        "files": [{"filename": f.name, "content_type": f.type, "size": f.size} for f in files],
+    }
+    response = requests.post(f"{API_URL}/receipts/uploads", json=payload, timeout=10)
+    response.raise_for_status()
+    uploads = response.json()["uploads"]
+
+    with requests.Session() as session:
+        for file, upload in zip(files, uploads):
+            put = session.put(
+                upload["upload_url"],
+                data=file.getvalue(),
+                headers={"Content-Type": file.type},
+                timeout=60,
+            )
+            put.raise_for_status()
+
+    response = requests.post(
+        f"{API_URL}/receipts/uploads/finalize",
+        json={"user_id": user_id, "receipt_ids": [u["receipt_id"] for u in uploads]},
+        timeout=10,
+    )
+    response.raise_for_status()
+
+    return response.json()["results"]
@@ -1,7 +1,7 @@
 import streamlit as st
 import requests
 from datetime import date
-from config import API_URL
+from direct_upload import upload_direct
 
 
 def render_bulk_upload_page():
@@ -46,41 +46,46 @@ def render_bulk_upload_page():
         else:
             with st.spinner(f"Uploading {len(upload_files)} receipt(s)..."):
                 try:
-                    # Prepare files for upload
-                    files = [("files", (f.name, f.getvalue(), f.type)) for f in upload_files]
-                    data = {"purchase_date": str(purchase_date), "user_id": 1}
+                    # Bytes go straight to object storage, the API only signs and verifies
+                    results = upload_direct(upload_files, purchase_date)
+                    succeeded = sum(1 for item in results if item["success"])
+                    failed = len(results) - succeeded
 
-                    response = requests.post(f"{API_URL}/receipts/bulk", files=files, data=data)
-
-                    if response.status_code == 201:
-                        result = response.json()
-                        st.success(f"✅ Successfully uploaded {result['total']} receipt(s)!")
+                    if failed == 0:
+                        st.success(f"✅ Successfully uploaded {succeeded} receipt(s)!")
                         st.balloons()
+                    else:
+                        st.warning(f"⚠️ Uploaded {succeeded} of {len(results)} receipt(s)")
+
+                    # Display summary
+                    st.markdown("### 📊 Upload Summary")
+                    col1, col2, col3 = st.columns(3)
 
-                        # Display summary
-                        st.markdown("### 📊 Upload Summary")
-                        col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric("Uploaded", succeeded)
 
-                        with col1:
-                            st.metric("Total Uploaded", result["total"])
+                    with col2:
+                        st.metric("Failed", failed)
 
-                        with col2:
-                            st.metric("Purchase Date", str(purchase_date))
+                    with col3:
+                        st.metric("Purchase Date", str(purchase_date))
 
-                        with col3:
-                            st.metric("Status", "UPLOADED")
+                    for file, item in zip(upload_files, results):
+                        if not item["success"]:
+                            st.error(f"❌ {file.name}: {item['error']}")
 
-                        st.info("💡 Check the 'My Receipts' tab to view your uploaded receipts")
+                    st.info("💡 Check the 'My Receipts' tab to view your uploaded receipts")
 
-                        # Optional: Show raw response
-                        with st.expander("🔍 View raw response"):
-                            st.json(result)
-                        
-                        # Reset form by incrementing counter
+                    # Optional: Show raw response
+                    with st.expander("🔍 View raw response"):
+                        st.json(results)
+
+                    # Reset form only when everything went through
+                    if failed == 0:
                         st.session_state.bulk_upload_counter += 1
                         st.rerun()
-                    else:
-                        st.error(f"❌ Upload failed: {response.text}")
+                except requests.exceptions.HTTPError as e:
+                    st.error(f"❌ Upload failed: {e.response.text}")
                 except requests.exceptions.ConnectionError:
                     st.error("❌ Cannot connect to API. Is the server running?")
                 except Exception as e:
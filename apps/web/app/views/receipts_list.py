@@ -7,35 +7,35 @@ def render_receipts_list():
     """Render the receipts list page with pagination"""
     st.subheader("My Receipts")
 
-    # Initialize session state for pagination
-    if "last_id" not in st.session_state:
-        st.session_state.last_id = -1
-    if "receipts_history" not in st.session_state:
-        st.session_state.receipts_history = []
+    # Initialize session state for pagination; the API cursors remember both directions
+    if "cursor" not in st.session_state:
+        st.session_state.cursor = None
 
     col1, col2 = st.columns([3, 1])
 
     with col2:
         if st.button("🔄 Refresh"):
-            st.session_state.last_id = -1
-            st.session_state.receipts_history = []
+            st.session_state.cursor = None
             st.rerun()
 
     try:
         # Fetch receipts with pagination
-        params = {"user_id": 1, "last_id": st.session_state.last_id, "limit": 10}
+        params = {"user_id": 1, "limit": 10}
+        if st.session_state.cursor:
+            params["cursor"] = st.session_state.cursor
         response = requests.get(f"{API_URL}/receipts", params=params, timeout=5)
 
         if response.status_code == 200:
             data = response.json()
             receipts = data.get("receipts", [])
             total = data.get("total", 0)
-            new_last_id = data.get("last_id", -1)
+            next_cursor = data.get("next_cursor")
+            prev_cursor = data.get("prev_cursor")
 
-            if not receipts and st.session_state.last_id == -1:
+            if not receipts and st.session_state.cursor is None:
                 st.info("📭 No receipts yet. Upload one in the **Upload Receipt** tab!")
             else:
-                st.caption(f"Showing {total} receipt(s)")
+                st.caption(f"Showing {len(receipts)} of {total} receipt(s)")
 
                 for receipt in receipts:
                     with st.expander(
@@ -48,6 +48,9 @@ def render_receipts_list():
 
                         st.caption(f"Created: {receipt['created_at']}")
 
+                        if receipt.get("thumbnail_url"):
+                            st.image(receipt["thumbnail_url"], width=160)
+
                         if st.button("View Details", key=f"view_{receipt['id']}"):
                             detail_response = requests.get(f"{API_URL}/receipts/{receipt['id']}")
                             if detail_response.status_code == 200:
@@ -78,22 +81,18 @@ def render_receipts_list():
                                 st.error("Failed to fetch receipt details")
 
                 # Pagination controls
-                if total > 0 and new_last_id != -1:
+                if next_cursor or prev_cursor:
                     st.markdown("---")
                     col1, col2, col3 = st.columns([1, 2, 1])
 
                     with col1:
-                        if st.button("⬅️ Previous", disabled=st.session_state.last_id == -1):
-                            # Go back (would need to store history for this)
-                            if st.session_state.receipts_history:
-                                st.session_state.last_id = st.session_state.receipts_history.pop()
-                                st.rerun()
+                        if st.button("⬅️ Previous", disabled=prev_cursor is None):
+                            st.session_state.cursor = prev_cursor
+                            st.rerun()
 
                     with col3:
-                        if st.button("Next ➡️", disabled=(total < params["limit"])):
-                            # Store current last_id in history
-                            st.session_state.receipts_history.append(st.session_state.last_id)
-                            st.session_state.last_id = new_last_id
+                        if st.button("Next ➡️", disabled=next_cursor is None):
+                            st.session_state.cursor = next_cursor
                             st.rerun()
 
         else:
@@ -2,6 +2,7 @@ import streamlit as st
 import requests
 from datetime import date
 from config import API_URL
+from direct_upload import upload_direct
 
 
 def render_upload_page():
@@ -40,16 +41,17 @@ def render_upload_page():
         else:
             with st.spinner("Uploading..."):
                 try:
-                    files = {"file": (upload_file.name, upload_file, upload_file.type)}
-                    data = {"purchase_date": str(purchase_date), "user_id": 1}
+                    # Bytes go straight to object storage, the API only signs and verifies
+                    result = upload_direct([upload_file], purchase_date)[0]
 
-                    response = requests.post(f"{API_URL}/receipts", files=files, data=data)
-
-                    if response.status_code == 201:
+                    if result["success"]:
                         st.success("✅ Receipt uploaded successfully!")
                         st.balloons()
 
                         # Display receipt details in a nice format
+                        response = requests.get(
+                            f"{API_URL}/receipts/{result['receipt_id']}", timeout=5
+                        )
                         receipt = response.json()
 
                         st.markdown("### 🧾 Receipt Details")
@@ -70,12 +72,14 @@ def render_upload_page():
                         # Optional: Show JSON in expander for debugging
                         with st.expander("🔍 View raw data"):
                             st.json(receipt)
-                        
+
                         # Reset form by incrementing counter
                         st.session_state.upload_counter += 1
                         st.rerun()
                     else:
-                        st.error(f"❌ Upload failed: {response.text}")
+                        st.error(f"❌ Upload failed: {result['error']}")
+                except requests.exceptions.HTTPError as e:
+                    st.error(f"❌ Upload failed: {e.response.text}")
                 except requests.exceptions.ConnectionError:
                     st.error("❌ Cannot connect to API. Is the server running?")
                 except Exception as e: